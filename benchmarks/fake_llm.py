@@ -0,0 +1,571 @@
+"""本地 LLM 替身服务：OpenAI 兼容的 chat-completions 接口（含流式），用于无网络、零费用地压测 LlmAI 链路
+
+按配置返回 RuleAI 给出的合法应答，或按比例注入畸形 JSON / 非法出牌 / 服务端错误 / 超时，
+延迟服从对数正态分布（可叠加未命中前缀缓存的 prompt token 成本）。固定 seed 时行为可复现。
+
+独立运行：
+    python -m benchmarks.fake_llm --port 8001 --latency-ms 400 --malformed 0.05
+    # AI_PLAYER1_BASE_URL=http://127.0.0.1:8001/v1 AI_PLAYER1_API_KEY=fake
+
+进程内（不占端口，响应体边生成边交付）：
+    fake = FakeLLM(FakeLLMConfig(latency_ms=200), seed=1)
+    registry = ClientRegistry(transport=fake.transport())
+    ai = LlmAI("烈焰哥🔥", api_key="fake", base_url=FAKE_BASE_URL, registry=registry)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, fields, replace
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_detector import detect_hand
+from src.game.player import Player
+from src.game.game_state import GameState, GamePhase
+from src.ai.rule_ai import RuleAI
+from src.ai.encoding import parse_ranks_text, ranks_text
+from src.ai.session import estimate_tokens
+from src.ai.llm_ai import _parse_card_text
+
+# 进程内使用时的虚拟地址（transport 不走网络，主机名只用于区分端点）
+FAKE_BASE_URL = "http://fake-llm/v1"
+
+# 应答行为
+VALID = "valid"
+MALFORMED = "malformed"
+ILLEGAL = "illegal"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+# prompt 类型
+KIND_BID = "bid"
+KIND_PLAY = "play"
+KIND_INDEXED = "indexed"
+KIND_COMMENTARY = "commentary"
+
+_STRATEGIES = ["稳住别浪", "看我压你", "先走小牌", "留炸弹防身", "这手必须过", "不跟了"]
+
+_SUITS = [Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB]
+
+
+@dataclass
+class FakeLLMConfig:
+    """
+    替身服务的行为配置（可按模型名分别配置，运行中可通过 PUT /admin/config 修改）：
+    - 延迟 = 对数正态(中位 latency_ms, 形状 latency_sigma) + 未命中前缀缓存的 prompt token × ms_per_token
+    - 各类故障按比例注入，互斥：error → timeout → malformed → illegal，其余为合法应答
+    - 流式时延迟作为首字节时间，之后每 stream_chunk_ms 推送 stream_chunk_chars 个字符
+    """
+    latency_ms: float = 300.0
+    latency_sigma: float = 0.3
+    ms_per_token: float = 0.0
+    malformed_rate: float = 0.0
+    illegal_rate: float = 0.0
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    hang_seconds: float = 60.0
+    stream_chunk_chars: int = 8
+    stream_chunk_ms: float = 20.0
+
+
+@dataclass
+class FakeLLMStats:
+    """替身服务侧的请求统计"""
+    requests: int = 0
+    streams: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    kinds: Counter = field(default_factory=Counter)
+    behaviours: Counter = field(default_factory=Counter)
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "streams": self.streams,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "kinds": dict(self.kinds),
+            "behaviours": dict(self.behaviours),
+        }
+
+
+# ============================================================
+#  Prompt 解析（verbose / compact / 会话三种编码）
+# ============================================================
+
+def _cards_from_ranks(ranks: List[Rank]) -> List[Card]:
+    """点数 → 具体的牌（花色轮流分配，RuleAI 不看花色）"""
+    seen: Counter = Counter()
+    cards = []
+    for r in ranks:
+        suit = Suit.JOKER if r >= Rank.SMALL_JOKER else _SUITS[seen[r] % 4]
+        seen[r] += 1
+        cards.append(Card(rank=r, suit=suit))
+    return cards
+
+
+def _parse_cards(text: str) -> Optional[List[Card]]:
+    """解析牌面文本：verbose 为带花色的空格分隔牌面，compact 为点数记号"""
+    text = text.strip()
+    if not text:
+        return []
+    if any(s.value in text for s in _SUITS) or "王" in text:
+        cards = [_parse_card_text(t) for t in text.split()]
+        return None if any(c is None for c in cards) else cards
+    ranks = parse_ranks_text(text)
+    return None if ranks is None else _cards_from_ranks(ranks)
+
+
+def _search(pattern: str, text: str) -> Optional[str]:
+    m = re.search(pattern, text)
+    return m.group(1) if m else None
+
+
+def classify(text: str) -> str:
+    if "这一手你已经决定" in text:
+        return KIND_COMMENTARY
+    if "[叫分]" in text or "叫地主阶段" in text:
+        return KIND_BID
+    if "【候选出牌】" in text or "\n候选 " in text:
+        return KIND_INDEXED
+    return KIND_PLAY
+
+
+def _hand(text: str) -> List[Card]:
+    raw = (
+        _search(r"你的手牌\(\d+张\): ([^\n]*)", text)
+        or _search(r"【你的手牌\(\d+张\)】\n([^\n]*)", text)
+        or _search(r"手牌\d*: ([^\n]*)", text)
+        or ""
+    )
+    return _parse_cards(raw) or []
+
+
+def _last_play(text: str) -> Optional[List[Card]]:
+    raw = _search(r"上一手出牌\(玩家\d+\): ([^\n]*)", text) or _search(r"需压[^:\n]*: ([^\n]*)", text)
+    return _parse_cards(raw) if raw else None
+
+
+def _options(text: str) -> Dict[int, Optional[List[Card]]]:
+    """候选编号 → 牌（0 / PASS 为 None）"""
+    if "【候选出牌】" in text:
+        section = text.split("【候选出牌】", 1)[1].split("【", 1)[0]
+        items = re.findall(r"^(\d+): ([^\n]*)$", section, re.MULTILINE)
+    else:
+        line = text.split("\n候选 ", 1)[1].split("\n", 1)[0]
+        items = [tuple(item.split(":", 1)) for item in line.split(" | ") if ":" in item]
+    options: Dict[int, Optional[List[Card]]] = {}
+    for idx, body in items:
+        options[int(idx)] = None if int(idx) == 0 else _parse_cards(body)
+    return options
+
+
+def _same_ranks(a: Optional[List[Card]], b: Optional[List[Card]]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return sorted(c.rank for c in a) == sorted(c.rank for c in b)
+
+
+# ============================================================
+#  替身服务
+# ============================================================
+
+class FakeLLM:
+    """OpenAI 兼容的 LLM 替身：app 为 FastAPI 应用，transport() 返回进程内传输"""
+
+    def __init__(
+        self,
+        config: Optional[FakeLLMConfig] = None,
+        models: Optional[Dict[str, FakeLLMConfig]] = None,
+        seed: Optional[int] = None,
+        prefix_cache_size: int = 4096,
+    ):
+        self.config = config or FakeLLMConfig()
+        self.models: Dict[str, FakeLLMConfig] = dict(models or {})
+        self.stats = FakeLLMStats()
+        self._rng = random.Random(seed)
+        self._rule = RuleAI()
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()
+        self._prefix_cache_size = prefix_cache_size
+        self.app = self._build_app()
+
+    def config_for(self, model: str) -> FakeLLMConfig:
+        return self.models.get(model, self.config)
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        return StreamingASGITransport(self.app)
+
+    def reset_stats(self) -> None:
+        self.stats = FakeLLMStats()
+        self._prefixes.clear()
+
+    # ----------------------------------------------------------
+    #  应答内容
+    # ----------------------------------------------------------
+
+    def pick_behaviour(self, cfg: FakeLLMConfig) -> str:
+        r = self._rng.random()
+        for behaviour, rate in (
+            (ERROR, cfg.error_rate),
+            (TIMEOUT, cfg.timeout_rate),
+            (MALFORMED, cfg.malformed_rate),
+            (ILLEGAL, cfg.illegal_rate),
+        ):
+            if r < rate:
+                return behaviour
+            r -= rate
+        return VALID
+
+    def reply(self, messages: List[dict], behaviour: str = VALID) -> str:
+        """根据最后一条 user 消息生成应答文本"""
+        text = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        kind = classify(text)
+        self.stats.kinds[kind] += 1
+        strategy = self._rng.choice(_STRATEGIES)
+        if behaviour == MALFORMED:
+            return f'好的，我的决定是 {{"action": "play", "cards": [ 。{strategy}'
+        if kind == KIND_COMMENTARY:
+            return json.dumps({"strategy": strategy}, ensure_ascii=False)
+        if kind == KIND_BID:
+            return json.dumps(
+                {"bid": 5 if behaviour == ILLEGAL else self._bid(text), "strategy": strategy},
+                ensure_ascii=False,
+            )
+        hand = _hand(text)
+        last = _last_play(text)
+        choice = self._play(hand, last)
+        if kind == KIND_INDEXED:
+            options = _options(text)
+            if behaviour == ILLEGAL:
+                move = max(options, default=0) + 5
+            else:
+                move = next((i for i, cards in options.items() if _same_ranks(cards, choice)),
+                            0 if 0 in options else 1)
+            return json.dumps({"move": move, "strategy": strategy}, ensure_ascii=False)
+
+        if behaviour == ILLEGAL:
+            choice = self._illegal(hand)
+        compact = "[出牌]" in text
+        if choice is None:
+            return json.dumps({"action": "pass", "cards": "" if compact else [],
+                               "strategy": strategy}, ensure_ascii=False)
+        cards = ranks_text(choice) if compact else [c.display for c in choice]
+        return json.dumps({"action": "play", "cards": cards, "strategy": strategy},
+                          ensure_ascii=False)
+
+    def _bid(self, text: str) -> int:
+        highest = int(_search(r"【当前最高叫分】(\d)", text) or _search(r"当前最高(\d)分", text) or 0)
+        player = Player(id=0, name="fake", hand=_hand(text))
+        return self._rule.decide_bid(player, GameState(players=[player], highest_bid=highest))
+
+    def _play(self, hand: List[Card], last: Optional[List[Card]]) -> Optional[List[Card]]:
+        player = Player(id=0, name="fake", hand=hand)
+        state = GameState(players=[player], phase=GamePhase.PLAYING,
+                          last_play=detect_hand(last) if last else None)
+        return self._rule.decide_play(player, state)
+
+    @staticmethod
+    def _illegal(hand: List[Card]) -> List[Card]:
+        """不成牌型的组合（最小与最大的两张不同点数的牌）；只剩一种点数时出手里没有的牌"""
+        ranks = sorted({c.rank for c in hand})
+        if len(ranks) >= 2 and ranks[0] != Rank.SMALL_JOKER:
+            low = next(c for c in hand if c.rank == ranks[0])
+            high = next(c for c in hand if c.rank == ranks[-1])
+            return [low, high]
+        missing = Rank.THREE if Rank.THREE not in ranks else Rank.FOUR
+        return [Card(rank=missing, suit=Suit.SPADE)]
+
+    # ----------------------------------------------------------
+    #  延迟与前缀缓存
+    # ----------------------------------------------------------
+
+    def _cached_tokens(self, messages: List[dict]) -> Tuple[int, int]:
+        """返回 (prompt token 数, 命中前缀缓存的 token 数)：按整条消息比较前缀"""
+        total = cached = 0
+        digest = hashlib.sha1()
+        hit = True
+        for m in messages:
+            tokens = estimate_tokens(m["content"])
+            total += tokens
+            digest.update(f"{m['role']}\x00{m['content']}\x01".encode())
+            key = digest.hexdigest()
+            if hit and key in self._prefixes:
+                cached += tokens
+                self._prefixes.move_to_end(key)
+            else:
+                hit = False
+                self._prefixes[key] = None
+        while len(self._prefixes) > self._prefix_cache_size:
+            self._prefixes.popitem(last=False)
+        return total, cached
+
+    def _latency(self, cfg: FakeLLMConfig, uncached_tokens: int) -> float:
+        base = cfg.latency_ms
+        if cfg.latency_sigma > 0:
+            base *= math.exp(self._rng.gauss(0.0, cfg.latency_sigma))
+        return (base + uncached_tokens * cfg.ms_per_token) / 1000
+
+    # ----------------------------------------------------------
+    #  HTTP 接口
+    # ----------------------------------------------------------
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake LLM")
+
+        @app.get("/v1/models")
+        async def list_models():
+            names = sorted(self.models) or ["fake-chat"]
+            return {"object": "list", "data": [{"id": n, "object": "model"} for n in names]}
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            return await self._complete(body)
+
+        @app.get("/stats")
+        async def stats():
+            return self.stats.to_dict()
+
+        @app.put("/admin/config")
+        async def update_config(request: Request):
+            """修改行为配置：?model=xxx 只改该模型，否则改默认配置"""
+            changes = await request.json()
+            model = request.query_params.get("model")
+            names = {f.name for f in fields(FakeLLMConfig)}
+            changes = {k: v for k, v in changes.items() if k in names}
+            if model:
+                self.models[model] = replace(self.config_for(model), **changes)
+            else:
+                self.config = replace(self.config, **changes)
+            return {"ok": True, "applied": changes}
+
+        @app.post("/admin/reset")
+        async def reset():
+            self.reset_stats()
+            return {"ok": True}
+
+        return app
+
+    async def _complete(self, body: dict):
+        model = body.get("model", "fake-chat")
+        messages = body.get("messages", [])
+        cfg = self.config_for(model)
+        behaviour = self.pick_behaviour(cfg)
+        prompt_tokens, cached = self._cached_tokens(messages)
+        delay = self._latency(cfg, prompt_tokens - cached)
+
+        stats = self.stats
+        stats.requests += 1
+        stats.behaviours[behaviour] += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.cached_tokens += cached
+
+        if behaviour == ERROR:
+            await asyncio.sleep(delay)
+            return JSONResponse(
+                {"error": {"message": "injected failure", "type": "server_error"}},
+                status_code=500,
+            )
+        if behaviour == TIMEOUT:
+            delay = cfg.hang_seconds
+
+        content = self.reply(messages, behaviour)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content),
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        meta = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+                "model": model}
+
+        if not body.get("stream"):
+            async with self._in_flight():
+                await asyncio.sleep(delay)
+            return {
+                **meta,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            }
+
+        stats.streams += 1
+
+        async def events():
+            async with self._in_flight():
+                await asyncio.sleep(delay)
+                step = max(1, cfg.stream_chunk_chars)
+                for i in range(0, len(content), step):
+                    if i:
+                        await asyncio.sleep(cfg.stream_chunk_ms / 1000)
+                    delta = {"content": content[i:i + step]}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    yield _sse({**meta, "object": "chat.completion.chunk",
+                                "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                yield _sse({**meta, "object": "chat.completion.chunk",
+                            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                            "usage": usage})
+                yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @asynccontextmanager
+    async def _in_flight(self):
+        stats = self.stats
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            yield
+        finally:
+            stats.in_flight -= 1
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+# ============================================================
+#  进程内传输
+# ============================================================
+
+class _QueueStream(httpx.AsyncByteStream):
+    def __init__(self, queue: asyncio.Queue, task: asyncio.Task, disconnected: asyncio.Event):
+        self._queue = queue
+        self._task = task
+        self._disconnected = disconnected
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self) -> None:
+        self._disconnected.set()
+        if not self._task.done():
+            self._task.cancel()
+
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """
+    进程内调用 ASGI 应用。httpx.ASGITransport 会等应用写完整个响应体才返回，
+    这里改为边生成边交付，流式响应、首字节时间与客户端超时取消的行为与真实网络一致。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([part async for part in request.stream])
+        url = request.url
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "headers": [(k.lower(), v) for k, v in request.headers.raw],
+            "scheme": url.scheme,
+            "path": unquote(url.path),
+            "raw_path": url.raw_path.split(b"?")[0],
+            "query_string": url.query,
+            "root_path": "",
+            "server": (url.host, url.port or 80),
+            "client": ("127.0.0.1", 0),
+        }
+        queue: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        started: asyncio.Future = asyncio.get_running_loop().create_future()
+        body_sent = False
+
+        async def receive() -> dict:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                started.set_result((message["status"], message.get("headers", [])))
+            elif message["type"] == "http.response.body":
+                if message.get("body"):
+                    await queue.put(message["body"])
+                if not message.get("more_body", False):
+                    await queue.put(None)
+
+        async def run() -> None:
+            try:
+                await self.app(scope, receive, send)
+            except Exception as e:
+                if not started.done():
+                    started.set_exception(e)
+            finally:
+                await queue.put(None)
+
+        task = asyncio.ensure_future(run())
+        try:
+            status, headers = await started
+        except BaseException:
+            task.cancel()
+            raise
+        return httpx.Response(status, headers=headers, stream=_QueueStream(queue, task, disconnected))
+
+
+# ============================================================
+#  独立运行
+# ============================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--illegal", type=float, default=0.0)
+    parser.add_argument("--error", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        ms_per_token=args.ms_per_token,
+        malformed_rate=args.malformed,
+        illegal_rate=args.illegal,
+        error_rate=args.error,
+        timeout_rate=args.timeout,
+        hang_seconds=args.hang_seconds,
+    )
+    uvicorn.run(FakeLLM(config, seed=args.seed).app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
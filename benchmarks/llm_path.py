@@ -0,0 +1,142 @@
+"""LlmAI 链路基准：三位 LLM 玩家对本地替身服务打若干局，统计决策耗时、fallback、对冲、token 用量与连接复用
+
+用法：
+    python -m benchmarks.llm_path --games 5 --latency-ms 300 --malformed 0.05
+    python -m benchmarks.llm_path --games 5 --hedge request --backup-latency-ms 150 --seed 7
+    python -m benchmarks.llm_path --base-url http://127.0.0.1:8001/v1   # 压测独立运行的替身服务
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+from src.engine.card import Card
+from src.game.player import Player
+from src.game.game_state import GameState
+from src.game.controller import GameController
+from src.ai.client_pool import ClientRegistry
+from src.ai.latency import HEDGE_OFF, HedgePolicy, LatencyRegistry
+from src.ai.routing import BreakerRegistry
+from src.ai.metrics import decision_stats
+from src.ai.telemetry import Telemetry
+from src.ai.llm_ai import LlmAI, PROMPT_FREE, PROMPT_VERBOSE
+from benchmarks.fake_llm import FAKE_BASE_URL, FakeLLM, FakeLLMConfig
+
+CHARACTERS = ["烈焰哥🔥", "冰山姐❄️", "戏精弟🎭"]
+PRIMARY_MODEL = "fake-chat"
+BACKUP_MODEL = "fake-backup"
+
+
+class BlockingAI:
+    """同步 AIStrategy 适配：GameController 在工作线程中运行，LLM 调用提交回事件循环执行"""
+
+    def __init__(self, ai: LlmAI, loop: asyncio.AbstractEventLoop):
+        self.ai = ai
+        self.loop = loop
+
+    def decide_bid(self, player: Player, state: GameState) -> int:
+        fut = asyncio.run_coroutine_threadsafe(self.ai.async_decide_bid(player, state), self.loop)
+        return fut.result()[0]
+
+    def decide_play(self, player: Player, state: GameState) -> Optional[List[Card]]:
+        fut = asyncio.run_coroutine_threadsafe(self.ai.async_decide_play(player, state), self.loop)
+        return fut.result()[0]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    fake = None
+    base_url = args.base_url
+    if base_url is None:
+        primary = FakeLLMConfig(
+            latency_ms=args.latency_ms,
+            latency_sigma=args.latency_sigma,
+            malformed_rate=args.malformed,
+            illegal_rate=args.illegal,
+            error_rate=args.error,
+            timeout_rate=args.timeout,
+        )
+        models = {PRIMARY_MODEL: primary}
+        if args.backup_latency_ms is not None:
+            models[BACKUP_MODEL] = FakeLLMConfig(
+                latency_ms=args.backup_latency_ms, latency_sigma=args.latency_sigma
+            )
+        fake = FakeLLM(primary, models=models, seed=args.seed)
+        registry = ClientRegistry(max_connections=args.max_connections, transport=fake.transport())
+        base_url = FAKE_BASE_URL
+    else:
+        registry = ClientRegistry(max_connections=args.max_connections)
+
+    endpoints = [(base_url, PRIMARY_MODEL, "fake-key")]
+    if args.backup_latency_ms is not None:
+        endpoints.append((base_url, BACKUP_MODEL, "fake-key"))
+    latency = LatencyRegistry()
+    breakers = BreakerRegistry()
+    hedge = HedgePolicy(mode=args.hedge, max_timeout=args.timeout_cap)
+    telemetry = Telemetry()
+    decision_stats.reset()
+
+    ais = [
+        LlmAI(
+            name, registry=registry, endpoints=endpoints, latency=latency, breakers=breakers,
+            hedge=hedge, stream=args.stream, prompt_mode=args.prompt_mode,
+            prompt_encoding=args.encoding, session_budget=args.session_budget,
+            telemetry=telemetry,
+        )
+        for name in CHARACTERS
+    ]
+    loop = asyncio.get_running_loop()
+    strategies = [BlockingAI(ai, loop) for ai in ais]
+
+    started = time.perf_counter()
+    for _ in range(args.games):
+        await asyncio.to_thread(GameController(CHARACTERS, strategies).run_game)
+    elapsed = time.perf_counter() - started
+
+    for ai in ais:
+        for route in ai.routes:
+            route.breaker.cancel_probe()
+    report = {
+        "games": args.games,
+        "wall_s": round(elapsed, 2),
+        "decisions": decision_stats.snapshot(),
+        "telemetry": telemetry.snapshot(),
+        "latency": latency.snapshot(),
+        "breakers": breakers.snapshot(),
+        "pool": registry.snapshot(),
+    }
+    if fake is not None:
+        report["server"] = fake.stats.to_dict()
+    await registry.aclose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--base-url", default=None, help="外部替身服务地址（默认进程内运行）")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--backup-latency-ms", type=float, default=None,
+                        help="同时配置备用模型（对冲 / 路由基准）")
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--illegal", type=float, default=0.0)
+    parser.add_argument("--error", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=0.0)
+    parser.add_argument("--timeout-cap", type=float, default=10.0)
+    parser.add_argument("--hedge", default=HEDGE_OFF)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--prompt-mode", default=PROMPT_FREE)
+    parser.add_argument("--encoding", default=PROMPT_VERBOSE)
+    parser.add_argument("--session-budget", type=int, default=0)
+    parser.add_argument("--max-connections", type=int, default=10)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
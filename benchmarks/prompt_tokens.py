@@ -0,0 +1,154 @@
+"""Prompt 体积基准：对比 verbose / compact 编码每回合的 prompt token 数（可选实测延迟）
+
+用法：
+    python -m benchmarks.prompt_tokens --games 20
+    python -m benchmarks.prompt_tokens --games 2 --live   # 使用 AI_PLAYER1_* 实际调用，统计延迟与缓存命中
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from src.engine.card import Card
+from src.game.player import Player
+from src.game.game_state import GameState
+from src.game.controller import GameController
+from src.ai.rule_ai import RuleAI
+from src.ai import compact_prompt
+from src.ai.session import GameSession, estimate_tokens
+from src.ai.llm_ai import (
+    CHARACTER_PROMPTS, PROMPT_COMPACT, PROMPT_VERBOSE, _build_play_prompt, _as_messages,
+)
+
+CHARACTER = "烈焰哥🔥"
+SESSION = "session"
+MODES = (PROMPT_VERBOSE, PROMPT_COMPACT, SESSION)
+
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except ImportError:  # 未安装 tiktoken 时用近似估算
+    _ENC = None
+
+
+def count_tokens(text: str) -> int:
+    """token 数：有 tiktoken 时精确计算，否则按 中日韩字符≈1、其余约 4 字符≈1 估算"""
+    if _ENC is not None:
+        return len(_ENC.encode(text))
+    return estimate_tokens(text)
+
+
+class RecordingAI:
+    """委托 RuleAI 出牌，同时记录每回合两种编码下的 prompt"""
+
+    def __init__(self, session_budget: int):
+        self._rule = RuleAI()
+        self.session = GameSession(session_budget)
+        self.turns: List[Dict[str, list]] = []
+
+    def decide_bid(self, player: Player, state: GameState) -> int:
+        return self._rule.decide_bid(player, state)
+
+    def decide_play(self, player: Player, state: GameState) -> Optional[List[Card]]:
+        system = compact_prompt.system_prompt(CHARACTER_PROMPTS[CHARACTER], False)
+        turn = compact_prompt.play_turn(player, state)
+        history, snap = self.session.prepare(player, state, turn)
+        self.session.commit(snap)
+        self.turns.append({
+            PROMPT_VERBOSE: _as_messages(_build_play_prompt(player, state, CHARACTER)),
+            PROMPT_COMPACT: compact_prompt.messages(system, turn),
+            SESSION: [{"role": "system", "content": system}] + history,
+        })
+        return self._rule.decide_play(player, state)
+
+
+def collect(games: int, session_budget: int) -> List[Dict[str, list]]:
+    turns: List[Dict[str, list]] = []
+    for _ in range(games):
+        ais = [RecordingAI(session_budget) for _ in range(3)]
+        GameController(["A", "B", "C"], ais).run_game()
+        for ai in ais:
+            turns.extend(ai.turns)
+    return turns
+
+
+def _cached_prefix(prev: Optional[list], cur: list) -> int:
+    """与同一人格上一回合相同的前缀消息 token 数（服务商可缓存的部分）"""
+    if prev is None:
+        return 0
+    n = 0
+    for a, b in zip(prev, cur):
+        if a != b:
+            break
+        n += count_tokens(b["content"])
+    return n
+
+
+def report_sizes(turns: List[Dict[str, list]]) -> None:
+    print(f"回合数: {len(turns)}  (token 计数: {'tiktoken' if _ENC else '近似估算'})")
+    verbose = None
+    for mode in MODES:
+        total, fresh = [], []
+        prev = None
+        for t in turns:
+            size = sum(count_tokens(m["content"]) for m in t[mode])
+            total.append(size)
+            fresh.append(size - _cached_prefix(prev, t[mode]))
+            prev = t[mode]
+        if verbose is None:
+            verbose = statistics.mean(fresh)
+        print(f"  {mode:8s} 每回合 prompt: 平均 {statistics.mean(total):6.1f}  "
+              f"p90 {sorted(total)[int(len(total) * 0.9)]:4d}  "
+              f"未命中前缀缓存 {statistics.mean(fresh):6.1f}  "
+              f"(较 verbose 降低 {1 - statistics.mean(fresh) / verbose:.0%})")
+
+
+async def measure_live(turns: List[Dict[str, list]], samples: int) -> None:
+    """交替发送两种编码的 prompt，统计延迟与服务商上报的 prompt/缓存 token"""
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(
+        api_key=os.environ["AI_PLAYER1_API_KEY"],
+        base_url=os.getenv("AI_PLAYER1_BASE_URL", "https://api.deepseek.com/v1"),
+    )
+    model = os.getenv("AI_PLAYER1_MODEL", "deepseek-chat")
+    stats: Dict[str, Dict[str, list]] = {
+        m: {"ms": [], "prompt": [], "cached": []} for m in MODES
+    }
+    for turn in turns[:samples]:
+        for mode in MODES:
+            started = time.perf_counter()
+            resp = await client.chat.completions.create(
+                model=model, messages=turn[mode], temperature=0.7, max_tokens=128,
+            )
+            stats[mode]["ms"].append((time.perf_counter() - started) * 1000)
+            usage = resp.usage
+            if usage is not None:
+                stats[mode]["prompt"].append(usage.prompt_tokens)
+                details = getattr(usage, "prompt_tokens_details", None)
+                stats[mode]["cached"].append(getattr(details, "cached_tokens", 0) or 0)
+    for mode, s in stats.items():
+        print(f"  {mode:8s} 延迟 p50 {statistics.median(s['ms']):7.1f}ms  "
+              f"prompt_tokens {statistics.mean(s['prompt'] or [0]):6.1f}  "
+              f"cached {statistics.mean(s['cached'] or [0]):6.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--live", action="store_true", help="实际调用 LLM 统计延迟")
+    parser.add_argument("--samples", type=int, default=20, help="--live 时发送的回合数")
+    parser.add_argument("--session-budget", type=int, default=600, help="会话历史 token 预算")
+    args = parser.parse_args()
+
+    turns = collect(args.games, args.session_budget)
+    report_sizes(turns)
+    if args.live:
+        asyncio.run(measure_live(turns, args.samples))
+
+
+if __name__ == "__main__":
+    main()
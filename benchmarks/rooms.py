@@ -0,0 +1,143 @@
+"""多房间基准：单进程同时运行多张牌桌（规则 AI，不调用 LLM），统计每个房间的内存与 CPU 开销、事件循环延迟，
+并换算正常节奏下单核可承载的房间数
+
+用法：
+    python -m benchmarks.rooms --rooms 32 --games 3 --viewers 5
+    python -m benchmarks.rooms --rooms 64 --games 1 --pace 0.05     # 按 1/20 节奏真实并发，观察事件循环延迟
+    python -m benchmarks.rooms --rooms 32 --format msgpack          # 观众使用 MessagePack 二进制编码
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+from typing import List
+
+from src.ai.llm_ai import LlmAI
+from src.web.outbound import Broadcaster
+from src.web.room import IDLE_OFF, PLAYER_NAMES, Room, RoomManager
+from src.web.server import run_game_async
+from src.web.wire import FORMAT_JSON, WIRE_FORMATS
+
+
+class NullWebSocket:
+    """只计数不保存的观众连接"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, data: str) -> None:
+        self.messages += 1
+        self.bytes += len(data.encode("utf-8"))
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.messages += 1
+        self.bytes += len(data)
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def make_room(room_id: str, pace: float, queue: int) -> Room:
+    strategies = [LlmAI(character=name) for name in PLAYER_NAMES]
+    # 基准允许 0 观众：关闭无人观看挂起，测量的是对局本身的开销
+    return Room(room_id, strategies=strategies, hub=Broadcaster(max_queue=queue), pace=pace,
+                idle_policy=IDLE_OFF)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - t - interval) * 1000)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    manager = RoomManager(
+        factory=lambda rid: make_room(rid, args.pace, args.queue), max_rooms=args.rooms
+    )
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rooms = [manager.get_or_create(f"room-{i}") for i in range(args.rooms)]
+    viewers = []
+    for room in rooms:
+        for _ in range(args.viewers):
+            ws = NullWebSocket()
+            room.subscribe(ws, wire_format=args.format)
+            viewers.append(ws)
+    per_room_bytes = (tracemalloc.get_traced_memory()[0] - before) / args.rooms
+    tracemalloc.stop()
+
+    async def play(room: Room) -> None:
+        for _ in range(args.games):
+            await room.run_exclusive(run_game_async)
+
+    lag: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.ensure_future(measure_lag(lag, stop))
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(play(room) for room in rooms))
+    while any(room.hub.queued for room in rooms):
+        await asyncio.sleep(0.001)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    stop.set()
+    await lag_task
+
+    games = args.rooms * args.games
+    cpu_per_game = cpu / games
+    nominal_game = sum(room.nominal_wait for room in rooms) / games
+    disconnects = sum(sum(room.hub.disconnects.values()) for room in rooms)
+    manager.close()
+    return {
+        "rooms": args.rooms,
+        "games": games,
+        "viewers_per_room": args.viewers,
+        "pace": args.pace,
+        "format": args.format,
+        "wall_s": round(wall, 2),
+        "cpu_s": round(cpu, 2),
+        "room_memory_kb": round(per_room_bytes / 1024, 1),
+        "cpu_ms_per_game": round(cpu_per_game * 1000, 1),
+        "nominal_game_s": round(nominal_game, 1),
+        # 正常节奏下一局持续 nominal_game 秒，期间占用 cpu_per_game 秒 CPU
+        "max_rooms_per_core": int(nominal_game / cpu_per_game) if cpu_per_game else None,
+        "messages_per_viewer": round(sum(v.messages for v in viewers) / max(len(viewers), 1), 1),
+        "bytes_per_game_per_viewer": round(sum(v.bytes for v in viewers) / max(len(viewers), 1) / args.games),
+        "loop_lag_ms": {"p50": round(percentile(lag, 0.5), 2), "p99": round(percentile(lag, 0.99), 2),
+                        "max": round(max(lag, default=0.0), 2)},
+        "slow_client_disconnects": disconnects,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=16)
+    parser.add_argument("--games", type=int, default=2, help="每个房间连续对局数")
+    parser.add_argument("--viewers", type=int, default=3, help="每个房间的观众连接数")
+    parser.add_argument("--pace", type=float, default=0.0,
+                        help="节奏系数（0=不等待，纯 CPU 开销；1=正常直播节奏）")
+    parser.add_argument("--format", choices=WIRE_FORMATS, default=FORMAT_JSON, help="观众连接的线上编码")
+    parser.add_argument("--queue", type=int, default=100000,
+                        help="每个连接的发送队列上限（pace=0 时需足够大，否则整局消息会溢出）")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""LLM 客户端池 - 按端点共享连接池的 AsyncOpenAI 客户端，带优先级并发限制与预热"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from src.ai.dispatcher import Dispatcher, RateBudget
+
+logger = logging.getLogger(__name__)
+
+# 请求优先级（数值越小越优先）：当前回合 > 投机预取 > 解说
+PRIORITY_TURN = 0
+PRIORITY_SPECULATIVE = 1
+PRIORITY_COMMENTARY = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_TURN: "turn",
+    PRIORITY_SPECULATIVE: "speculative",
+    PRIORITY_COMMENTARY: "commentary",
+}
+
+# 当前协程发起 LLM 请求的优先级（asyncio Task 创建时复制上下文，预取任务自动继承）
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "llm_request_priority", default=PRIORITY_TURN
+)
+
+# 预热请求超时（秒）
+WARM_TIMEOUT = 5
+
+
+def current_priority() -> int:
+    return _request_priority.get()
+
+
+@contextmanager
+def request_priority(priority: int):
+    """在 with 块内创建的 Task / 发起的 LLM 请求使用指定优先级"""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+# ============================================================
+#  优先级并发限制
+# ============================================================
+
+class PriorityLimiter:
+    """
+    并发上限为 limit 的优先级信号量：名额释放时优先唤醒优先级最高（数值最小）的等待者，
+    同优先级先到先得。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 名额已转交但调用方被取消：转交给下一位
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)  # 名额直接转交，active 不变
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# ============================================================
+#  端点
+# ============================================================
+
+@dataclass
+class EndpointStats:
+    """单个端点的请求与连接统计"""
+    requests: int = 0
+    connects: int = 0          # 新建 TCP 连接数（连接复用越好越少）
+    tls_handshakes: int = 0
+    warmed: bool = False
+    first_call_ms: Optional[float] = None
+    total_ms: float = 0.0
+    waits: Dict[str, int] = field(default_factory=dict)
+    max_wait_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connects": self.connects,
+            "tls_handshakes": self.tls_handshakes,
+            "warmed": self.warmed,
+            "first_call_ms": None if self.first_call_ms is None else round(self.first_call_ms, 1),
+            "avg_ms": round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+            "waits": dict(self.waits),
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+class Endpoint:
+    """一个 (base_url, api_key) 对应的共享客户端：连接池 + 优先级并发限制 + 请求调度"""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        max_connections: int,
+        concurrency: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        budget: Optional[RateBudget] = None,
+        window: float = 0.0,
+        max_batch: int = 32,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.stats = EndpointStats()
+        self.http_client = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            event_hooks={"request": [self._attach_trace]},
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self.http_client,
+        )
+        self.limiter = PriorityLimiter(concurrency)
+        self.budget = budget
+        self.dispatcher = Dispatcher(self.request, budget, window, max_batch)
+
+    async def _attach_trace(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.stats.connects += 1
+        elif event == "connection.start_tls.complete":
+            self.stats.tls_handshakes += 1
+
+    @asynccontextmanager
+    async def request(self, priority: Optional[int] = None):
+        """占用一个并发名额发起请求，统计排队与耗时"""
+        if priority is None:
+            priority = current_priority()
+        queued = time.perf_counter()
+        async with self.limiter.slot(priority):
+            started = time.perf_counter()
+            wait_ms = (started - queued) * 1000
+            if wait_ms >= 1:
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                self.stats.waits[name] = self.stats.waits.get(name, 0) + 1
+                self.stats.max_wait_ms = max(self.stats.max_wait_ms, wait_ms)
+            try:
+                yield self.client
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                self.stats.requests += 1
+                self.stats.total_ms += elapsed
+                if self.stats.first_call_ms is None:
+                    self.stats.first_call_ms = elapsed
+
+    async def dispatch(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        priority: Optional[int] = None,
+        tokens: int = 0,
+        key: Optional[Hashable] = None,
+    ) -> Any:
+        """经调度器发起请求：聚合窗口 + 相同请求合并 + 速率预算，再占用并发名额执行 call"""
+        if priority is None:
+            priority = current_priority()
+        return await self.dispatcher.submit(call, priority, tokens, key)
+
+    async def admit(self, tokens: int) -> None:
+        """不经调度器的请求（如流式）在发出前扣除速率预算"""
+        if self.budget is not None and self.budget.limited:
+            await self.budget.acquire(tokens)
+
+    async def warm(self, connections: int, api_key: str) -> None:
+        """并发发起轻量请求（GET /models）建立并保持连接，失败忽略"""
+        url = f"{self.base_url}/models"
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        async def _one():
+            try:
+                await self.http_client.get(url, headers=headers, timeout=WARM_TIMEOUT)
+            except Exception as e:
+                logger.debug("预热 %s 失败: %s", self.base_url, e)
+
+        await asyncio.gather(*(_one() for _ in range(connections)))
+        self.stats.warmed = True
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+
+# ============================================================
+#  注册表
+# ============================================================
+
+class ClientRegistry:
+    """进程级客户端注册表：相同 (base_url, api_key) 的玩家共享一个端点
+
+    transport 用于替换底层传输（如进程内的本地 LLM 替身服务），默认走真实网络。
+    同一 API key 的所有端点共享一份速率预算（rpm / tpm，0 为不限）。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        concurrency: Optional[int] = None,
+        warm_connections: int = 1,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        rpm: int = 0,
+        tpm: int = 0,
+        dispatch_window: float = 0.0,
+        max_batch: int = 32,
+    ):
+        self.max_connections = max_connections
+        self.concurrency = concurrency or max_connections
+        self.warm_connections = warm_connections
+        self.transport = transport
+        self.rpm = rpm
+        self.tpm = tpm
+        self.dispatch_window = dispatch_window
+        self.max_batch = max_batch
+        self._endpoints: Dict[Tuple[str, str], Endpoint] = {}
+        self._budgets: Dict[str, RateBudget] = {}
+
+    def get(self, base_url: str, api_key: str) -> Endpoint:
+        key = (base_url.rstrip("/"), api_key)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            budget = self._budgets.get(api_key)
+            if budget is None:
+                budget = self._budgets[api_key] = RateBudget(self.rpm, self.tpm)
+            endpoint = Endpoint(
+                base_url, api_key, self.max_connections, self.concurrency, self.transport,
+                budget, self.dispatch_window, self.max_batch,
+            )
+            self._endpoints[key] = endpoint
+            logger.info("LLM 端点 %s: 新建共享客户端（max_connections=%d）",
+                        key[0], self.max_connections)
+        return endpoint
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    async def warm(self) -> None:
+        """服务启动时预热所有端点的连接"""
+        if self.warm_connections <= 0:
+            return
+        await asyncio.gather(*(
+            ep.warm(min(self.warm_connections, self.max_connections), api_key)
+            for (_, api_key), ep in self._endpoints.items()
+        ))
+
+    async def aclose(self) -> None:
+        for ep in self._endpoints.values():
+            await ep.aclose()
+        self._endpoints.clear()
+
+    def snapshot(self) -> List[dict]:
+        """按端点导出连接与排队统计（不含 API key）"""
+        return [
+            {"base_url": base_url, "in_flight": ep.limiter.active,
+             "waiting": ep.limiter.waiting, **ep.stats.to_dict(),
+             "dispatch": ep.dispatcher.to_dict(), "budget": ep.budget.to_dict()}
+            for (base_url, _), ep in self._endpoints.items()
+        ]
+
+
+def create_client_registry() -> ClientRegistry:
+    """根据环境变量创建客户端注册表。
+
+    环境变量：
+      LLM_MAX_CONNECTIONS：每个端点的连接池上限（默认 10）
+      LLM_ENDPOINT_CONCURRENCY：每个端点的并发请求上限（默认同连接池上限）
+      LLM_WARM_CONNECTIONS：启动时每个端点预热的连接数（默认 1，0 关闭）
+      LLM_RPM / LLM_TPM：每个 API key 的每分钟请求数 / token 数上限（默认 0=不限）
+      LLM_DISPATCH_WINDOW_MS：多桌请求的聚合窗口（毫秒，默认 0=不等待，仅合并同一时刻的请求）
+      LLM_DISPATCH_MAX_BATCH：每个聚合窗口最多发出的请求数（默认 32）
+    """
+    max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+    concurrency = int(os.getenv("LLM_ENDPOINT_CONCURRENCY", "0")) or None
+    return ClientRegistry(
+        max_connections=max_connections,
+        concurrency=concurrency,
+        warm_connections=int(os.getenv("LLM_WARM_CONNECTIONS", "1")),
+        rpm=int(os.getenv("LLM_RPM", "0")),
+        tpm=int(os.getenv("LLM_TPM", "0")),
+        dispatch_window=float(os.getenv("LLM_DISPATCH_WINDOW_MS", "0")) / 1000,
+        max_batch=int(os.getenv("LLM_DISPATCH_MAX_BATCH", "32")),
+    )
+
+
+# 进程级单例（首次使用时按环境变量创建，保证 .env 已加载）
+_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    global _registry
+    if _registry is None:
+        _registry = create_client_registry()
+    return _registry
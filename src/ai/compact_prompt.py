@@ -0,0 +1,85 @@
+"""紧凑 Prompt - 固定 system 前缀（可被服务商前缀缓存）+ 点数记号表示的每回合增量"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+from src.engine.hand_type import PlayedHand
+from src.game.player import Player
+from src.game.game_state import GameState
+from src.ai.encoding import ranks_text
+
+# 花色不影响牌型与大小，紧凑编码只传点数；LLM 给出点数后由程序挑选具体的牌
+_NOTATION = "记号：T=10 w=小王 W=大王，不分花色，同点连写，如 33 5 777 JJ。"
+
+_RULES = (
+    "牌型：单、对、三、三带一/二、顺子≥5、连对≥3、飞机(带单/对)、四带二、炸弹、火箭wW。"
+    "跟牌须同型更大或炸弹；自由出牌不能 pass。"
+)
+
+_FORMAT_FREE = '出牌返回 {"action":"play|pass","cards":"777 3","strategy":"..."}'
+
+_FORMAT_INDEXED = '出牌返回 {"move":候选编号,"strategy":"..."}，0=不出'
+
+_FORMAT_BID = '叫分返回 {"bid":0-3,"strategy":"..."}'
+
+
+@lru_cache(maxsize=None)
+def system_prompt(char_prompt: str, indexed: bool) -> str:
+    """同一人格、同一模式下逐字节不变，供服务商前缀缓存"""
+    return "\n".join([
+        char_prompt,
+        "你在玩斗地主，只返回 JSON，strategy 为15字内符合性格的一句话。",
+        _NOTATION,
+        _RULES,
+        _FORMAT_INDEXED if indexed else _FORMAT_FREE,
+        _FORMAT_BID,
+    ])
+
+
+def _role(p: Player) -> str:
+    return "地主" if p.is_landlord else "农民"
+
+
+def _others(player: Player, state: GameState) -> str:
+    """下家 / 上家的角色与剩余张数"""
+    n = len(state.players)
+    nxt = state.players[(player.id + 1) % n]
+    prv = state.players[(player.id - 1) % n]
+    return f"下家{_role(nxt)}{nxt.hand_size}张 上家{_role(prv)}{prv.hand_size}张"
+
+
+def _last(player: Player, state: GameState) -> str:
+    if state.last_play is None:
+        return "自由出牌"
+    owner = state.players[state.last_player] if state.last_player is not None else None
+    side = ""
+    if owner is not None:
+        side = "队友" if owner.is_landlord == player.is_landlord else "对手"
+    return f"需压{side}: {ranks_text(state.last_play.cards)}"
+
+
+def play_turn(player: Player, state: GameState) -> str:
+    lines = [
+        f"[出牌] {_role(player)} 手牌{player.hand_size}: {ranks_text(player.hand)}",
+        f"{_others(player, state)} 已出炸弹{state.bomb_count}",
+        _last(player, state),
+    ]
+    return "\n".join(lines)
+
+
+def indexed_play_turn(player: Player, state: GameState, moves: List[PlayedHand]) -> str:
+    options = [f"{i}:{ranks_text(m.cards)}" for i, m in enumerate(moves, start=1)]
+    if state.last_play is not None:
+        options.insert(0, "0:pass")
+    return play_turn(player, state) + "\n候选 " + " | ".join(options)
+
+
+def bid_turn(player: Player, state: GameState) -> str:
+    return f"[叫分] 手牌: {ranks_text(player.hand)}\n当前最高{state.highest_bid}分"
+
+
+def messages(system: str, user: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
@@ -0,0 +1,289 @@
+"""LLM 决策缓存 - 按花色无关的信息集 + 人格 + 模型缓存出牌决策（SQLite 持久化）"""
+
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.engine.card import Card, Rank
+from src.engine.hand_detector import detect_hand, can_beat
+from src.game.player import Player
+from src.game.game_state import GameState
+from src.ai.encoding import info_set_key, ranks_to_text, parse_ranks_text, pick_cards
+
+logger = logging.getLogger(__name__)
+
+# 缓存条目：(ranks_or_None, strategy, created_at)
+_Entry = Tuple[Optional[List[Rank]], str, float]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    key TEXT PRIMARY KEY,
+    ranks TEXT,
+    strategy TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class CacheCounter:
+    """单个人格的缓存统计"""
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0    # 按采样率跳过缓存（保持打法多样性）
+    stores: int = 0
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class DecisionCache:
+    """
+    出牌决策缓存：内存 LRU（命中亚毫秒）+ SQLite 持久化（跨直播场次复用）。
+
+    - max_entries：LRU 容量，超出淘汰最久未访问的条目
+    - ttl：条目有效期（秒），过期视为未命中并删除
+    - sample_rate：查询缓存的概率，其余请求直接走 LLM 并刷新条目，保持打法多样
+    - flush_interval：写入与删除先记在内存中，在事件循环里每隔 flush_interval 秒合并成一次事务落盘
+      （多房间并发时不再每个决策同步提交一次；无事件循环时立即落盘）
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        max_entries: int = 10000,
+        ttl: float = 7 * 24 * 3600,
+        sample_rate: float = 1.0,
+        flush_interval: float = 1.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sample_rate = sample_rate
+        self._lru: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self.flush_interval = flush_interval
+        # 待落盘的写入（key → 行）与删除
+        self._pending: Dict[str, tuple] = {}
+        self._deleted: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.stats: Dict[str, CacheCounter] = defaultdict(CacheCounter)
+
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._load()
+
+    # ----------------------------------------------------------
+    #  查询与写入
+    # ----------------------------------------------------------
+
+    @staticmethod
+    def make_key(persona: str, model: str, player: Player, state: GameState) -> str:
+        return f"{persona}|{model}|{info_set_key(player, state)}"
+
+    def lookup(
+        self, persona: str, model: str, player: Player, state: GameState
+    ) -> Optional[Tuple[Optional[List[Card]], str]]:
+        """查询缓存，命中返回 (cards_or_None, strategy)，cards 已映射为玩家手中的具体牌"""
+        counter = self.stats[persona]
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            counter.bypassed += 1
+            return None
+
+        key = self.make_key(persona, model, player, state)
+        entry = self._lru.get(key)
+        now = time.time()
+        if entry is None or now - entry[2] > self.ttl:
+            if entry is not None:
+                self._delete(key)
+            counter.misses += 1
+            return None
+
+        ranks, strategy, _ = entry
+        valid, cards = self._to_cards(ranks, player, state)
+        if not valid:
+            # 理论上不会发生（键已编码手牌与上一手），保险起见视为未命中
+            self._delete(key)
+            counter.misses += 1
+            return None
+
+        self._lru.move_to_end(key)
+        self._touched[key] = now
+        counter.hits += 1
+        return cards, strategy
+
+    def store(
+        self,
+        persona: str,
+        model: str,
+        player: Player,
+        state: GameState,
+        cards: Optional[List[Card]],
+        strategy: str,
+    ) -> None:
+        """写入一条经过验证的 LLM 决策"""
+        self.store_key(persona, self.make_key(persona, model, player, state), cards, strategy)
+
+    def store_key(
+        self, persona: str, key: str, cards: Optional[List[Card]], strategy: str
+    ) -> None:
+        """按预先计算的键写入（局面已推进、解说稍后才生成完毕时使用）"""
+        ranks = [c.rank for c in cards] if cards is not None else None
+        now = time.time()
+        self._lru[key] = (ranks, strategy, now)
+        self._lru.move_to_end(key)
+        self._pending[key] = (key, None if ranks is None else ranks_to_text(ranks), strategy, now, now)
+        self._deleted.discard(key)
+        self.stats[persona].stores += 1
+        self._evict()
+        self._schedule_flush()
+
+    def flush(self) -> None:
+        """将待写入 / 删除的条目与内存中的访问时间在一个事务内写回 SQLite（LRU 顺序跨进程保留）"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not (self._pending or self._deleted or self._touched):
+            return
+        if self._deleted:
+            self._db.executemany("DELETE FROM decisions WHERE key = ?", [(k,) for k in self._deleted])
+            self._deleted.clear()
+        if self._pending:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)", list(self._pending.values())
+            )
+            self._pending.clear()
+        if self._touched:
+            self._db.executemany(
+                "UPDATE decisions SET accessed = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()],
+            )
+            self._touched.clear()
+        self._db.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def snapshot(self) -> dict:
+        """按人格导出命中统计"""
+        return {
+            "entries": len(self._lru),
+            "personas": {name: c.to_dict() for name, c in self.stats.items()},
+        }
+
+    # ----------------------------------------------------------
+    #  内部实现
+    # ----------------------------------------------------------
+
+    def _load(self) -> None:
+        """启动时按最近访问顺序载入未过期条目"""
+        cutoff = time.time() - self.ttl
+        self._db.execute("DELETE FROM decisions WHERE created < ?", (cutoff,))
+        rows = self._db.execute(
+            "SELECT key, ranks, strategy, created FROM decisions "
+            "ORDER BY accessed DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, ranks, strategy, created in reversed(rows):
+            parsed = None if ranks is None else parse_ranks_text(ranks)
+            self._lru[key] = (parsed, strategy, created)
+        self._db.commit()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+    def _evict(self) -> None:
+        while len(self._lru) > self.max_entries:
+            key, _ = self._lru.popitem(last=False)
+            self._forget(key)
+
+    def _delete(self, key: str) -> None:
+        self._lru.pop(key, None)
+        self._forget(key)
+        self._schedule_flush()
+
+    def _forget(self, key: str) -> None:
+        self._touched.pop(key, None)
+        self._pending.pop(key, None)
+        self._deleted.add(key)
+
+    @staticmethod
+    def _to_cards(
+        ranks: Optional[List[Rank]], player: Player, state: GameState
+    ) -> Tuple[bool, Optional[List[Card]]]:
+        """点数 → 手牌中的具体牌并复核合法性，返回 (是否合法, cards_or_None)"""
+        if ranks is None:
+            return state.last_play is not None, None
+        cards = pick_cards(player.hand, ranks)
+        if cards is None:
+            return False, None
+        hand = detect_hand(cards)
+        if hand is None:
+            return False, None
+        if state.last_play is not None and not can_beat(hand, state.last_play):
+            return False, None
+        return True, cards
+
+
+# ============================================================
+#  工厂函数：从环境变量创建决策缓存
+# ============================================================
+
+def create_decision_cache() -> Optional[DecisionCache]:
+    """根据环境变量创建决策缓存（未配置 LLM_CACHE_PATH 时返回 None）。
+
+    环境变量：
+      LLM_CACHE_PATH：SQLite 文件路径
+      LLM_CACHE_MAX_ENTRIES：LRU 容量
+      LLM_CACHE_TTL：有效期（秒）
+      LLM_CACHE_SAMPLE_RATE：查询缓存的概率（0~1）
+    """
+    path = os.getenv("LLM_CACHE_PATH", "")
+    if not path:
+        return None
+    return DecisionCache(
+        path=path,
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+        ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+        sample_rate=float(os.getenv("LLM_CACHE_SAMPLE_RATE", "0.8")),
+    )
+
+
+# 进程级单例：多个房间的玩家共享同一个缓存（首次使用时按环境变量创建）
+_cache: Optional[DecisionCache] = None
+_cache_created = False
+
+
+def get_decision_cache() -> Optional[DecisionCache]:
+    global _cache, _cache_created
+    if not _cache_created:
+        _cache = create_decision_cache()
+        _cache_created = True
+    return _cache
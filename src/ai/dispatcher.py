@@ -0,0 +1,248 @@
+"""请求调度 - 多桌共享端点时的聚合窗口、相同请求合并与按 API key 的全局速率预算"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 服务端限流（429）且未给出 Retry-After 时的暂停时长（秒）
+DEFAULT_RATE_LIMIT_PAUSE = 1.0
+
+
+class RateBudget:
+    """
+    单个 API key 的全局速率预算：每分钟请求数（rpm）与每分钟 token 数（tpm），0 表示不限。
+    令牌桶实现，允许一分钟额度内的突发；收到 429 时整体暂停。
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self.throttled = 0
+        self.wait_ms = 0.0
+        self.rate_limited = 0
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.rpm or self.tpm)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def delay(self, tokens: int) -> float:
+        """距可以发出一个 tokens 大小的请求还需等待多久（秒）"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self._paused_until - now)
+        if self.rpm and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+        if self.tpm:
+            need = min(tokens, self.tpm)
+            if self._tokens < need:
+                wait = max(wait, (need - self._tokens) * 60 / self.tpm)
+        return wait
+
+    async def acquire(self, tokens: int) -> None:
+        started = time.monotonic()
+        waited = False
+        while True:
+            wait = self.delay(tokens)
+            if wait <= 0:
+                break
+            waited = True
+            await asyncio.sleep(wait)
+        if waited:
+            self.throttled += 1
+            self.wait_ms += (time.monotonic() - started) * 1000
+        if self.rpm:
+            self._requests -= 1
+        if self.tpm:
+            self._tokens -= min(tokens, self.tpm)
+
+    def pause(self, seconds: float) -> None:
+        """服务端限流：在 seconds 秒内不再放行"""
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "throttled": self.throttled,
+            "wait_ms": round(self.wait_ms, 1),
+            "rate_limited": self.rate_limited,
+        }
+
+
+@dataclass
+class DispatchStats:
+    submitted: int = 0
+    coalesced: int = 0       # 与排队中/进行中的相同请求合并，未单独发出
+    flushes: int = 0
+    dispatched: int = 0
+    dropped: int = 0         # 发出前所有等待方都已取消
+    max_queue: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "avg_flush": round(self.dispatched / self.flushes, 2) if self.flushes else 0.0,
+            "max_queue": self.max_queue,
+        }
+
+
+@dataclass(order=True)
+class _Pending:
+    priority: int
+    seq: int
+    key: Optional[Hashable] = field(compare=False)
+    call: Callable[[], Awaitable[Any]] = field(compare=False)
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    waiters: int = field(default=0, compare=False)
+    task: Optional[asyncio.Task] = field(default=None, compare=False)
+
+    def abandon(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        elif not self.future.done():
+            self.future.cancel()
+
+
+def rate_limit_pause(exc: Exception) -> Optional[float]:
+    """若异常是服务端限流（HTTP 429），返回建议暂停秒数，否则 None"""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after) if retry_after else DEFAULT_RATE_LIMIT_PAUSE
+    except ValueError:
+        return DEFAULT_RATE_LIMIT_PAUSE
+
+
+class Dispatcher:
+    """
+    单个端点的请求调度：
+    - 聚合窗口：首个请求到达后等待 window 秒，收集各桌同时段的请求，按优先级依次发出
+      （每次最多 max_batch 个，其余留到下一轮），回合请求不会排在预取与解说之后
+    - 合并：key 相同的请求（同模型同 prompt）在前一个完成前只发一次，结果分发给所有等待方
+    - 每个请求发出前先扣除 API key 的全局速率预算；并发上限由 slot（端点的优先级限流）控制
+    chat-completions 协议没有同步的多请求批量接口，因此窗口内的请求以有界并发流水线发出。
+    """
+
+    def __init__(
+        self,
+        slot: Callable[[int], AsyncContextManager],
+        budget: Optional[RateBudget] = None,
+        window: float = 0.0,
+        max_batch: int = 32,
+    ):
+        self._slot = slot
+        self.budget = budget
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.stats = DispatchStats()
+        self._queue: List[_Pending] = []
+        self._inflight: Dict[Hashable, _Pending] = {}
+        self._seq = itertools.count()
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        priority: int,
+        tokens: int = 0,
+        key: Optional[Hashable] = None,
+    ) -> Any:
+        """提交一个请求并等待结果。key 为 None 时不参与合并（如对冲请求必须独立发出）"""
+        self.stats.submitted += 1
+        item = self._inflight.get(key) if key is not None else None
+        if item is not None and not item.future.done():
+            self.stats.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            item = _Pending(priority, next(self._seq), key, call, tokens, future)
+            if key is not None:
+                self._inflight[key] = item
+            heapq.heappush(self._queue, item)
+            self.stats.max_queue = max(self.stats.max_queue, len(self._queue))
+            if self._flusher is None or self._flusher.done():
+                self._flusher = asyncio.ensure_future(self._flush_loop())
+        return await self._wait(item)
+
+    async def _wait(self, item: _Pending) -> Any:
+        item.waiters += 1
+        try:
+            return await asyncio.shield(item.future)
+        except asyncio.CancelledError:
+            item.waiters -= 1
+            if item.waiters == 0:
+                self._forget(item)
+                item.abandon()
+            raise
+
+    async def _flush_loop(self) -> None:
+        while self._queue:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            self.stats.flushes += 1
+            launched = 0
+            while self._queue and launched < self.max_batch:
+                item = heapq.heappop(self._queue)
+                if self.budget is not None and self.budget.limited and not item.future.done():
+                    await self.budget.acquire(item.tokens)
+                if item.future.done():
+                    self.stats.dropped += 1
+                    self._forget(item)
+                    continue
+                item.task = asyncio.ensure_future(self._run(item))
+                launched += 1
+                self.stats.dispatched += 1
+
+    async def _run(self, item: _Pending) -> None:
+        try:
+            async with self._slot(item.priority):
+                result = await item.call()
+        except asyncio.CancelledError:
+            item.future.cancel()
+        except Exception as e:
+            pause = rate_limit_pause(e)
+            if pause is not None and self.budget is not None:
+                logger.warning("LLM 端点限流(429)，暂停 %.1fs", pause)
+                self.budget.pause(pause)
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._forget(item)
+
+    def _forget(self, item: _Pending) -> None:
+        if item.key is not None and self._inflight.get(item.key) is item:
+            del self._inflight[item.key]
+
+    def to_dict(self) -> dict:
+        return {"queued": self.queued, **self.stats.to_dict()}
@@ -0,0 +1,79 @@
+"""局面编码 - 花色无关的紧凑点数表示与信息集规范化编码"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from src.engine.card import Card, Rank
+from src.game.player import Player
+from src.game.game_state import GameState
+
+# 单字符点数记号（10=T，小王=w，大王=W）
+RANK_CHAR: Dict[Rank, str] = {
+    Rank.THREE: "3", Rank.FOUR: "4", Rank.FIVE: "5", Rank.SIX: "6",
+    Rank.SEVEN: "7", Rank.EIGHT: "8", Rank.NINE: "9", Rank.TEN: "T",
+    Rank.JACK: "J", Rank.QUEEN: "Q", Rank.KING: "K", Rank.ACE: "A",
+    Rank.TWO: "2", Rank.SMALL_JOKER: "w", Rank.BIG_JOKER: "W",
+}
+CHAR_RANK: Dict[str, Rank] = {v: k for k, v in RANK_CHAR.items()}
+
+
+def ranks_to_text(ranks: Iterable[Rank]) -> str:
+    """点数 → 分组记号，从小到大（如 '33 5 777 JJ'）"""
+    rc = Counter(ranks)
+    return " ".join(RANK_CHAR[r] * rc[r] for r in sorted(rc))
+
+
+def ranks_text(cards: Iterable[Card]) -> str:
+    """牌 → 点数分组记号（忽略花色）"""
+    return ranks_to_text(c.rank for c in cards)
+
+
+def parse_ranks_text(text: str) -> Optional[List[Rank]]:
+    """点数记号 → 点数列表（空白分隔可选）。含未知字符返回 None"""
+    ranks: List[Rank] = []
+    for ch in text.replace(" ", ""):
+        rank = CHAR_RANK.get(ch) or CHAR_RANK.get(ch.upper())
+        if rank is None:
+            return None
+        ranks.append(rank)
+    return ranks
+
+
+def pick_cards(hand: List[Card], ranks: List[Rank]) -> Optional[List[Card]]:
+    """按点数从手牌中挑出具体的牌（花色任取）。持有不足返回 None"""
+    pool = list(hand)
+    picked: List[Card] = []
+    for r in ranks:
+        card = next((c for c in pool if c.rank == r), None)
+        if card is None:
+            return None
+        pool.remove(card)
+        picked.append(card)
+    return picked
+
+
+def info_set_key(player: Player, state: GameState) -> str:
+    """
+    出牌决策信息集的规范化编码（花色无关）：
+    角色 | 手牌 | 上一手牌型与点数 | 上一手出牌人关系 | 下家/上家角色与张数 | 炸弹数
+    """
+    role = "L" if player.is_landlord else "F"
+    hand = ranks_text(player.hand)
+
+    if state.last_play is None:
+        last, rel = "-", "-"
+    else:
+        last = f"{state.last_play.type.value}:{ranks_text(state.last_play.cards)}"
+        last_owner = state.players[state.last_player] if state.last_player is not None else None
+        if last_owner is None:
+            rel = "?"
+        else:
+            rel = "ally" if last_owner.is_landlord == player.is_landlord else "enemy"
+
+    n = len(state.players)
+    others = []
+    for offset in range(1, n):
+        p = state.players[(player.id + offset) % n]
+        others.append(f"{'L' if p.is_landlord else 'F'}{p.hand_size}")
+
+    return "|".join([role, hand, last, rel, ",".join(others), str(state.bomb_count)])
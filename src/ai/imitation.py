@@ -0,0 +1,516 @@
+"""人格模仿策略 - 记录经过验证的 LLM 出牌，蒸馏为每个人格的轻量排序模型（仅依赖 NumPy）
+
+流程：
+1. DecisionLog：LlmAI 每次得到合法（或已修复）的 LLM 出牌时，追加一行 JSON
+   （人格、模型、花色无关的信息集编码、所出点数）
+2. train_policy：对每个人格，在每条记录的全部合法出牌上训练条件 logit 模型
+   （线性打分 + 组内 softmax，全批量梯度下降），学习该人格会把哪手牌排在前面
+3. ImitationAI：按模型打分选出最高分的合法出牌，零延迟；用作离线人格模式与 LLM 失败时的兜底
+
+训练：
+    python -m src.ai.imitation decisions.jsonl -o imitation.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, IO, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_type import HandType, PlayedHand
+from src.engine.hand_detector import detect_hand
+from src.engine.move_generator import generate_moves
+from src.game.player import Player
+from src.game.game_state import GameState
+from src.ai.encoding import info_set_key, ranks_text, parse_ranks_text, pick_cards
+from src.ai.move_ranker import heuristic_score
+from src.ai.rule_ai import RuleAI
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+
+# 出牌牌型（不含 PASS，PASS 单独一维）
+_MOVE_TYPES = [t for t in HandType if t != HandType.PASS]
+
+# 单手出牌的特征
+MOVE_FEATURES = [
+    "pass", "n_cards", "main_rank", "bomb", "breaks", "finishes",
+    "remaining", "heuristic", "high_cards",
+] + [f"type:{t.value}" for t in _MOVE_TYPES]
+
+# 局面上下文：与出牌特征做外积，使同一手牌在不同局面下权重不同
+CONTEXT_FEATURES = ["bias", "landlord", "following", "ally_last", "danger"]
+
+N_FEATURES = len(MOVE_FEATURES) * len(CONTEXT_FEATURES)
+
+
+# ============================================================
+#  局面（由信息集编码还原，训练与在线决策共用）
+# ============================================================
+
+@dataclass
+class Situation:
+    """花色无关的出牌局面：由 info_set_key 还原，手牌与上一手为合成的具体牌"""
+    landlord: bool
+    hand: List[Card]
+    last_play: Optional[PlayedHand]
+    ally_last: bool
+    opponent_min: int   # 对手（不同阵营）中最少的剩余张数
+
+    @classmethod
+    def from_key(cls, key: str) -> Optional["Situation"]:
+        """解析 info_set_key（角色|手牌|上一手|出牌人关系|其他玩家|炸弹数），格式不符返回 None"""
+        parts = key.split("|")
+        if len(parts) != 6:
+            return None
+        role, hand_text, last_text, rel, others_text, _ = parts
+        landlord = role == "L"
+
+        hand_ranks = parse_ranks_text(hand_text)
+        if hand_ranks is None:
+            return None
+        last_play = None
+        if last_text != "-":
+            last_ranks = parse_ranks_text(last_text.partition(":")[2])
+            if not last_ranks:
+                return None
+            last_play = detect_hand(synth_cards(last_ranks))
+            if last_play is None:
+                return None
+
+        opponent_min = 20
+        for item in others_text.split(","):
+            if len(item) < 2 or not item[1:].isdigit():
+                return None
+            if (item[0] == "L") != landlord:
+                opponent_min = min(opponent_min, int(item[1:]))
+
+        return cls(
+            landlord=landlord,
+            hand=synth_cards(hand_ranks),
+            last_play=last_play,
+            ally_last=rel == "ally",
+            opponent_min=opponent_min,
+        )
+
+    def candidates(self) -> List[Optional[PlayedHand]]:
+        """全部合法选择：跟牌时含 PASS（None）"""
+        moves: List[Optional[PlayedHand]] = list(generate_moves(self.hand, self.last_play))
+        if self.last_play is not None:
+            moves.append(None)
+        return moves
+
+
+_SYNTH_SUITS = (Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB)
+
+
+def synth_cards(ranks: Iterable[Rank]) -> List[Card]:
+    """点数 → 合成的具体牌（同点数依次分配花色），只用于花色无关的枚举与评估"""
+    seen: Counter = Counter()
+    cards: List[Card] = []
+    for r in sorted(ranks):
+        if r in (Rank.SMALL_JOKER, Rank.BIG_JOKER):
+            cards.append(Card(rank=r, suit=Suit.JOKER))
+        else:
+            cards.append(Card(rank=r, suit=_SYNTH_SUITS[seen[r] % 4]))
+        seen[r] += 1
+    return cards
+
+
+def _move_key(cards: Optional[Iterable[Card]]) -> Optional[str]:
+    return None if cards is None else ranks_text(cards)
+
+
+# ============================================================
+#  特征
+# ============================================================
+
+def move_features(move: Optional[PlayedHand], hand: List[Card]) -> np.ndarray:
+    f = np.zeros(len(MOVE_FEATURES))
+    if move is None:
+        f[0] = 1.0
+        f[6] = len(hand) / 20
+        return f
+    rc = Counter(c.rank for c in hand)
+    used = Counter(c.rank for c in move.cards)
+    n = len(move.cards)
+    f[1] = n / 20
+    f[2] = (int(move.main_rank) - int(Rank.THREE)) / 14
+    f[3] = float(move.is_bomb_like)
+    f[4] = sum(1 for r, k in used.items() if k < rc[r]) / 4
+    f[5] = float(n == len(hand))
+    f[6] = (len(hand) - n) / 20
+    f[7] = min(heuristic_score(move, hand), 20.0) / 10
+    f[8] = sum(k for r, k in used.items() if r >= Rank.TWO) / 4
+    f[9 + _MOVE_TYPES.index(move.type)] = 1.0
+    return f
+
+
+def context_features(sit: Situation) -> np.ndarray:
+    return np.array([
+        1.0,
+        float(sit.landlord),
+        float(sit.last_play is not None),
+        float(sit.ally_last),
+        float(sit.opponent_min <= 2),
+    ])
+
+
+def feature_matrix(sit: Situation, moves: List[Optional[PlayedHand]]) -> np.ndarray:
+    """候选出牌 → (len(moves), N_FEATURES) 特征矩阵"""
+    ctx = context_features(sit)
+    return np.stack([np.outer(ctx, move_features(m, sit.hand)).ravel() for m in moves])
+
+
+# ============================================================
+#  决策日志
+# ============================================================
+
+class DecisionLog:
+    """经过验证的 LLM 出牌决策日志（JSON-lines，追加写入，多位玩家共享）
+
+    - flush_interval：记录先缓存在内存中，在事件循环里每隔 flush_interval 秒合并成一次写入
+      （出牌路径上不再同步写文件；无事件循环时立即落盘）
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._file: Optional[IO[str]] = None
+        self._buffer: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def append(
+        self,
+        persona: str,
+        model: str,
+        player: Player,
+        state: GameState,
+        cards: Optional[List[Card]],
+    ) -> None:
+        """记录一条决策；须在局面推进之前调用"""
+        record = {
+            "persona": persona,
+            "model": model,
+            "state": info_set_key(player, state),
+            "move": _move_key(cards),
+            "ts": round(time.time(), 3),
+        }
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += 1
+        self._schedule_flush()
+
+    def flush(self) -> None:
+        """将缓存的记录一次写入文件"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(self._buffer))
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+
+def read_log(path: str) -> List[dict]:
+    """读取决策日志，跳过损坏的行"""
+    records: List[dict] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+# ============================================================
+#  训练
+# ============================================================
+
+@dataclass
+class PersonaModel:
+    """单个人格的出牌排序模型"""
+    weights: np.ndarray
+    samples: int = 0
+    accuracy: float = 0.0   # 训练集 top-1 命中率
+
+    def scores(self, x: np.ndarray) -> np.ndarray:
+        return x @ self.weights
+
+
+@dataclass
+class _Dataset:
+    x: np.ndarray            # (总候选数, N_FEATURES)
+    starts: np.ndarray       # 每条记录的候选在 x 中的起始行
+    labels: np.ndarray       # 每条记录所选出牌的全局行号
+
+    @property
+    def size(self) -> int:
+        return len(self.starts)
+
+
+def _build_dataset(records: Iterable[dict]) -> Optional[_Dataset]:
+    blocks: List[np.ndarray] = []
+    starts: List[int] = []
+    labels: List[int] = []
+    offset = 0
+    for rec in records:
+        sit = Situation.from_key(rec.get("state", ""))
+        if sit is None:
+            continue
+        moves = sit.candidates()
+        chosen = rec.get("move")
+        keys = [_move_key(m.cards if m is not None else None) for m in moves]
+        if chosen not in keys or len(moves) < 2:
+            # 日志与枚举不一致（如上一手牌型有歧义），或别无选择，不参与训练
+            continue
+        blocks.append(feature_matrix(sit, moves))
+        starts.append(offset)
+        labels.append(offset + keys.index(chosen))
+        offset += len(moves)
+    if not blocks:
+        return None
+    return _Dataset(np.concatenate(blocks), np.array(starts), np.array(labels))
+
+
+def _group_softmax(logits: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """按记录分组的 softmax（每组候选在 logits 中连续存放）"""
+    group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(logits))))
+    shifted = np.exp(logits - np.maximum.reduceat(logits, starts)[group])
+    return shifted / np.add.reduceat(shifted, starts)[group]
+
+
+def _fit(data: _Dataset, epochs: int, lr: float, l2: float) -> np.ndarray:
+    """条件 logit：最小化所选出牌的负对数似然 + L2，Adam 全批量优化"""
+    w = np.zeros(data.x.shape[1])
+    m = np.zeros_like(w)
+    v = np.zeros_like(w)
+    for t in range(1, epochs + 1):
+        p = _group_softmax(data.x @ w, data.starts)
+        grad = (p @ data.x - data.x[data.labels].sum(axis=0)) / data.size + l2 * w
+        m = 0.9 * m + 0.1 * grad
+        v = 0.999 * v + 0.001 * grad ** 2
+        w -= lr * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-8)
+    return w
+
+
+def _top1(data: _Dataset, w: np.ndarray) -> float:
+    logits = data.x @ w
+    ends = np.append(data.starts[1:], len(logits))
+    hits = sum(
+        int(s + np.argmax(logits[s:e]) == label)
+        for s, e, label in zip(data.starts, ends, data.labels)
+    )
+    return hits / data.size
+
+
+def train_policy(
+    records: Iterable[dict],
+    min_samples: int = 50,
+    epochs: int = 300,
+    lr: float = 0.05,
+    l2: float = 1e-3,
+) -> "ImitationPolicy":
+    """按人格分组训练；样本不足 min_samples 的人格跳过（由 RuleAI 兜底）"""
+    by_persona: Dict[str, List[dict]] = {}
+    for rec in records:
+        by_persona.setdefault(rec.get("persona", ""), []).append(rec)
+
+    models: Dict[str, PersonaModel] = {}
+    for persona, recs in by_persona.items():
+        data = _build_dataset(recs)
+        if data is None or data.size < min_samples:
+            logger.info("模仿训练 %s: 有效样本不足（%d），跳过",
+                        persona, 0 if data is None else data.size)
+            continue
+        w = _fit(data, epochs, lr, l2)
+        models[persona] = PersonaModel(w, data.size, round(_top1(data, w), 4))
+        logger.info("模仿训练 %s: %d 条样本，训练集命中率 %.1f%%",
+                    persona, data.size, models[persona].accuracy * 100)
+    return ImitationPolicy(models)
+
+
+# ============================================================
+#  策略
+# ============================================================
+
+@dataclass
+class ImitationPolicy:
+    """各人格的出牌排序模型集合"""
+    models: Dict[str, PersonaModel] = field(default_factory=dict)
+
+    def has(self, persona: str) -> bool:
+        return persona in self.models
+
+    def rank(
+        self, persona: str, player: Player, state: GameState
+    ) -> List[Tuple[Optional[List[Card]], float]]:
+        """按该人格的偏好对全部合法选择排序，返回 [(cards_or_None, score)]，cards 为玩家手中的具体牌"""
+        model = self.models.get(persona)
+        if model is None or not player.hand:
+            return []
+        sit = Situation.from_key(info_set_key(player, state))
+        if sit is None:
+            return []
+        moves = sit.candidates()
+        if not moves:
+            return []
+        scores = model.scores(feature_matrix(sit, moves))
+        ranked: List[Tuple[Optional[List[Card]], float]] = []
+        for i in np.argsort(-scores, kind="stable"):
+            move = moves[i]
+            if move is None:
+                ranked.append((None, float(scores[i])))
+                continue
+            cards = pick_cards(player.hand, [c.rank for c in move.cards])
+            if cards is not None:
+                ranked.append((cards, float(scores[i])))
+        return ranked
+
+    def save(self, path: str) -> None:
+        data = {
+            "version": MODEL_VERSION,
+            "features": N_FEATURES,
+            "personas": {
+                name: {"weights": m.weights.round(6).tolist(),
+                       "samples": m.samples, "accuracy": m.accuracy}
+                for name, m in self.models.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "ImitationPolicy":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION or data.get("features") != N_FEATURES:
+            raise ValueError(f"模仿模型 {path} 与当前特征定义不兼容，请重新训练")
+        return cls({
+            name: PersonaModel(np.array(m["weights"]), m.get("samples", 0), m.get("accuracy", 0.0))
+            for name, m in data.get("personas", {}).items()
+        })
+
+    def snapshot(self) -> dict:
+        return {name: {"samples": m.samples, "accuracy": m.accuracy}
+                for name, m in self.models.items()}
+
+
+class ImitationAI:
+    """离线人格：按模仿模型选出该人格最可能的合法出牌（AIStrategy Protocol），叫分委托 RuleAI。
+
+    模型缺少该人格或给不出合法选择时退回 RuleAI。
+    """
+
+    def __init__(self, persona: str, policy: ImitationPolicy):
+        self.persona = persona
+        self.policy = policy
+        self._rule = RuleAI()
+
+    def decide_bid(self, player: Player, state: GameState) -> int:
+        return self._rule.decide_bid(player, state)
+
+    def decide_play(self, player: Player, state: GameState) -> Optional[List[Card]]:
+        ranked = self.policy.rank(self.persona, player, state)
+        if not ranked:
+            return self._rule.decide_play(player, state)
+        return ranked[0][0]
+
+
+# ============================================================
+#  工厂函数
+# ============================================================
+
+def create_decision_log() -> Optional[DecisionLog]:
+    """LLM_DECISION_LOG：决策日志路径（留空=不记录）"""
+    path = os.getenv("LLM_DECISION_LOG", "")
+    return DecisionLog(path) if path else None
+
+
+def create_imitation_policy() -> Optional[ImitationPolicy]:
+    """LLM_IMITATION_MODEL：训练好的模仿模型路径（留空或加载失败=不使用）"""
+    path = os.getenv("LLM_IMITATION_MODEL", "")
+    if not path:
+        return None
+    try:
+        policy = ImitationPolicy.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("模仿模型加载失败(%s): %s，使用 RuleAI 兜底", path, e)
+        return None
+    logger.info("模仿模型已加载: %s", ", ".join(policy.models) or "（无人格）")
+    return policy
+
+
+# 进程级单例：多个房间的玩家共享同一份日志与模型（首次使用时按环境变量创建）
+_log: Optional[DecisionLog] = None
+_policy: Optional[ImitationPolicy] = None
+_created = False
+
+
+def _ensure_shared() -> None:
+    global _log, _policy, _created
+    if not _created:
+        _log = create_decision_log()
+        _policy = create_imitation_policy()
+        _created = True
+
+
+def get_decision_log() -> Optional[DecisionLog]:
+    _ensure_shared()
+    return _log
+
+
+def get_imitation_policy() -> Optional[ImitationPolicy]:
+    _ensure_shared()
+    return _policy
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="从 LLM 决策日志训练人格模仿模型")
+    parser.add_argument("logs", nargs="+", help="决策日志（JSON-lines）")
+    parser.add_argument("-o", "--out", default="imitation.json", help="输出模型路径")
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--lr", type=float, default=0.05)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    records: List[dict] = []
+    for path in args.logs:
+        records.extend(read_log(path))
+    policy = train_policy(records, args.min_samples, args.epochs, args.lr, args.l2)
+    policy.save(args.out)
+    print(json.dumps(policy.snapshot(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""延迟感知 - 按 (端点, 模型) 维护滚动延迟分布，推导对冲时机与自适应超时"""
+
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 慢响应处理方式
+HEDGE_OFF = "off"            # 仅使用自适应超时
+HEDGE_REQUEST = "request"    # 超过 p90 仍未返回时补发一个相同请求，取先到的合法结果
+HEDGE_FALLBACK = "fallback"  # 超过 p90 仍未返回时直接交给规则引擎
+
+
+class LatencyTracker:
+    """单个 (端点, 模型) 的滚动延迟窗口与对冲计数"""
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0        # 补发的对冲请求数
+        self.hedge_wins = 0    # 对冲请求先于原请求给出合法结果
+        self.early_fallbacks = 0
+        self.timeouts = 0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[idx]
+
+    def to_dict(self) -> dict:
+        def ms(v: Optional[float]) -> Optional[float]:
+            return None if v is None else round(v * 1000, 1)
+
+        return {
+            "samples": len(self.samples),
+            "p50_ms": ms(self.percentile(0.5)),
+            "p90_ms": ms(self.percentile(0.9)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "early_fallbacks": self.early_fallbacks,
+            "timeouts": self.timeouts,
+        }
+
+
+@dataclass
+class HedgePolicy:
+    """
+    由延迟分布推导的慢响应策略：
+    - 样本不足 min_samples 时：不对冲，超时取 max_timeout
+    - 超时 = clamp(p99 × timeout_factor, min_timeout, max_timeout)
+    - 对冲时机 = max(p90, min_hedge_delay)；对冲请求数（fallback 模式下为提前 fallback 次数）不超过调用数 × budget
+    """
+    mode: str = HEDGE_REQUEST
+    min_samples: int = 20
+    hedge_quantile: float = 0.9
+    min_hedge_delay: float = 0.5
+    timeout_factor: float = 1.5
+    min_timeout: float = 2.0
+    max_timeout: float = 10.0
+    budget: float = 0.1
+
+    def timeout(self, tracker: LatencyTracker) -> float:
+        if len(tracker.samples) < self.min_samples:
+            return self.max_timeout
+        p99 = tracker.percentile(0.99)
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_factor))
+
+    def hedge_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        """距请求发出多久后触发对冲/提前 fallback；返回 None 表示本次不触发"""
+        if self.mode == HEDGE_OFF or len(tracker.samples) < self.min_samples:
+            return None
+        used = tracker.hedges if self.mode == HEDGE_REQUEST else tracker.early_fallbacks
+        if used >= tracker.calls * self.budget:
+            return None
+        return max(self.min_hedge_delay, tracker.percentile(self.hedge_quantile))
+
+
+class LatencyRegistry:
+    """进程级延迟统计，按 (base_url, model) 聚合"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+
+    def get(self, base_url: str, model: str) -> LatencyTracker:
+        key = (base_url, model)
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            tracker = self._trackers[key] = LatencyTracker(self.window)
+        return tracker
+
+    def snapshot(self) -> List[dict]:
+        return [
+            {"base_url": base_url, "model": model, **tracker.to_dict()}
+            for (base_url, model), tracker in sorted(self._trackers.items())
+        ]
+
+    def reset(self) -> None:
+        self._trackers.clear()
+
+
+# 进程级单例
+latency_stats = LatencyRegistry()
+
+
+def create_hedge_policy() -> HedgePolicy:
+    """根据环境变量创建慢响应策略。
+
+    环境变量：
+      LLM_HEDGE：request（默认，补发对冲请求）/ fallback（直接交给规则引擎）/ off
+      LLM_HEDGE_BUDGET：对冲请求占调用数的比例上限（默认 0.1）
+      LLM_TIMEOUT_CAP：超时上限（秒，默认 10）
+      LLM_TIMEOUT_FLOOR：自适应超时下限（秒，默认 2）
+    """
+    return HedgePolicy(
+        mode=os.getenv("LLM_HEDGE", HEDGE_REQUEST),
+        budget=float(os.getenv("LLM_HEDGE_BUDGET", "0.1")),
+        max_timeout=float(os.getenv("LLM_TIMEOUT_CAP", "10")),
+        min_timeout=float(os.getenv("LLM_TIMEOUT_FLOOR", "2")),
+    )
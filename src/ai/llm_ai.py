@@ -4,21 +4,72 @@ import asyncio
 import json
 import logging
 import os
-from typing import List, Optional, Tuple
-
-from openai import AsyncOpenAI
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
 
 from src.engine.card import Card, Rank, Suit, RANK_DISPLAY
+from src.engine.hand_type import PlayedHand
 from src.engine.hand_detector import detect_hand, can_beat
+from src.engine.move_generator import generate_moves
 from src.game.player import Player
 from src.game.game_state import GameState
 from src.ai.rule_ai import RuleAI
+from src.ai.move_ranker import rank_moves
+from src.ai.repair import parse_intent_ranks, repair_move
+from src.ai.decision_cache import DecisionCache, get_decision_cache
+from src.ai.imitation import (
+    DecisionLog, ImitationAI, ImitationPolicy, get_decision_log, get_imitation_policy,
+)
+from src.ai.encoding import parse_ranks_text, pick_cards
+from src.ai import compact_prompt
+from src.ai.client_pool import (
+    ClientRegistry, get_client_registry, current_priority,
+    PRIORITY_COMMENTARY, PRIORITY_SPECULATIVE,
+)
+from src.ai.session import GameSession, estimate_tokens
+from src.ai.streaming import JsonFieldScanner, StrategyStream, decision_spec, synthesize
+from src.ai.speculation import state_signature
+from src.ai.latency import (
+    HedgePolicy, LatencyRegistry, latency_stats, create_hedge_policy, HEDGE_FALLBACK,
+)
+from src.ai.routing import (
+    BreakerRegistry, Route, build_routes, get_breaker_registry, parse_endpoints, rank_routes,
+)
+from src.ai.metrics import (
+    decision_stats, OUTCOME_OK, OUTCOME_INVALID, OUTCOME_REPAIRED,
+    OUTCOME_NO_RESPONSE, OUTCOME_SKIPPED,
+)
+from src.ai.telemetry import (
+    CallSpan, Telemetry, get_telemetry,
+    CALL_OK, CALL_REPAIRED, CALL_PARSE_FAIL, CALL_ILLEGAL, CALL_TIMEOUT, CALL_ERROR,
+    CALL_CANCELLED, KIND_BID, KIND_PLAY, KIND_COMMENTARY,
+)
 
 logger = logging.getLogger(__name__)
 
-# 超时上限（秒）
+# 超时上限（秒）：未配置 hedge 策略时的固定超时
 LLM_TIMEOUT = 10
 
+_T = TypeVar("_T")
+
+# 解说模式：inline=出牌与解说同一次 LLM 调用；async=规则引擎即时出牌，解说由 LLM 并发生成
+COMMENTARY_INLINE = "inline"
+COMMENTARY_ASYNC = "async"
+
+# 出牌 prompt 模式：free=LLM 自由写出牌面；indexed=从编号的合法出牌列表中选择
+PROMPT_FREE = "free"
+PROMPT_INDEXED = "indexed"
+
+# indexed 模式下提供给 LLM 的候选出牌数上限
+DEFAULT_MOVE_TOP_K = 12
+
+# prompt 编码：verbose=单条 user 消息、带花色牌面；compact=固定 system 前缀 + 点数记号增量
+PROMPT_VERBOSE = "verbose"
+PROMPT_COMPACT = "compact"
+
+# 发给 LLM 的 prompt：单条 user 文本，或完整 messages 列表
+Prompt = Union[str, List[Dict[str, str]]]
+
 # 角色性格 prompt 片段
 CHARACTER_PROMPTS = {
     "烈焰哥🔥": (
@@ -145,6 +196,35 @@ def _build_play_prompt(player: Player, state: GameState, character: str) -> str:
 }}"""
 
 
+def _build_indexed_play_prompt(
+    player: Player, state: GameState, character: str, moves: List[PlayedHand]
+) -> str:
+    """构建编号候选出牌 prompt：LLM 只需回答编号，杜绝非法出牌"""
+    char_prompt = CHARACTER_PROMPTS.get(character, DEFAULT_CHARACTER_PROMPT)
+    context = _build_game_context(player, state)
+
+    options = [f"{i}: {_hand_str(m.cards)}" for i, m in enumerate(moves, start=1)]
+    if state.last_play is not None:
+        options.insert(0, "0: 不出(PASS)")
+    options_text = "\n".join(options)
+
+    return f"""{char_prompt}
+
+你正在玩斗地主。请根据当前局面，从下面的候选出牌中选择一个。
+
+【当前局面】
+{context}
+
+【候选出牌】（只能从以下编号中选择）
+{options_text}
+
+【输出格式】严格返回 JSON，不要输出其他内容：
+{{
+  "move": 候选编号(整数),
+  "strategy": "一句话解说你的策略（15字以内，符合你的性格）"
+}}"""
+
+
 def _build_bid_prompt(player: Player, state: GameState, character: str) -> str:
     """构建叫分决策 prompt"""
     char_prompt = CHARACTER_PROMPTS.get(character, DEFAULT_CHARACTER_PROMPT)
@@ -174,10 +254,42 @@ def _build_bid_prompt(player: Player, state: GameState, character: str) -> str:
 }}"""
 
 
+def _build_commentary_prompt(
+    player: Player, state: GameState, character: str, action_text: str
+) -> str:
+    """构建解说 prompt：动作已由引擎决定，LLM 只负责人格化解说"""
+    char_prompt = CHARACTER_PROMPTS.get(character, DEFAULT_CHARACTER_PROMPT)
+    context = _build_game_context(player, state)
+
+    return f"""{char_prompt}
+
+你正在玩斗地主，这一手你已经决定：{action_text}
+
+【当前局面】
+{context}
+
+请用一句话解说你这一手的策略（15字以内，符合你的性格）。
+【输出格式】严格返回 JSON，不要输出其他内容：
+{{
+  "strategy": "一句话解说"
+}}"""
+
+
 # ============================================================
 #  JSON 响应解析
 # ============================================================
 
+def _as_messages(prompt: Prompt) -> List[Dict[str, str]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return prompt
+
+
+def _request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """速率预算按 prompt 估算 token + 输出上限扣除"""
+    return sum(estimate_tokens(m["content"]) for m in messages) + max_tokens
+
+
 def _extract_json(text: str) -> Optional[dict]:
     """从 LLM 返回文本中提取 JSON 对象（兼容 markdown 代码块包裹）"""
     text = text.strip()
@@ -210,6 +322,12 @@ class LlmAI:
     提供两套接口：
     - decide_bid / decide_play：同步方法，满足 AIStrategy Protocol，内部 fallback 到 RuleAI
     - async_decide_bid / async_decide_play：异步方法，供 server.py 层 await 调用
+
+    commentary_mode=async 时，async_decide_* 由 RuleAI 即时给出动作（strategy 为空），
+    人格化解说通过 start_commentary 并发生成，出牌不再等待 LLM。
+
+    提供 imitation 模仿模型时，兜底出牌改由该人格的模仿策略（ImitationAI）给出；
+    offline=True 时完全不调用 LLM（离线人格模式）。decision_log 记录每次经过验证的 LLM 出牌，用于训练模仿模型。
     """
 
     def __init__(
@@ -218,21 +336,90 @@ class LlmAI:
         api_key: str = "",
         base_url: str = "https://api.deepseek.com/v1",
         model: str = "deepseek-chat",
+        commentary_mode: str = COMMENTARY_INLINE,
+        prompt_mode: str = PROMPT_FREE,
+        move_top_k: int = DEFAULT_MOVE_TOP_K,
+        repair: bool = True,
+        cache: Optional[DecisionCache] = None,
+        registry: Optional[ClientRegistry] = None,
+        stream: bool = False,
+        hedge: Optional[HedgePolicy] = None,
+        latency: Optional[LatencyRegistry] = None,
+        endpoints: Optional[List[Tuple[str, str, str]]] = None,
+        breakers: Optional[BreakerRegistry] = None,
+        prompt_encoding: str = PROMPT_VERBOSE,
+        session_budget: int = 0,
+        telemetry: Optional[Telemetry] = None,
+        decision_log: Optional[DecisionLog] = None,
+        imitation: Optional[ImitationPolicy] = None,
+        offline: bool = False,
     ):
         self.character = character
-        self.model = model
-        self._fallback = RuleAI()
+        self.prompt_encoding = prompt_encoding
+        # 对局会话（仅紧凑编码下启用）：保留本局出牌增量的滚动历史
+        self.session: Optional[GameSession] = (
+            GameSession(session_budget)
+            if session_budget > 0 and prompt_encoding == PROMPT_COMPACT else None
+        )
+        self.commentary_mode = commentary_mode
+        self.prompt_mode = prompt_mode
+        self.move_top_k = move_top_k
+        self.repair = repair
+        self.cache = cache
+        self.stream = stream
+        self.hedge = hedge
+        self.telemetry = telemetry if telemetry is not None else get_telemetry()
+        self.decision_log = decision_log
+        if imitation is not None and imitation.has(character):
+            self._fallback = ImitationAI(character, imitation)
+        else:
+            self._fallback = RuleAI()
+        # 已提交出牌但解说仍在流式生成的决策，按局面签名索引（投机预取可能有多个）
+        self._streams: Dict[tuple, StrategyStream] = {}
+        # 投机预取产生的副作用（写回会话等），按局面签名暂存，预取被采用时才执行
+        self._deferred: Dict[tuple, List[Callable[[], None]]] = {}
+        self._accepted: Optional[tuple] = None
+
+        # 候选 (端点, 模型)，顺序即优先级；相同端点的玩家共享一个连接池客户端
+        if offline:
+            endpoints = []
+        elif endpoints is None:
+            endpoints = [(base_url, model, api_key)]
+        if registry is None:
+            registry = get_client_registry()
+        if latency is None:
+            latency = latency_stats
+        if breakers is None:
+            breakers = get_breaker_registry()
+        self.routes: List[Route] = build_routes(endpoints, registry, latency, breakers)
+        # 主模型：用于决策统计与缓存键（人格的打法以主模型为准）
+        self.model = self.routes[0].model if self.routes else model
 
         # 若未配置 API key，仅使用 fallback
-        self._enabled = bool(api_key)
-        if self._enabled:
-            self._client = AsyncOpenAI(
-                api_key=api_key,
-                base_url=base_url,
-            )
-        else:
-            self._client = None
-            logger.warning("LlmAI(%s): 未配置 API key，将使用 RuleAI fallback", character)
+        self._enabled = bool(self.routes)
+        if offline:
+            logger.info("LlmAI(%s): 离线人格模式，使用 %s", character, type(self._fallback).__name__)
+        elif not self._enabled:
+            logger.warning("LlmAI(%s): 未配置 API key，将使用 %s fallback",
+                           character, type(self._fallback).__name__)
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用 LLM 决策（未配置 API key 或解说分离模式下决策即时完成）"""
+        return self._enabled and not self.async_commentary
+
+    @property
+    def compact(self) -> bool:
+        return self.prompt_encoding == PROMPT_COMPACT
+
+    def _system_prompt(self) -> str:
+        char_prompt = CHARACTER_PROMPTS.get(self.character, DEFAULT_CHARACTER_PROMPT)
+        return compact_prompt.system_prompt(char_prompt, self.prompt_mode == PROMPT_INDEXED)
+
+    @property
+    def async_commentary(self) -> bool:
+        """是否为解说分离模式"""
+        return self._enabled and self.commentary_mode == COMMENTARY_ASYNC
 
     # ----------------------------------------------------------
     #  同步接口（AIStrategy Protocol 兼容，fallback 到 RuleAI）
@@ -250,29 +437,212 @@ class LlmAI:
     #  LLM 通用调用（带超时 + 错误处理）
     # ----------------------------------------------------------
 
-    async def _call_llm(self, prompt: str) -> Optional[str]:
-        """调用 LLM API，返回文本响应。超时或异常返回 None。"""
-        if not self._enabled or self._client is None:
+    def _timeout(self, route: Route) -> float:
+        """本次调用的超时：有 hedge 策略时由该路由观测到的延迟分位数推导"""
+        if self.hedge is None:
+            return LLM_TIMEOUT
+        return self.hedge.timeout(route.latency)
+
+    def _ranked_routes(self) -> List[Route]:
+        """按健康度与延迟排序的可用路由；全部熔断时为空（直接 fallback，不再等超时）"""
+        if not self._enabled:
+            return []
+        routes = rank_routes(self.routes)
+        if not routes:
+            logger.warning("LlmAI(%s): 所有端点均已熔断，使用 RuleAI", self.character)
+        return routes
+
+    def _span(self, route: Route, kind: str, stream: bool = False) -> CallSpan:
+        return self.telemetry.span(self.character, route.model, route.base_url, kind, stream)
+
+    @staticmethod
+    def _call_outcome(
+        raw: str, parsed: Optional[_T], outcome_of: Optional[Callable[[_T], str]] = None
+    ) -> str:
+        """单次调用的遥测分类：不可解析 / 非法 / 合法（或由 outcome_of 细分为已修复）"""
+        if parsed is None:
+            return CALL_PARSE_FAIL if _extract_json(raw) is None else CALL_ILLEGAL
+        return outcome_of(parsed) if outcome_of is not None else CALL_OK
+
+    async def _request(
+        self,
+        route: Route,
+        prompt: Prompt,
+        max_tokens: int,
+        span: CallSpan,
+        priority: Optional[int] = None,
+        coalesce: bool = True,
+    ) -> Optional[str]:
+        """单次 LLM 请求（经端点调度器，占用并发名额），记录延迟、熔断状态与 token 用量。异常返回 None。
+
+        span 的结果分类由调用方在校验响应后判定（超时 / 取消同样由调用方判定）。
+        coalesce=True 时与其他桌进行中的相同请求合并（对冲请求须独立发出，传 False）；
+        合并的请求只计一次延迟与用量。
+        """
+        messages = _as_messages(prompt)
+
+        async def call():
+            started = time.perf_counter()
+            resp = await route.client.chat.completions.create(
+                model=route.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=max_tokens,
+            )
+            route.latency.observe(time.perf_counter() - started)
+            span.add_usage(getattr(resp, "usage", None))
+            return resp
+
+        key = None
+        if coalesce:
+            key = (route.model, max_tokens, json.dumps(messages, ensure_ascii=False))
+        try:
+            resp = await route.endpoint.dispatch(
+                call, priority, _request_tokens(messages, max_tokens), key
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            route.breaker.record_failure()
+            span.resolve(CALL_ERROR)
+            logger.warning("LlmAI(%s): LLM 调用异常(%s): %s", self.character, route.name, e)
+            return None
+        finally:
+            span.end()
+        route.breaker.record_success()
+        content = resp.choices[0].message.content
+        logger.info("LlmAI(%s) 响应: %s", self.character, content[:200])
+        return content
+
+    async def _call_llm(
+        self,
+        prompt: Prompt,
+        max_tokens: int = 256,
+        priority: Optional[int] = None,
+        kind: str = KIND_COMMENTARY,
+    ) -> Optional[str]:
+        """调用 LLM API，返回文本响应。超时或异常返回 None。
+
+        priority 为空时使用当前上下文的优先级（投机预取任务继承 SPECULATIVE）。
+        """
+        routes = self._ranked_routes()
+        if not routes:
             return None
+        route = routes[0]
+        timeout = self._timeout(route)
+        span = self._span(route, kind)
         try:
-            resp = await asyncio.wait_for(
-                self._client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7,
-                    max_tokens=256,
-                ),
-                timeout=LLM_TIMEOUT,
+            raw = await asyncio.wait_for(
+                self._request(route, prompt, max_tokens, span, priority), timeout=timeout
             )
-            content = resp.choices[0].message.content
-            logger.info("LlmAI(%s) 响应: %s", self.character, content[:200])
-            return content
         except asyncio.TimeoutError:
-            logger.warning("LlmAI(%s): LLM 调用超时(%ds)", self.character, LLM_TIMEOUT)
-            return None
-        except Exception as e:
-            logger.warning("LlmAI(%s): LLM 调用异常: %s", self.character, e)
+            span.resolve(CALL_TIMEOUT)
+            self._on_timeout(route, timeout)
             return None
+        except asyncio.CancelledError:
+            span.resolve(CALL_CANCELLED)
+            raise
+        if raw is not None:
+            span.resolve(CALL_OK if _extract_json(raw) is not None else CALL_PARSE_FAIL)
+        return raw
+
+    async def _call_llm_hedged(
+        self,
+        prompt: Prompt,
+        accept: Callable[[str], Optional[_T]],
+        kind: str,
+        max_tokens: int = 256,
+        outcome_of: Optional[Callable[[_T], str]] = None,
+    ) -> Tuple[Optional[str], Optional[_T]]:
+        """回合决策调用：超过 p90 仍未返回时补发对冲请求（或提前交给规则引擎）。
+
+        对冲请求优先发往次优路由。accept 校验响应，返回非 None 即采用；
+        取最先通过校验的结果，其余请求取消。outcome_of 将校验结果细分为遥测分类。
+        返回 (最后收到的响应, 校验结果)，都没有返回时为 (None, None)。
+        """
+        routes = self._ranked_routes()
+        if not routes:
+            return None, None
+        primary_route = routes[0]
+        hedge_route = routes[1] if len(routes) > 1 else primary_route
+        tracker = primary_route.latency
+        tracker.calls += 1
+        timeout = self._timeout(primary_route)
+        delay = self.hedge.hedge_delay(tracker) if self.hedge is not None else None
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        span = self._span(primary_route, kind)
+        primary = asyncio.ensure_future(self._request(primary_route, prompt, max_tokens, span))
+        pending = {primary}
+        route_of = {primary: primary_route}
+        span_of = {primary: span}
+        # 已按超时计入样本的请求（放弃时不再重复计入）
+        timed_out: set = set()
+        last_raw = None
+        try:
+            while pending:
+                wake = start + timeout if delay is None else start + min(delay, timeout)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, wake - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    raw = task.result()
+                    if raw is None:
+                        continue
+                    parsed = accept(raw)
+                    span_of[task].resolve(self._call_outcome(raw, parsed, outcome_of))
+                    if parsed is not None:
+                        if task is not primary:
+                            tracker.hedge_wins += 1
+                        return raw, parsed
+                    last_raw = raw
+                if done:
+                    continue
+
+                if delay is not None and delay < timeout:
+                    delay = None
+                    if self.hedge.mode == HEDGE_FALLBACK:
+                        tracker.early_fallbacks += 1
+                        logger.info("LlmAI(%s): 超过 p90 未返回，交给规则引擎", self.character)
+                        break
+                    tracker.hedges += 1
+                    logger.info("LlmAI(%s): 超过 p90 未返回，向 %s 发起对冲请求",
+                                self.character, hedge_route.name)
+                    span = self._span(hedge_route, kind)
+                    task = asyncio.ensure_future(
+                        self._request(hedge_route, prompt, max_tokens, span, coalesce=False)
+                    )
+                    route_of[task] = hedge_route
+                    span_of[task] = span
+                    pending.add(task)
+                    continue
+
+                for task in pending:
+                    span_of[task].resolve(CALL_TIMEOUT)
+                timed_out.update(pending)
+                for route in {route_of[t].name: route_of[t] for t in pending}.values():
+                    self._on_timeout(route, timeout)
+                break
+            return last_raw, None
+        finally:
+            for task in pending:
+                # 被放弃的请求在此刻计时结束（用量未知）
+                span_of[task].resolve(CALL_CANCELLED)
+                span_of[task].end()
+                task.cancel()
+            if primary in pending and primary not in timed_out:
+                # 原请求超过 p90 被放弃（提前 fallback 或输给对冲）：已耗时作为删失样本计入，
+                # 否则样本只剩快于 p90 的响应，p90 会一路下滑。输给原请求的对冲请求只跑了一小段，不计入
+                tracker.observe(loop.time() - start)
+
+    def _on_timeout(self, route: Route, timeout: float) -> None:
+        # 超时按上限计入样本，服务整体变慢时超时阈值随之放宽；同时计入熔断失败
+        route.latency.timeouts += 1
+        route.latency.observe(timeout)
+        route.breaker.record_failure()
+        logger.warning("LlmAI(%s): LLM 调用超时(%s, %.1fs)", self.character, route.name, timeout)
 
     # ----------------------------------------------------------
     #  异步叫分
@@ -282,25 +652,39 @@ class LlmAI:
         self, player: Player, state: GameState
     ) -> Tuple[int, str]:
         """异步叫分，返回 (bid, strategy_text)。失败时 fallback 到 RuleAI。"""
-        prompt = _build_bid_prompt(player, state, self.character)
-        raw = await self._call_llm(prompt)
+        if self.async_commentary:
+            return self._fallback.decide_bid(player, state), ""
 
-        if raw is not None:
-            data = _extract_json(raw)
-            if data is not None:
-                bid = data.get("bid", 0)
-                strategy = data.get("strategy", "")
-                # 校验叫分合法性
-                if isinstance(bid, (int, float)) and 0 <= int(bid) <= 3:
-                    bid = int(bid)
-                    if bid == 0 or bid > state.highest_bid:
-                        return bid, strategy
-                logger.warning("LlmAI(%s): 叫分值非法 bid=%s", self.character, bid)
+        if self.compact:
+            prompt = compact_prompt.messages(
+                self._system_prompt(), compact_prompt.bid_turn(player, state)
+            )
+        else:
+            prompt = _build_bid_prompt(player, state, self.character)
+        _, result = await self._call_llm_hedged(
+            prompt, lambda raw: self._parse_bid_response(raw, state), KIND_BID
+        )
+        if result is not None:
+            return result
 
         # fallback
         fb_bid = self._fallback.decide_bid(player, state)
         return fb_bid, ""
 
+    def _parse_bid_response(self, raw: str, state: GameState) -> Optional[Tuple[int, str]]:
+        """解析并校验叫分响应，非法返回 None"""
+        data = _extract_json(raw)
+        if data is None:
+            return None
+        bid = data.get("bid", 0)
+        strategy = data.get("strategy", "")
+        if isinstance(bid, (int, float)) and 0 <= int(bid) <= 3:
+            bid = int(bid)
+            if bid == 0 or bid > state.highest_bid:
+                return bid, strategy
+        logger.warning("LlmAI(%s): 叫分值非法 bid=%s", self.character, bid)
+        return None
+
     # ----------------------------------------------------------
     #  异步出牌
     # ----------------------------------------------------------
@@ -309,18 +693,298 @@ class LlmAI:
         self, player: Player, state: GameState
     ) -> Tuple[Optional[List[Card]], str]:
         """异步出牌，返回 (cards_or_None, strategy_text)。失败时 fallback 到 RuleAI。"""
-        prompt = _build_play_prompt(player, state, self.character)
-        raw = await self._call_llm(prompt)
-
-        if raw is not None:
-            result = self._parse_play_response(raw, player, state)
-            if result is not None:
-                return result
+        if self.async_commentary:
+            return self._fallback.decide_play(player, state), ""
+
+        if self.cache is not None:
+            cached = self.cache.lookup(self.character, self.model, player, state)
+            if cached is not None:
+                return cached
+
+        started = time.perf_counter()
+        result, outcome, stream = await self._llm_decide_play(player, state)
+        self._record(outcome, (time.perf_counter() - started) * 1000)
+        if result is not None:
+            validated = outcome in (OUTCOME_OK, OUTCOME_REPAIRED)
+            if validated and self.decision_log is not None:
+                # 投机预取的决策只在被采用时记录，未命中的分支不进入训练数据
+                cards = result[0]
+                self._defer_or_run(player, state, lambda: self.decision_log.append(
+                    self.character, self.model, player, state, cards
+                ))
+            cacheable = self.cache is not None and validated
+            if stream is not None:
+                self._hold_stream(player, state, stream, result[0], cacheable)
+            elif cacheable:
+                self.cache.store(self.character, self.model, player, state, *result)
+            return result
 
         # fallback
         fb_cards = self._fallback.decide_play(player, state)
         return fb_cards, ""
 
+    async def _llm_decide_play(
+        self, player: Player, state: GameState
+    ) -> Tuple[Optional[Tuple[Optional[List[Card]], str]], str, Optional[StrategyStream]]:
+        """调用 LLM 出牌，返回 (结果或 None, 决策结果分类, 仍在生成的解说流或 None)"""
+        indexed = self.prompt_mode == PROMPT_INDEXED
+        if indexed:
+            moves = generate_moves(player.hand, state.last_play)
+            if not moves and state.last_play is not None:
+                # 无牌可压，无需调用 LLM
+                return (None, ""), OUTCOME_SKIPPED, None
+            moves = rank_moves(moves, player.hand)[:self.move_top_k]
+            if self.compact:
+                prompt = self._compact_play_prompt(
+                    player, state, compact_prompt.indexed_play_turn(player, state, moves)
+                )
+            else:
+                prompt = _build_indexed_play_prompt(player, state, self.character, moves)
+        else:
+            moves = []
+            if self.compact:
+                prompt = self._compact_play_prompt(
+                    player, state, compact_prompt.play_turn(player, state)
+                )
+            else:
+                prompt = _build_play_prompt(player, state, self.character)
+
+        def accept(raw: str):
+            return self._parse_decision(raw, moves, player, state)
+
+        def outcome_of(parsed) -> str:
+            return CALL_REPAIRED if parsed[1] == OUTCOME_REPAIRED else CALL_OK
+
+        stream = None
+        if self.stream:
+            raw, stream, span = await self._stream_llm(prompt, indexed)
+            parsed = accept(raw) if raw is not None else None
+            if raw is not None:
+                span.resolve(self._call_outcome(raw, parsed, outcome_of))
+        else:
+            raw, parsed = await self._call_llm_hedged(prompt, accept, KIND_PLAY,
+                                                      outcome_of=outcome_of)
+        if raw is None:
+            return None, OUTCOME_NO_RESPONSE, None
+        if parsed is None:
+            if stream is not None:
+                stream.cancel()  # 已决定 fallback，剩余解说无用
+            return None, OUTCOME_INVALID, None
+
+        result, outcome = parsed
+        if stream is not None and stream.done:
+            # 决策提交前解说已生成完毕，直接带上全文
+            result, stream = (result[0], stream.text or result[1]), None
+        return result, outcome, stream
+
+    def _compact_play_prompt(
+        self, player: Player, state: GameState, turn_text: str
+    ) -> Prompt:
+        """紧凑编码的出牌 prompt：启用会话时带上本局的滚动历史"""
+        system = self._system_prompt()
+        if self.session is None:
+            return compact_prompt.messages(system, turn_text)
+        history, snap = self.session.prepare(player, state, turn_text)
+        self._defer_or_run(player, state, lambda: self.session.commit(snap))
+        return [{"role": "system", "content": system}] + history
+
+    def _parse_decision(
+        self, raw: str, moves: List[PlayedHand], player: Player, state: GameState
+    ) -> Optional[Tuple[Tuple[Optional[List[Card]], str], str]]:
+        """解析出牌响应（必要时修复），返回 (结果, 决策结果分类)；非法返回 None"""
+        if self.prompt_mode == PROMPT_INDEXED:
+            result = self._parse_indexed_response(raw, moves, state)
+            return (result, OUTCOME_OK) if result is not None else None
+        if self.compact:
+            return self._parse_compact_play_response(raw, player, state)
+        result = self._parse_play_response(raw, player, state)
+        if result is not None:
+            return result, OUTCOME_OK
+        if self.repair:
+            result = self._repair_play_response(raw, player, state)
+            if result is not None:
+                return result, OUTCOME_REPAIRED
+        return None
+
+    def _record(self, outcome: str, latency_ms: Optional[float] = None) -> None:
+        """记录出牌决策结果（按模型与 prompt 模式聚合，流式模式单独统计）"""
+        mode = f"{self.prompt_mode}+stream" if self.stream else self.prompt_mode
+        decision_stats.record(self.model, mode, outcome, latency_ms)
+
+    # ----------------------------------------------------------
+    #  流式出牌（出牌字段到齐即提交，解说继续生成）
+    # ----------------------------------------------------------
+
+    async def _stream_llm(
+        self, prompt: Prompt, indexed: bool
+    ) -> Tuple[Optional[str], Optional[StrategyStream], Optional[CallSpan]]:
+        """流式调用 LLM。
+
+        出牌字段到齐时立即返回 (合成 JSON, 解说流, span)，解说流在后台继续接收；
+        流结束仍未凑齐字段则返回 (全文, 已结束的解说流, span)。超时或异常返回 (None, None, None)。
+        span 的结果分类由调用方在校验后判定，token 用量在流结束时补齐。
+        """
+        routes = self._ranked_routes()
+        if not routes:
+            return None, None, None
+        route = routes[0]
+        decided: asyncio.Future = asyncio.get_running_loop().create_future()
+        scanner = JsonFieldScanner()
+        stream = StrategyStream()
+        span = self._span(route, KIND_PLAY, stream=True)
+
+        async def pump() -> None:
+            await route.endpoint.admit(_request_tokens(_as_messages(prompt), 256))
+            async with route.endpoint.request():
+                started = time.perf_counter()
+                chunks = await route.client.chat.completions.create(
+                    model=route.model,
+                    messages=_as_messages(prompt),
+                    temperature=0.7,
+                    max_tokens=256,
+                    stream=True,
+                )
+                async for chunk in chunks:
+                    if getattr(chunk, "usage", None) is not None:
+                        span.add_usage(chunk.usage)
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    scanner.feed(chunk.choices[0].delta.content)
+                    stream.update(scanner.strategy())
+                    if decided.done():
+                        continue
+                    spec = decision_spec(indexed, scanner.field("action", "str"), self.compact)
+                    fields = scanner.fields(spec) if spec else None
+                    if fields is not None:
+                        # 延迟样本取"得出决策"的耗时，与非流式调用的超时/对冲口径一致
+                        route.latency.observe(time.perf_counter() - started)
+                        decided.set_result(synthesize(fields, stream.text))
+            route.breaker.record_success()
+            logger.info("LlmAI(%s) 流式响应: %s", self.character, scanner.text[:200])
+            if not decided.done():
+                decided.set_result(scanner.text)
+
+        timeout = self._timeout(route)
+
+        async def run() -> None:
+            try:
+                await asyncio.wait_for(pump(), timeout=timeout)
+                stream.complete = True
+            except asyncio.TimeoutError:
+                if decided.done():
+                    # 出牌已提交，只是解说没写完，不算端点故障
+                    logger.info("LlmAI(%s): 解说流超时截断", self.character)
+                else:
+                    span.resolve(CALL_TIMEOUT)
+                    self._on_timeout(route, timeout)
+            except asyncio.CancelledError:
+                span.resolve(CALL_CANCELLED)
+                raise
+            except Exception as e:
+                route.breaker.record_failure()
+                if not decided.done():
+                    span.resolve(CALL_ERROR)
+                logger.warning("LlmAI(%s): LLM 流式调用异常(%s): %s", self.character, route.name, e)
+            finally:
+                if not decided.done():
+                    decided.set_result(None)
+                stream.finish()
+                span.end()
+
+        stream.task = asyncio.ensure_future(run())
+        try:
+            raw = await decided
+        except asyncio.CancelledError:
+            stream.cancel()  # 投机预取被丢弃
+            raise
+        if raw is None:
+            return None, None, None
+        return raw, stream, span
+
+    def _hold_stream(
+        self,
+        player: Player,
+        state: GameState,
+        stream: StrategyStream,
+        cards: Optional[List[Card]],
+        cacheable: bool,
+    ) -> None:
+        """登记仍在生成解说的决策，等待 server 层取走；解说完整生成后再写入缓存（超时截断的不缓存）"""
+        sig = state_signature(state, player.id)
+        old = self._streams.pop(sig, None)
+        if old is not None:
+            old.cancel()
+        self._streams[sig] = stream
+        if cacheable:
+            # 局面此后会被推进，键需在此刻计算
+            key = self.cache.make_key(self.character, self.model, player, state)
+
+            def _store(task: asyncio.Task) -> None:
+                if stream.complete:
+                    self.cache.store_key(self.character, key, cards, stream.text)
+
+            stream.task.add_done_callback(_store)
+
+    def _defer_or_run(
+        self, player: Player, state: GameState, effect: Callable[[], None]
+    ) -> None:
+        """投机预取中的副作用暂存到预取被采用时再执行；真实决策（或已被采用的预取）立即执行"""
+        sig = state_signature(state, player.id)
+        if current_priority() != PRIORITY_SPECULATIVE or sig == self._accepted:
+            effect()
+        else:
+            self._deferred.setdefault(sig, []).append(effect)
+
+    def accept_speculation(self, player: Player, state: GameState) -> None:
+        """预取命中：执行该局面暂存的副作用（预取仍在进行时，其后续副作用直接执行），其余分支丢弃"""
+        sig = state_signature(state, player.id)
+        effects = self._deferred.pop(sig, [])
+        self._deferred.clear()
+        self._accepted = sig
+        for effect in effects:
+            effect()
+
+    def discard_speculation(self) -> None:
+        """预取全部未命中或被取消：丢弃暂存的副作用"""
+        self._deferred.clear()
+        self._accepted = None
+
+    def take_strategy_stream(
+        self, player: Player, state: GameState
+    ) -> Optional[StrategyStream]:
+        """取出与当前真实局面对应的解说流；其余（未命中的投机分支）全部取消"""
+        stream = self._streams.pop(state_signature(state, player.id), None)
+        for other in self._streams.values():
+            other.cancel()
+        self._streams.clear()
+        return stream
+
+    # ----------------------------------------------------------
+    #  并发解说（解说分离模式）
+    # ----------------------------------------------------------
+
+    def start_commentary(
+        self, player: Player, state: GameState, action_text: str
+    ) -> Optional["asyncio.Task[str]"]:
+        """为已决定的动作并发生成人格化解说，返回 Task（非解说分离模式返回 None）。
+
+        prompt 在调用时立即构建，之后局面继续推进不会影响解说内容。
+        """
+        if not self.async_commentary:
+            return None
+        prompt = _build_commentary_prompt(player, state, self.character, action_text)
+        return asyncio.ensure_future(self._generate_commentary(prompt))
+
+    async def _generate_commentary(self, prompt: str) -> str:
+        """调用 LLM 生成解说文本，失败返回空串"""
+        raw = await self._call_llm(prompt, max_tokens=64, priority=PRIORITY_COMMENTARY)
+        if raw is None:
+            return ""
+        data = _extract_json(raw)
+        if data is not None:
+            return str(data.get("strategy", "")).strip()
+        return raw.strip().strip('"')[:30]
+
     # ----------------------------------------------------------
     #  出牌响应解析与验证
     # ----------------------------------------------------------
@@ -357,6 +1021,94 @@ class LlmAI:
 
         return self._validate_cards(card_texts, player, state, strategy)
 
+    def _parse_compact_play_response(
+        self, raw: str, player: Player, state: GameState
+    ) -> Optional[Tuple[Tuple[Optional[List[Card]], str], str]]:
+        """解析紧凑编码的出牌响应：点数记号 → 手牌中的具体牌，非法时按需修复"""
+        data = _extract_json(raw)
+        if data is None:
+            logger.warning("LlmAI(%s): JSON 解析失败", self.character)
+            return None
+        action = str(data.get("action", "")).lower()
+        strategy = data.get("strategy", "")
+        if action == "pass":
+            if state.last_play is None:
+                logger.warning("LlmAI(%s): 自由出牌时选择 pass，fallback", self.character)
+                return None
+            return (None, strategy), OUTCOME_OK
+        if action != "play" or not isinstance(data.get("cards"), str):
+            logger.warning("LlmAI(%s): action/cards 字段非法", self.character)
+            return None
+
+        ranks = parse_ranks_text(data["cards"])
+        if not ranks:
+            logger.warning("LlmAI(%s): 无法解析点数记号 %r", self.character, data["cards"])
+            return None
+        cards = pick_cards(player.hand, ranks)
+        if cards is not None:
+            hand = detect_hand(cards)
+            if hand is not None and (state.last_play is None or can_beat(hand, state.last_play)):
+                return (cards, strategy), OUTCOME_OK
+        logger.warning("LlmAI(%s): 出牌非法 %s", self.character, data["cards"])
+        if not self.repair:
+            return None
+        repaired = repair_move(ranks, player.hand, state.last_play)
+        if repaired is None:
+            return None
+        move, kind = repaired
+        logger.info("LlmAI(%s): 出牌已修复(%s) %s", self.character, kind, data["cards"])
+        return (list(move.cards), strategy), OUTCOME_REPAIRED
+
+    def _repair_play_response(
+        self, raw: str, player: Player, state: GameState
+    ) -> Optional[Tuple[Optional[List[Card]], str]]:
+        """出牌非法时，将 LLM 的出牌意图修复为最接近的合法出牌（不再调用 LLM）"""
+        data = _extract_json(raw)
+        if data is None or str(data.get("action", "")).lower() != "play":
+            return None
+        card_texts = data.get("cards")
+        if not card_texts or not isinstance(card_texts, list):
+            return None
+        intent = parse_intent_ranks(card_texts)
+        if intent is None:
+            return None
+
+        repaired = repair_move(intent, player.hand, state.last_play)
+        if repaired is None:
+            return None
+        move, kind = repaired
+        logger.info(
+            "LlmAI(%s): 出牌已修复(%s) %s → %s",
+            self.character, kind, card_texts, _hand_str(move.cards),
+        )
+        return list(move.cards), data.get("strategy", "")
+
+    def _parse_indexed_response(
+        self, raw: str, moves: List[PlayedHand], state: GameState
+    ) -> Optional[Tuple[Optional[List[Card]], str]]:
+        """解析编号候选模式的响应：编号 → 候选出牌的具体 Card 列表"""
+        data = _extract_json(raw)
+        if data is None:
+            logger.warning("LlmAI(%s): JSON 解析失败", self.character)
+            return None
+
+        strategy = data.get("strategy", "")
+        try:
+            move_id = int(data.get("move"))
+        except (TypeError, ValueError):
+            logger.warning("LlmAI(%s): move 编号非法 %r", self.character, data.get("move"))
+            return None
+
+        if move_id == 0:
+            if state.last_play is None:
+                logger.warning("LlmAI(%s): 自由出牌时选择 pass，fallback", self.character)
+                return None
+            return None, strategy
+        if not 1 <= move_id <= len(moves):
+            logger.warning("LlmAI(%s): move 编号越界 %d", self.character, move_id)
+            return None
+        return list(moves[move_id - 1].cards), strategy
+
     def _validate_cards(
         self,
         card_texts: List[str],
@@ -402,18 +1154,59 @@ def create_llm_players(names: List[str]) -> List[LlmAI]:
 
     环境变量命名规则：
       AI_PLAYER{i}_API_KEY / AI_PLAYER{i}_BASE_URL / AI_PLAYER{i}_MODEL
-    未配置 API key 的玩家自动 fallback 到 RuleAI。
+      AI_PLAYER{i}_ENDPOINTS：多个候选端点 base_url|model[|api_key]，逗号分隔，
+        配置后取代 BASE_URL/MODEL，按熔断状态与延迟路由（见 routing.parse_endpoints）
+      LLM_COMMENTARY_MODE：inline（默认）/ async（规则引擎出牌 + LLM 并发解说）
+      LLM_PROMPT_MODE：free（默认，LLM 写出牌面）/ indexed（从编号合法出牌中选择）
+      LLM_MOVE_TOP_K：indexed 模式下候选出牌数上限
+      LLM_PROMPT_ENCODING：verbose（默认）/ compact（固定 system 前缀 + 点数记号）
+      LLM_SESSION_BUDGET：compact 编码下每局会话历史的 token 预算（默认 0=不保留历史）
+      LLM_REPAIR：free 模式下是否将非法出牌修复为最接近的合法出牌（默认 1）
+      LLM_CACHE_*：决策缓存配置（见 create_decision_cache），进程内所有玩家共享一个缓存
+      LLM_STREAM：流式出牌，出牌字段到达即提交，解说边生成边推送（默认 0）
+      LLM_HEDGE / LLM_HEDGE_BUDGET / LLM_TIMEOUT_*：慢响应对冲与自适应超时（见 create_hedge_policy）
+      LLM_DECISION_LOG：经过验证的 LLM 出牌日志路径（用于训练模仿模型，留空=不记录）
+      LLM_IMITATION_MODEL：人格模仿模型路径，配置后兜底出牌使用该人格的模仿策略
+      LLM_OFFLINE_PERSONA：离线人格模式，不调用 LLM，直接由模仿策略出牌（默认 0）
+    未配置 API key 的玩家自动 fallback 到 RuleAI（或模仿策略）。
     """
+    commentary_mode = os.getenv("LLM_COMMENTARY_MODE", COMMENTARY_INLINE)
+    prompt_mode = os.getenv("LLM_PROMPT_MODE", PROMPT_FREE)
+    move_top_k = int(os.getenv("LLM_MOVE_TOP_K", str(DEFAULT_MOVE_TOP_K)))
+    prompt_encoding = os.getenv("LLM_PROMPT_ENCODING", PROMPT_VERBOSE)
+    session_budget = int(os.getenv("LLM_SESSION_BUDGET", "0"))
+    repair = os.getenv("LLM_REPAIR", "1") not in ("0", "false", "False", "")
+    cache = get_decision_cache()
+    stream = os.getenv("LLM_STREAM", "0") not in ("0", "false", "False", "")
+    hedge = create_hedge_policy()
+    decision_log = get_decision_log()
+    imitation = get_imitation_policy()
+    offline = os.getenv("LLM_OFFLINE_PERSONA", "0") not in ("0", "false", "False", "")
     players: List[LlmAI] = []
     for i, name in enumerate(names):
         idx = i + 1  # 环境变量从 1 开始
         api_key = os.getenv(f"AI_PLAYER{idx}_API_KEY", "")
         base_url = os.getenv(f"AI_PLAYER{idx}_BASE_URL", "https://api.deepseek.com/v1")
         model = os.getenv(f"AI_PLAYER{idx}_MODEL", "deepseek-chat")
+        endpoints_text = os.getenv(f"AI_PLAYER{idx}_ENDPOINTS", "")
+        endpoints = parse_endpoints(endpoints_text, api_key) if endpoints_text else None
         players.append(LlmAI(
             character=name,
             api_key=api_key,
             base_url=base_url,
             model=model,
+            commentary_mode=commentary_mode,
+            prompt_mode=prompt_mode,
+            move_top_k=move_top_k,
+            repair=repair,
+            cache=cache,
+            stream=stream,
+            hedge=hedge,
+            endpoints=endpoints,
+            prompt_encoding=prompt_encoding,
+            session_budget=session_budget,
+            decision_log=decision_log,
+            imitation=imitation,
+            offline=offline,
         ))
     return players
@@ -0,0 +1,83 @@
+"""LLM 决策统计 - 按模型与 prompt 模式统计非法响应率与 fallback 率"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# 决策结果分类
+OUTCOME_OK = "ok"                  # LLM 响应合法并被采用
+OUTCOME_INVALID = "invalid"        # 响应可解析失败或出牌非法，fallback 到 RuleAI
+OUTCOME_REPAIRED = "repaired"      # 出牌非法，但已修复为最接近的合法出牌
+OUTCOME_NO_RESPONSE = "no_response"  # 超时/异常，fallback 到 RuleAI
+OUTCOME_SKIPPED = "skipped"        # 无需调用 LLM（如跟牌时无牌可压）
+
+
+@dataclass
+class DecisionCounter:
+    """单个 (模型, prompt 模式) 的决策计数"""
+    calls: int = 0
+    ok: int = 0
+    invalid: int = 0
+    repaired: int = 0
+    no_response: int = 0
+    skipped: int = 0
+    timed: int = 0
+    latency_ms: float = 0.0    # 调用 LLM 到得出决策的累计耗时
+
+    @property
+    def fallback(self) -> int:
+        return self.invalid + self.no_response
+
+    def to_dict(self) -> dict:
+        answered = self.calls - self.no_response
+        bad = self.invalid + self.repaired
+        return {
+            "calls": self.calls,
+            "ok": self.ok,
+            "invalid": self.invalid,
+            "repaired": self.repaired,
+            "no_response": self.no_response,
+            "skipped": self.skipped,
+            "invalid_rate": round(bad / answered, 4) if answered else 0.0,
+            "repair_rate": round(self.repaired / bad, 4) if bad else 0.0,
+            "fallback_rate": round(self.fallback / self.calls, 4) if self.calls else 0.0,
+            "avg_decision_ms": round(self.latency_ms / self.timed, 1) if self.timed else 0.0,
+        }
+
+
+class DecisionStats:
+    """进程级决策统计，按 (model, prompt_mode) 聚合"""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, str], DecisionCounter] = defaultdict(DecisionCounter)
+
+    def record(
+        self, model: str, prompt_mode: str, outcome: str, latency_ms: Optional[float] = None
+    ) -> None:
+        """记录一次出牌决策结果（latency_ms：得出决策的耗时，超时/跳过不计）"""
+        counter = self._counters[(model, prompt_mode)]
+        if outcome == OUTCOME_SKIPPED:
+            counter.skipped += 1
+            return
+        counter.calls += 1
+        setattr(counter, outcome, getattr(counter, outcome) + 1)
+        if latency_ms is not None and outcome != OUTCOME_NO_RESPONSE:
+            counter.timed += 1
+            counter.latency_ms += latency_ms
+
+    def get(self, model: str, prompt_mode: str) -> DecisionCounter:
+        return self._counters[(model, prompt_mode)]
+
+    def snapshot(self) -> List[dict]:
+        """导出为可 JSON 序列化的列表"""
+        return [
+            {"model": model, "prompt_mode": mode, **counter.to_dict()}
+            for (model, mode), counter in sorted(self._counters.items())
+        ]
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+# 进程级单例
+decision_stats = DecisionStats()
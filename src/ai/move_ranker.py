@@ -0,0 +1,40 @@
+"""出牌启发式排序 - 用于给 LLM 提供 top-K 候选出牌"""
+
+from collections import Counter
+from typing import List
+
+from src.engine.card import Card, Rank
+from src.engine.hand_type import PlayedHand
+
+
+def heuristic_score(move: PlayedHand, hand: List[Card]) -> float:
+    """
+    简单启发式评分（越高越值得出）：
+    - 一手出完直接最高分
+    - 出牌张数越多越好（消牌效率）
+    - 主牌点数越小越好（保留大牌）
+    - 拆对子/三条/炸弹扣分，动用炸弹/火箭扣分
+    """
+    if len(move.cards) == len(hand):
+        return 1000.0
+
+    rc = Counter(c.rank for c in hand)
+    used = Counter(c.rank for c in move.cards)
+
+    score = len(move.cards) * 1.0
+    score -= (int(move.main_rank) - int(Rank.THREE)) * 0.4
+
+    for r, n in used.items():
+        if n < rc[r]:
+            score -= 1.5 if rc[r] == 4 and not move.is_bomb_like else 1.0
+    if move.is_bomb_like:
+        score -= 8.0
+    # 带牌尽量用小牌
+    kickers = [r for r in used if r != move.main_rank and used[r] < 3]
+    score -= sum(int(r) - int(Rank.THREE) for r in kickers) * 0.1
+    return score
+
+
+def rank_moves(moves: List[PlayedHand], hand: List[Card]) -> List[PlayedHand]:
+    """按启发式评分从高到低排序"""
+    return sorted(moves, key=lambda m: heuristic_score(m, hand), reverse=True)
@@ -0,0 +1,110 @@
+"""出牌修复 - 将 LLM 的非法出牌意图映射到最接近的合法出牌（不需要二次调用）"""
+
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from src.engine.card import Card, Rank, Suit, RANK_DISPLAY
+from src.engine.hand_type import PlayedHand
+from src.engine.hand_detector import detect_hand
+from src.engine.move_generator import generate_moves
+
+# 修复方式
+REPAIR_SUITS = "suits"          # 点数正确，替换花色
+REPAIR_SUPERSET = "superset"    # 补齐缺失的牌（最小合法超集）
+REPAIR_SUBSET = "subset"        # 去掉多余的牌（最大合法子集）
+REPAIR_NEAREST = "nearest_rank"  # 同牌型，取点数最接近的
+
+# 超集/子集修复允许的最大差异张数（差太多就不再算"同一个意图"）
+MAX_SET_DIFF = 2
+
+_RANK_TEXT = {v: k for k, v in RANK_DISPLAY.items()}
+_RANK_TEXT["T"] = Rank.TEN
+_SUIT_CHARS = re.compile(r"[♠♥♦♣♤♡♢♧🃏\s]")
+
+_PLACEHOLDER_SUITS = [Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB]
+
+
+def parse_intent_ranks(card_texts: List) -> Optional[List[Rank]]:
+    """宽松解析 LLM 给出的牌面文本，只保留点数（忽略花色写错/缺失）"""
+    ranks: List[Rank] = []
+    for t in card_texts:
+        if not isinstance(t, str):
+            return None
+        text = _SUIT_CHARS.sub("", t)
+        rank = _RANK_TEXT.get(text.upper())
+        if rank is None:
+            return None
+        ranks.append(rank)
+    return ranks or None
+
+
+def _intent_shape(ranks: List[Rank]) -> Optional[PlayedHand]:
+    """按点数构造占位牌检测意图牌型（不关心是否持有）"""
+    used = Counter()
+    cards = []
+    for r in ranks:
+        if r in (Rank.SMALL_JOKER, Rank.BIG_JOKER):
+            if used[r]:
+                return None
+            cards.append(Card(rank=r, suit=Suit.JOKER))
+        else:
+            if used[r] >= 4:
+                return None
+            cards.append(Card(rank=r, suit=_PLACEHOLDER_SUITS[used[r]]))
+        used[r] += 1
+    return detect_hand(cards)
+
+
+def repair_move(
+    intent: List[Rank], hand: List[Card], last_play: Optional[PlayedHand]
+) -> Optional[Tuple[PlayedHand, str]]:
+    """
+    为非法出牌意图寻找最接近的合法出牌，返回 (出牌, 修复方式)。
+    优先级：替换花色 > 最小超集/最大子集 > 同牌型最近点数。找不到返回 None。
+    意图本身不是炸弹 / 火箭时，不会修复成炸弹 / 火箭（倍数翻倍必须是 LLM 自己的选择）。
+    """
+    moves = generate_moves(hand, last_play)
+    if not moves:
+        return None
+
+    want = Counter(intent)
+    shape = _intent_shape(intent)
+    allow_bomb = shape is not None and shape.is_bomb_like
+
+    # 1. 点数完全一致，仅花色不对
+    for m in moves:
+        if Counter(c.rank for c in m.cards) == want:
+            return m, REPAIR_SUITS
+
+    # 2. 最小超集 / 最大子集（差异张数最少者）
+    best: Optional[Tuple[int, PlayedHand, str]] = None
+    for m in moves:
+        if m.is_bomb_like and not allow_bomb:
+            continue
+        have = Counter(c.rank for c in m.cards)
+        if not have - want:
+            kind, diff = REPAIR_SUBSET, sum((want - have).values())
+        elif not want - have:
+            kind, diff = REPAIR_SUPERSET, sum((have - want).values())
+        else:
+            continue
+        if diff > MAX_SET_DIFF:
+            continue
+        if best is None or diff < best[0]:
+            best = (diff, m, kind)
+    if best is not None:
+        return best[1], best[2]
+
+    # 3. 同牌型同长度，主牌点数最接近
+    if shape is None:
+        return None
+    same = [
+        m for m in moves
+        if m.type == shape.type and m.chain_length == shape.chain_length
+        and (allow_bomb or not m.is_bomb_like)
+    ]
+    if not same:
+        return None
+    nearest = min(same, key=lambda m: (abs(int(m.main_rank) - int(shape.main_rank)), m.main_rank))
+    return nearest, REPAIR_NEAREST
@@ -0,0 +1,242 @@
+"""端点路由 - 每位人格可配置多个 (端点, 模型)，按熔断状态与延迟选择最健康的一个"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.ai.client_pool import ClientRegistry, Endpoint
+from src.ai.latency import LatencyRegistry, LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# 熔断器状态
+BREAKER_CLOSED = "closed"        # 正常放行
+BREAKER_OPEN = "open"            # 熔断，不再路由到该端点
+BREAKER_HALF_OPEN = "half_open"  # 后台探测中
+
+# 延迟样本不足时不参与延迟排序（按配置顺序）
+MIN_LATENCY_SAMPLES = 5
+
+# 探测请求超时（秒）
+PROBE_TIMEOUT = 5
+
+
+class CircuitBreaker:
+    """
+    单个 (端点, 模型) 的熔断器：连续失败/超时 failure_threshold 次后熔断；
+    熔断期间每隔 reset_timeout 秒在后台半开探测一次，探测成功即恢复。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        probe: Optional[Callable[[], Awaitable[bool]]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.probes = 0
+        self.opened_at: Optional[float] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return self.state == BREAKER_CLOSED
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != BREAKER_CLOSED:
+            self._close()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == BREAKER_CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = BREAKER_OPEN
+        self.opened_at = time.time()
+        self.trips += 1
+        logger.warning("端点 %s 熔断（连续失败 %d 次）", self.name, self.failures)
+        if self.probe is not None and (self._probe_task is None or self._probe_task.done()):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # 无事件循环（同步上下文），不发起探测
+            self._probe_task = loop.create_task(self._probe_loop())
+
+    def _close(self) -> None:
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        logger.info("端点 %s 恢复", self.name)
+
+    async def _probe_loop(self) -> None:
+        while self.state != BREAKER_CLOSED:
+            await asyncio.sleep(self.reset_timeout)
+            self.state = BREAKER_HALF_OPEN
+            self.probes += 1
+            try:
+                ok = await self.probe()
+            except Exception:
+                ok = False
+            if ok:
+                self._close()
+            else:
+                self.state = BREAKER_OPEN
+                self.opened_at = time.time()
+
+    def cancel_probe(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "probes": self.probes,
+            "opened_at": self.opened_at,
+        }
+
+
+class BreakerRegistry:
+    """进程级熔断器表，按 (base_url, model) 共享（多位人格指向同一端点时状态一致）"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def get(
+        self, base_url: str, model: str, probe: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> CircuitBreaker:
+        key = (base_url, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(
+                f"{model}@{base_url}", self.failure_threshold, self.reset_timeout, probe
+            )
+        return breaker
+
+    def snapshot(self) -> List[dict]:
+        return [
+            {"base_url": base_url, "model": model, **breaker.to_dict()}
+            for (base_url, model), breaker in sorted(self._breakers.items())
+        ]
+
+
+def create_breaker_registry() -> BreakerRegistry:
+    """根据环境变量创建熔断器表。
+
+    环境变量：
+      LLM_BREAKER_FAILURES：连续失败多少次后熔断（默认 3）
+      LLM_BREAKER_RESET：熔断后多久发起一次后台探测（秒，默认 30）
+    """
+    return BreakerRegistry(
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+        reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+    )
+
+
+_breakers: Optional[BreakerRegistry] = None
+
+
+def get_breaker_registry() -> BreakerRegistry:
+    global _breakers
+    if _breakers is None:
+        _breakers = create_breaker_registry()
+    return _breakers
+
+
+# ============================================================
+#  路由
+# ============================================================
+
+@dataclass
+class Route:
+    """人格的一个候选 (端点, 模型)"""
+    base_url: str
+    model: str
+    endpoint: Endpoint
+    client: Any
+    latency: LatencyTracker
+    breaker: CircuitBreaker
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.base_url}"
+
+
+def build_routes(
+    specs: List[Tuple[str, str, str]],
+    registry: ClientRegistry,
+    latency: LatencyRegistry,
+    breakers: BreakerRegistry,
+) -> List[Route]:
+    """specs: [(base_url, model, api_key), ...]，顺序即优先级。未配置 api_key 的条目跳过"""
+    routes: List[Route] = []
+    for base_url, model, api_key in specs:
+        if not api_key:
+            continue
+        endpoint = registry.get(base_url, api_key)
+        routes.append(Route(
+            base_url=endpoint.base_url,
+            model=model,
+            endpoint=endpoint,
+            client=endpoint.client,
+            latency=latency.get(endpoint.base_url, model),
+            breaker=breakers.get(endpoint.base_url, model, _make_probe(endpoint, api_key)),
+        ))
+    return routes
+
+
+def _make_probe(endpoint: Endpoint, api_key: str) -> Callable[[], Awaitable[bool]]:
+    """半开探测：GET /models，服务端 5xx 或连接失败视为仍不可用"""
+    async def probe() -> bool:
+        resp = await endpoint.http_client.get(
+            f"{endpoint.base_url}/models",
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=PROBE_TIMEOUT,
+        )
+        return resp.status_code < 500
+    return probe
+
+
+def rank_routes(routes: List[Route]) -> List[Route]:
+    """未熔断的路由按中位延迟从低到高排序（样本不足的按配置顺序排在其后）"""
+    def key(item: Tuple[int, Route]):
+        idx, route = item
+        if len(route.latency.samples) < MIN_LATENCY_SAMPLES:
+            return (1, 0.0, idx)
+        return (0, route.latency.percentile(0.5), idx)
+
+    healthy = [(i, r) for i, r in enumerate(routes) if r.breaker.available]
+    return [r for _, r in sorted(healthy, key=key)]
+
+
+def parse_endpoints(text: str, default_key: str) -> List[Tuple[str, str, str]]:
+    """
+    解析 AI_PLAYER{i}_ENDPOINTS：逗号分隔的 base_url|model[|api_key]，
+    省略 api_key 时使用 AI_PLAYER{i}_API_KEY。
+    """
+    specs: List[Tuple[str, str, str]] = []
+    for item in text.split(","):
+        parts = [p.strip() for p in item.split("|")]
+        if len(parts) < 2 or not parts[0] or not parts[1]:
+            if item.strip():
+                logger.warning("忽略无法解析的端点配置: %s", item.strip())
+            continue
+        api_key = parts[2] if len(parts) > 2 and parts[2] else default_key
+        specs.append((parts[0], parts[1], api_key))
+    return specs
@@ -0,0 +1,143 @@
+"""对局会话 - 每位人格每局一份滚动消息历史，只追加紧凑的出牌增量，超出预算时折叠为摘要"""
+
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.game.player import Player
+from src.game.game_state import GameState
+from src.ai.encoding import ranks_text
+
+_CJK = re.compile(r"[　-鿿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符≈1，其余约 4 字符≈1"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def game_fingerprint(state: GameState) -> Optional[tuple]:
+    """对局标识：底牌（含花色）+ 地主座位。投机预取的局面副本与原局面一致"""
+    landlord = next((p.id for p in state.players if p.is_landlord), None)
+    if landlord is None:
+        return None
+    return landlord, tuple((int(c.rank), c.suit.value) for c in state.dizhu_cards)
+
+
+def _seat_name(pid: int, player: Player) -> str:
+    if pid == player.id:
+        return "你"
+    return "下家" if pid == (player.id + 1) % 3 else "上家"
+
+
+@dataclass
+class _Turn:
+    start: int                      # 本回合 user 消息从 play_history 的哪一条开始叙述
+    user: str
+    assistant: Optional[str] = None  # 下一回合由出牌记录推导
+
+
+@dataclass
+class SessionSnapshot:
+    """prepare 的结果，commit 后才写回会话（投机预取只预览不提交）"""
+    game: Optional[tuple]
+    seen: int
+    turns: List[_Turn] = field(default_factory=list)
+    summary_upto: int = 0
+
+
+class GameSession:
+    """
+    单个人格的对局会话。每回合只发送上次行动以来的出牌增量 + 当前局面，
+    之前的消息原样保留（服务商可对不断增长的公共前缀做缓存）；
+    历史超过 budget_tokens 时，最早的回合折叠为按座位汇总的"早前出牌"。
+    """
+
+    def __init__(self, budget_tokens: int = 600):
+        self.budget_tokens = budget_tokens
+        self._state = SessionSnapshot(game=None, seen=0)
+
+    @property
+    def turns(self) -> int:
+        return len(self._state.turns)
+
+    def prepare(
+        self, player: Player, state: GameState, turn_text: str
+    ) -> Tuple[List[Dict[str, str]], SessionSnapshot]:
+        """构建本回合的历史消息（不含 system），返回 (messages, 待提交快照)"""
+        game = game_fingerprint(state)
+        cur = self._state
+        if game != cur.game or len(state.play_history) < cur.seen:
+            cur = SessionSnapshot(game=game, seen=0)
+        turns = [_Turn(t.start, t.user, t.assistant) for t in cur.turns]
+        new = list(enumerate(state.play_history))[cur.seen:]
+
+        # 上一回合自己的回答：出牌记录里紧接着的一条是自己的出牌，否则就是不出
+        if turns and turns[-1].assistant is None:
+            if new and new[0][1][0] == player.id:
+                turns[-1].assistant = json.dumps(
+                    {"action": "play", "cards": ranks_text(new[0][1][1].cards)},
+                    ensure_ascii=False,
+                )
+                new = new[1:]
+            else:
+                turns[-1].assistant = '{"action":"pass"}'
+
+        start = new[0][0] if new else len(state.play_history)
+        lines = [f"{_seat_name(pid, player)}出 {ranks_text(hand.cards)}" for _, (pid, hand) in new]
+        user = ("近况: " + " | ".join(lines) + "\n" if lines else "") + turn_text
+        turns.append(_Turn(start, user))
+
+        snap = SessionSnapshot(game, len(state.play_history), turns, cur.summary_upto)
+        self._truncate(snap, player, state)
+        return self._render(snap, player, state), snap
+
+    def commit(self, snap: SessionSnapshot) -> None:
+        self._state = snap
+
+    def reset(self) -> None:
+        self._state = SessionSnapshot(game=None, seen=0)
+
+    # ----------------------------------------------------------
+    #  内部实现
+    # ----------------------------------------------------------
+
+    def _summary(self, upto: int, player: Player, state: GameState) -> str:
+        if upto <= 0:
+            return ""
+        by_seat: Dict[str, list] = defaultdict(list)
+        for pid, hand in state.play_history[:upto]:
+            by_seat[_seat_name(pid, player)].extend(hand.cards)
+        parts = [f"{seat}: {ranks_text(cards)}" for seat, cards in sorted(by_seat.items())]
+        return "早前出牌 " + " | ".join(parts)
+
+    def _render(
+        self, snap: SessionSnapshot, player: Player, state: GameState
+    ) -> List[Dict[str, str]]:
+        messages: List[Dict[str, str]] = []
+        summary = self._summary(snap.summary_upto, player, state)
+        for i, turn in enumerate(snap.turns):
+            user = f"{summary}\n{turn.user}" if i == 0 and summary else turn.user
+            messages.append({"role": "user", "content": user})
+            if turn.assistant is not None:
+                messages.append({"role": "assistant", "content": turn.assistant})
+        return messages
+
+    def _truncate(self, snap: SessionSnapshot, player: Player, state: GameState) -> None:
+        """
+        超出预算时丢弃最早的回合，其叙述的出牌并入摘要（当前回合始终保留）。
+        一次裁到预算的一半，使消息前缀在多个回合内保持不变、持续命中服务商缓存。
+        """
+        def cost() -> int:
+            return sum(
+                estimate_tokens(m["content"]) for m in self._render(snap, player, state)
+            )
+
+        if cost() <= self.budget_tokens:
+            return
+        while len(snap.turns) > 1 and cost() > self.budget_tokens // 2:
+            snap.turns.pop(0)
+            snap.summary_upto = snap.turns[0].start
@@ -0,0 +1,265 @@
+"""投机预取 - 当前座位思考期间，提前按最可能的后继局面发起下一座位的决策"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from src.engine.card import Card
+from src.engine.hand_detector import detect_hand
+from src.game.game_state import GameState
+from src.ai.rule_ai import RuleAI
+from src.ai.client_pool import request_priority, PRIORITY_SPECULATIVE
+
+logger = logging.getLogger(__name__)
+
+# 决策结果：(cards_or_None, strategy_text)
+Decision = Tuple[Optional[List[Card]], str]
+
+
+# ============================================================
+#  局面签名与后继局面推演
+# ============================================================
+
+def state_signature(state: GameState, pid: int) -> tuple:
+    """座位 pid 决策所依赖的局面签名（相同签名 → 相同决策输入）"""
+    player = state.players[pid]
+    last_cards = None
+    if state.last_play is not None:
+        last_cards = tuple(sorted((int(c.rank), c.suit.value) for c in state.last_play.cards))
+    return (
+        pid,
+        tuple((int(c.rank), c.suit.value) for c in player.hand),
+        tuple((p.hand_size, p.role.value) for p in state.players),
+        last_cards,
+        state.last_player if state.last_play is not None else None,
+        state.bomb_count,
+    )
+
+
+def successor_state(
+    state: GameState, pid: int, cards: Optional[List[Card]]
+) -> Optional[GameState]:
+    """推演座位 pid 出 cards（None=不出）后、下一座位决策前的局面副本。
+
+    返回 None 表示该出牌非法或会直接结束对局（无需预取）。
+    """
+    players = [replace(p, hand=list(p.hand)) for p in state.players]
+    s = replace(
+        state,
+        players=players,
+        events=[],
+        play_history=list(state.play_history),
+    )
+
+    if cards is None:
+        s.pass_count += 1
+    else:
+        hand = detect_hand(cards)
+        if hand is None or not players[pid].has_cards(cards):
+            return None
+        players[pid].remove_cards(cards)
+        if players[pid].hand_size == 0:
+            return None
+        if hand.is_bomb_like:
+            s.bomb_count += 1
+        s.last_play = hand
+        s.last_player = pid
+        s.pass_count = 0
+        s.play_history.append((pid, hand))
+
+    # 与 run_playing_async 一致：连续两家不出后转为自由出牌
+    s.current_player = (pid + 1) % 3
+    if s.last_play is None or s.pass_count >= 2:
+        s.last_play = None
+        s.last_player = None
+        s.pass_count = 0
+    return s
+
+
+# ============================================================
+#  预取统计
+# ============================================================
+
+@dataclass
+class SpeculationStats:
+    """投机预取命中/浪费统计"""
+    decisions: int = 0        # 真实决策次数
+    issued: int = 0           # 发起的投机请求数
+    hits: int = 0             # 投机结果被采用
+    misses: int = 0           # 有投机但局面不匹配
+    wasted: int = 0           # 被取消或丢弃的投机请求
+    skipped_budget: int = 0   # 因预算不足未发起的投机
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.issued if self.issued else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "decisions": self.decisions,
+            "issued": self.issued,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted": self.wasted,
+            "skipped_budget": self.skipped_budget,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+# ============================================================
+#  SpeculativePrefetcher
+# ============================================================
+
+class SpeculativePrefetcher:
+    """包装各座位的 async_decide_play，在座位 N 决策期间预取座位 N+1 的决策。
+
+    后继局面候选：座位 N 不出，或按 RuleAI 预测出牌。真实局面与某个候选签名一致时
+    直接采用其结果；否则取消全部候选并重新发起。
+
+    - max_branches：每回合最多预取的后继局面数（1=只预取最可能的一个）
+    - budget_ratio：额外请求上限 = budget_ratio × 真实决策次数
+    """
+
+    def __init__(
+        self,
+        strategies: List,
+        max_branches: int = 2,
+        budget_ratio: float = 1.0,
+        predictor: Optional[RuleAI] = None,
+    ):
+        self.strategies = strategies
+        self.max_branches = max_branches
+        self.budget_ratio = budget_ratio
+        self._predictor = predictor or RuleAI()
+        self._pending: Dict[int, Dict[tuple, asyncio.Task]] = {}
+        self.stats = SpeculationStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_branches > 0 and self.budget_ratio > 0
+
+    def reset(self) -> None:
+        """新一局开始：取消所有残留预取"""
+        for pid in list(self._pending):
+            self._discard(pid)
+
+    async def decide(self, pid: int, state: GameState) -> Decision:
+        """座位 pid 的真实决策：优先采用匹配的预取结果，并为下一座位发起预取"""
+        self.stats.decisions += 1
+        player = state.players[pid]
+
+        task = self._take(pid, state)
+        if task is None:
+            task = asyncio.ensure_future(
+                self.strategies[pid].async_decide_play(player, state)
+            )
+
+        self._speculate_next(pid, state)
+        return await task
+
+    # ----------------------------------------------------------
+    #  内部实现
+    # ----------------------------------------------------------
+
+    def _take(self, pid: int, state: GameState) -> Optional[asyncio.Task]:
+        """取出与真实局面签名匹配的预取任务，其余丢弃"""
+        pending = self._pending.pop(pid, None)
+        if not pending:
+            return None
+        sig = state_signature(state, pid)
+        task = pending.pop(sig, None)
+        if task is not None and task.cancelled():
+            task = None
+        if task is not None:
+            self.stats.hits += 1
+            accept = getattr(self.strategies[pid], "accept_speculation", None)
+            if accept is not None:
+                accept(state.players[pid], state)
+        else:
+            self.stats.misses += 1
+            self._forget(pid)
+        for other in pending.values():
+            other.cancel()
+            self.stats.wasted += 1
+        return task
+
+    def _discard(self, pid: int) -> None:
+        for task in self._pending.pop(pid, {}).values():
+            task.cancel()
+            self.stats.wasted += 1
+        self._forget(pid)
+
+    def _forget(self, pid: int) -> None:
+        """丢弃座位 pid 的策略为未采用的预取暂存的副作用（如会话写回）"""
+        discard = getattr(self.strategies[pid], "discard_speculation", None)
+        if discard is not None:
+            discard()
+
+    def _budget_left(self) -> int:
+        allowed = int(self.stats.decisions * self.budget_ratio)
+        return allowed - self.stats.issued
+
+    def _speculate_next(self, pid: int, state: GameState) -> None:
+        """按座位 pid 的可能结果，预取下一座位的决策"""
+        if not self.enabled:
+            return
+        nxt = (pid + 1) % 3
+        strategy = self.strategies[nxt]
+        if not getattr(strategy, "enabled", False):
+            return  # 未启用 LLM 的座位决策本身即时完成，无需预取
+
+        self._discard(nxt)
+        branches: Dict[tuple, asyncio.Task] = {}
+        for cards in self._candidate_outcomes(pid, state):
+            if len(branches) >= self.max_branches:
+                break
+            s = successor_state(state, pid, cards)
+            if s is None:
+                continue
+            sig = state_signature(s, nxt)
+            if sig in branches:
+                continue
+            if self._budget_left() <= 0:
+                self.stats.skipped_budget += 1
+                break
+            self.stats.issued += 1
+            with request_priority(PRIORITY_SPECULATIVE):
+                branches[sig] = asyncio.ensure_future(
+                    strategy.async_decide_play(s.players[nxt], s)
+                )
+        if branches:
+            self._pending[nxt] = branches
+            logger.debug("预取座位%d: %d 个后继局面", nxt, len(branches))
+
+    def _candidate_outcomes(
+        self, pid: int, state: GameState
+    ) -> List[Optional[List[Card]]]:
+        """座位 pid 的候选结果，按可能性排序：RuleAI 预测出牌 / 不出"""
+        player = state.players[pid]
+        predicted = self._predictor.decide_play(player, state)
+        outcomes: List[Optional[List[Card]]] = []
+        if predicted is not None:
+            outcomes.append(predicted)
+        if state.last_play is not None:
+            outcomes.append(None)
+        return outcomes
+
+
+# ============================================================
+#  工厂函数：从环境变量创建预取器
+# ============================================================
+
+def create_prefetcher(strategies: List) -> SpeculativePrefetcher:
+    """根据环境变量创建投机预取器。
+
+    环境变量：
+      LLM_SPECULATION_BRANCHES：每回合最多预取的后继局面数（0=关闭）
+      LLM_SPECULATION_BUDGET：额外请求占真实决策次数的比例上限
+    """
+    return SpeculativePrefetcher(
+        strategies,
+        max_branches=int(os.getenv("LLM_SPECULATION_BRANCHES", "0")),
+        budget_ratio=float(os.getenv("LLM_SPECULATION_BUDGET", "1.0")),
+    )
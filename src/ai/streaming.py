@@ -0,0 +1,128 @@
+"""流式响应 - 增量解析 LLM 输出的 JSON 字段，出牌字段到齐即可提交，解说继续流式推送"""
+
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Dict, Optional
+
+# 各字段"已完整到达"的匹配：字符串 / 数组 / 整数（后面必须已出现分隔符）
+_STRING_FIELD = r'"{name}"\s*:\s*"((?:[^"\\]|\\.)*)"'
+_ARRAY_FIELD = r'"{name}"\s*:\s*(\[[^\[\]]*\])'
+_INT_FIELD = r'"{name}"\s*:\s*(-?\d+)\s*[,}}\n]'
+
+# 流式解说字段（可能尚未闭合）
+_PARTIAL_STRING = re.compile(r'"strategy"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+def _unescape(partial: str) -> str:
+    """反转义 JSON 字符串片段（末尾可能是不完整的转义序列）"""
+    while partial:
+        try:
+            return json.loads(f'"{partial}"')
+        except json.JSONDecodeError:
+            partial = partial[:-1]
+    return ""
+
+
+class JsonFieldScanner:
+    """
+    累积流式文本，按需提取已完整到达的顶层字段。
+    不要求整个 JSON 闭合，因此 action/cards 到达后即可决策，strategy 仍在生成中。
+    """
+
+    def __init__(self):
+        self.text = ""
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+
+    def field(self, name: str, kind: str) -> Optional[object]:
+        """kind: "str" / "list" / "int"。字段未完整到达或无法解析返回 None"""
+        pattern = {"str": _STRING_FIELD, "list": _ARRAY_FIELD, "int": _INT_FIELD}[kind]
+        m = re.search(pattern.format(name=name), self.text)
+        if m is None:
+            return None
+        raw = m.group(1)
+        if kind == "int":
+            return int(raw)
+        try:
+            return json.loads(raw if kind == "list" else f'"{raw}"')
+        except json.JSONDecodeError:
+            return None
+
+    def fields(self, spec: Dict[str, str]) -> Optional[dict]:
+        """spec 中的字段全部到达时返回 {name: value}，否则 None"""
+        found = {}
+        for name, kind in spec.items():
+            value = self.field(name, kind)
+            if value is None:
+                return None
+            found[name] = value
+        return found
+
+    def strategy(self) -> str:
+        """当前已到达的解说文本（可能未完结）"""
+        m = _PARTIAL_STRING.search(self.text)
+        return _unescape(m.group(1)) if m else ""
+
+
+class StrategyStream:
+    """决策提交后仍在生成的解说文本，供 server 层边收边推"""
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.done = False
+        # 解说完整生成（未超时截断、未出错、未取消）；只有完整的解说才写入决策缓存
+        self.complete = False
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def update(self, text: str) -> None:
+        if text != self.text:
+            self.text = text
+            self._changed.set()
+
+    def finish(self, text: Optional[str] = None) -> None:
+        if text is not None:
+            self.text = text
+        self.done = True
+        self._changed.set()
+
+    def cancel(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.finish()
+
+    async def updates(self, min_interval: float = 0.0) -> AsyncIterator[str]:
+        """逐次产出最新的解说全文，直到生成结束（min_interval 用于限制推送频率）"""
+        last = None
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if self.text != last:
+                last = self.text
+                yield self.text
+            if self.done:
+                return
+            if min_interval:
+                await asyncio.sleep(min_interval)
+
+
+def decision_spec(
+    prompt_indexed: bool, action: Optional[str], compact: bool = False
+) -> Optional[Dict[str, str]]:
+    """出牌决策所需的字段：indexed 模式只需 move；free 模式 pass 只需 action，play 还需 cards
+    （紧凑编码下 cards 为点数记号字符串）"""
+    if prompt_indexed:
+        return {"move": "int"}
+    if action is None:
+        return None
+    if action.lower() == "pass":
+        return {"action": "str"}
+    return {"action": "str", "cards": "str" if compact else "list"}
+
+
+def synthesize(fields: dict, strategy: str) -> str:
+    """将已到达的字段与当前解说合成为完整 JSON，复用非流式的解析/校验/修复流程"""
+    return json.dumps({**fields, "strategy": strategy}, ensure_ascii=False)
+
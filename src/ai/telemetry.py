@@ -0,0 +1,279 @@
+"""LLM 调用遥测 - 每次请求一个 span（耗时、token、结果分类、费用估算），按人格/模型/类型聚合为直方图"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 单次调用的结果分类
+CALL_OK = "ok"
+CALL_REPAIRED = "repaired"        # 出牌非法，已修复为最接近的合法出牌
+CALL_PARSE_FAIL = "parse_fail"    # 响应不是可解析的 JSON
+CALL_ILLEGAL = "illegal"          # JSON 可解析但动作非法（fallback 到 RuleAI）
+CALL_TIMEOUT = "timeout"
+CALL_ERROR = "error"              # 网络 / 服务端异常
+CALL_CANCELLED = "cancelled"      # 对冲落败、提前 fallback 或投机预取被丢弃
+
+# 调用类型
+KIND_BID = "bid"
+KIND_PLAY = "play"
+KIND_COMMENTARY = "commentary"
+
+# 延迟直方图桶上界（毫秒），最后一桶为溢出
+LATENCY_BUCKETS_MS = (25, 50, 100, 200, 400, 800, 1600, 3200, 6400, 12800)
+
+
+@dataclass
+class CallSpan:
+    """
+    一次 LLM 请求。结果分类（resolve）与请求结束（end）可能以任意顺序发生：
+    流式调用的出牌结果先于 token 用量确定，超时则先取消请求再判定。两者都到齐时才计入统计。
+    """
+    persona: str
+    model: str
+    base_url: str
+    kind: str
+    stream: bool = False
+    started: float = field(default_factory=time.perf_counter)
+    duration_ms: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    outcome: Optional[str] = None
+    _sink: Optional[Callable[["CallSpan"], None]] = field(default=None, repr=False)
+    _recorded: bool = field(default=False, repr=False)
+
+    def add_usage(self, usage) -> None:
+        """读取 OpenAI 兼容的 usage（对象或 dict），缺失字段按 0 计"""
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda k, d=None: getattr(usage, k, d)
+        self.prompt_tokens = get("prompt_tokens", 0) or 0
+        self.completion_tokens = get("completion_tokens", 0) or 0
+        details = get("prompt_tokens_details", None)
+        if details is not None:
+            cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(
+                details, "cached_tokens", 0)
+            self.cached_tokens = cached or 0
+
+    def end(self) -> None:
+        """请求结束（成功、异常或取消），记录耗时"""
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self._maybe_record()
+
+    def resolve(self, outcome: str) -> None:
+        """判定结果分类；已判定的不再覆盖（先到者为准）"""
+        if self.outcome is None:
+            self.outcome = outcome
+        self._maybe_record()
+
+    def _maybe_record(self) -> None:
+        if self._recorded or self.outcome is None or self.duration_ms is None:
+            return
+        self._recorded = True
+        if self._sink is not None:
+            self._sink(self)
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图，分位数取所在桶的上界（不超过观测到的最大值）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(float(self.buckets[i]), self.max_ms) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        labels = [f"le_{b}" for b in self.buckets] + ["inf"]
+        return {
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "buckets": {k: n for k, n in zip(labels, self.counts) if n},
+        }
+
+
+@dataclass
+class CallAggregate:
+    """单个 (人格, 模型, 调用类型) 的累计统计"""
+    calls: int = 0
+    streams: int = 0
+    outcomes: Counter = field(default_factory=Counter)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+
+    def to_dict(self) -> dict:
+        def rate(*names: str) -> float:
+            n = sum(self.outcomes[k] for k in names)
+            return round(n / self.calls, 4) if self.calls else 0.0
+
+        return {
+            "calls": self.calls,
+            "streams": self.streams,
+            "outcomes": dict(self.outcomes),
+            "timeout_rate": rate(CALL_TIMEOUT),
+            "fallback_rate": rate(CALL_PARSE_FAIL, CALL_ILLEGAL, CALL_TIMEOUT, CALL_ERROR),
+            "latency": self.latency.to_dict(),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cost": round(self.cost, 6),
+        }
+
+
+# 单价：每百万 token 的 (输入, 输出, 命中缓存的输入)
+Price = Tuple[float, float, float]
+
+
+def parse_prices(text: str) -> Dict[str, Price]:
+    """解析 LLM_PRICES：逗号分隔的 model=输入/输出[/缓存输入]（每百万 token），缓存价缺省同输入价"""
+    prices: Dict[str, Price] = {}
+    for item in text.split(","):
+        if "=" not in item:
+            continue
+        model, _, values = item.partition("=")
+        try:
+            nums = [float(v) for v in values.split("/")]
+        except ValueError:
+            logger.warning("忽略无法解析的价格配置: %s", item.strip())
+            continue
+        if len(nums) < 2:
+            continue
+        prices[model.strip()] = (nums[0], nums[1], nums[2] if len(nums) > 2 else nums[0])
+    return prices
+
+
+class Telemetry:
+    """进程级 LLM 调用遥测：span 结束时计入 (人格, 模型, 类型) 聚合"""
+
+    def __init__(
+        self,
+        prices: Optional[Dict[str, Price]] = None,
+        dump_path: str = "",
+        dump_interval: float = 60.0,
+    ):
+        self.prices = dict(prices or {})
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.started_at = time.time()
+        self._aggregates: Dict[Tuple[str, str, str], CallAggregate] = {}
+
+    def span(self, persona: str, model: str, base_url: str, kind: str,
+             stream: bool = False) -> CallSpan:
+        return CallSpan(persona, model, base_url, kind, stream, _sink=self._record)
+
+    def cost(self, span: CallSpan) -> float:
+        price = self.prices.get(span.model)
+        if price is None:
+            return 0.0
+        fresh = max(0, span.prompt_tokens - span.cached_tokens)
+        return (fresh * price[0] + span.completion_tokens * price[1]
+                + span.cached_tokens * price[2]) / 1_000_000
+
+    def _record(self, span: CallSpan) -> None:
+        key = (span.persona, span.model, span.kind)
+        agg = self._aggregates.get(key)
+        if agg is None:
+            agg = self._aggregates[key] = CallAggregate()
+        agg.calls += 1
+        agg.streams += int(span.stream)
+        agg.outcomes[span.outcome] += 1
+        agg.latency.observe(span.duration_ms)
+        agg.prompt_tokens += span.prompt_tokens
+        agg.completion_tokens += span.completion_tokens
+        agg.cached_tokens += span.cached_tokens
+        agg.cost += self.cost(span)
+
+    def snapshot(self) -> List[dict]:
+        return [
+            {"persona": persona, "model": model, "kind": kind, **agg.to_dict()}
+            for (persona, model, kind), agg in sorted(self._aggregates.items())
+        ]
+
+    def reset(self) -> None:
+        self._aggregates.clear()
+        self.started_at = time.time()
+
+    def dump(self) -> None:
+        """向 dump_path 追加一行 JSON：当前时间 + 全部累计统计"""
+        self._append(self._dump_line())
+
+    def _dump_line(self) -> str:
+        # 统计只在事件循环线程上变更，快照须在同一线程内生成
+        line = {"ts": round(time.time(), 3), "since": round(self.started_at, 3),
+                "stats": self.snapshot()}
+        return json.dumps(line, ensure_ascii=False) + "\n"
+
+    def _append(self, text: str) -> None:
+        try:
+            with open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            logger.warning("遥测快照写入失败(%s): %s", self.dump_path, e)
+
+    async def dump_loop(self) -> None:
+        """每隔 dump_interval 秒追加一次快照（快照在事件循环中生成，只有写文件在线程池中进行）"""
+        while True:
+            await asyncio.sleep(self.dump_interval)
+            try:
+                await asyncio.to_thread(self._append, self._dump_line())
+            except Exception:
+                logger.exception("遥测快照落盘失败，下个周期重试")
+
+
+def create_telemetry() -> Telemetry:
+    """根据环境变量创建遥测。
+
+    环境变量：
+      LLM_PRICES：费用估算单价，如 deepseek-chat=0.27/1.10/0.07（每百万 token 的输入/输出/缓存输入）
+      LLM_TELEMETRY_FILE：定期追加统计快照的 JSON-lines 文件（默认不写）
+      LLM_TELEMETRY_INTERVAL：快照间隔（秒，默认 60）
+    """
+    return Telemetry(
+        prices=parse_prices(os.getenv("LLM_PRICES", "")),
+        dump_path=os.getenv("LLM_TELEMETRY_FILE", ""),
+        dump_interval=float(os.getenv("LLM_TELEMETRY_INTERVAL", "60")),
+    )
+
+
+# 进程级单例（首次使用时按环境变量创建，保证 .env 已加载）
+_telemetry: Optional[Telemetry] = None
+
+
+def get_telemetry() -> Telemetry:
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = create_telemetry()
+    return _telemetry
@@ -2,3 +2,4 @@
 from .card import Card, Rank, Suit, create_deck, shuffle_and_deal, sort_cards
 from .hand_type import HandType, PlayedHand
 from .hand_detector import detect_hand, can_beat
+from .move_generator import generate_moves
@@ -73,6 +73,37 @@ class Card:
         return hash((self.rank, self.suit))
 
 
+# 紧凑牌号：普通牌 (rank-3)*4 + 花色序号（♠♥♦♣ = 0..3），小王 52，大王 53
+CARD_SUITS = [Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB]
+
+
+def card_id(card: Card) -> int:
+    """牌 → 0..53 的紧凑编号（用于线上传输）"""
+    if card.rank == Rank.SMALL_JOKER:
+        return 52
+    if card.rank == Rank.BIG_JOKER:
+        return 53
+    return (card.rank - Rank.THREE) * 4 + CARD_SUITS.index(card.suit)
+
+
+def card_from_id(cid: int) -> Card:
+    """紧凑编号 → 牌"""
+    if cid == 52:
+        return Card(rank=Rank.SMALL_JOKER, suit=Suit.JOKER)
+    if cid == 53:
+        return Card(rank=Rank.BIG_JOKER, suit=Suit.JOKER)
+    return Card(rank=Rank(cid // 4 + Rank.THREE), suit=CARD_SUITS[cid % 4])
+
+
+def card_ids(cards: List[Card]) -> List[int]:
+    return [card_id(c) for c in cards]
+
+
+def hand_checksum(ids: List[int]) -> int:
+    """手牌校验和（与顺序无关，前端 handChecksum 同算法），用于发现增量更新后的手牌漂移"""
+    return sum((i + 1) * (i + 131) for i in ids) % 65521
+
+
 def create_deck() -> List[Card]:
     """创建一副54张标准扑克牌"""
     deck: List[Card] = []
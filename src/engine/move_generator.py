@@ -0,0 +1,130 @@
+"""出牌枚举器 - 列举一手牌中所有合法出牌（花色无关，同点数组合只取一种）"""
+
+from itertools import combinations, combinations_with_replacement
+from typing import Dict, Iterable, List, Optional
+from collections import Counter
+
+from .card import Card, Rank
+from .hand_type import PlayedHand
+from .hand_detector import detect_hand, can_beat
+
+
+# 顺子/连对/飞机中不允许出现的点数
+_CHAIN_FORBIDDEN = {Rank.TWO, Rank.SMALL_JOKER, Rank.BIG_JOKER}
+
+# 链式牌型的最短长度（顺子5张、连对3对、飞机2组）
+_MIN_CHAIN = {1: 5, 2: 3, 3: 2}
+
+
+def generate_moves(
+    hand: List[Card], last_play: Optional[PlayedHand] = None
+) -> List[PlayedHand]:
+    """
+    枚举 hand 能打出的所有合法牌型。
+    last_play 非空时只返回能压过它的出牌（不含 PASS）。
+    同一组点数只生成一次，花色按手牌顺序取前几张。
+    """
+    if not hand:
+        return []
+    rc = Counter(c.rank for c in hand)
+    by_rank: Dict[Rank, List[Card]] = {}
+    for c in hand:
+        by_rank.setdefault(c.rank, []).append(c)
+
+    moves: List[PlayedHand] = []
+    seen = set()
+    for ranks in _candidate_rank_sets(rc):
+        key = tuple(sorted(ranks))
+        if key in seen:
+            continue
+        seen.add(key)
+        cards = _materialize(by_rank, ranks)
+        played = detect_hand(cards)
+        if played is None:
+            continue
+        if last_play is not None and not can_beat(played, last_play):
+            continue
+        moves.append(played)
+    return moves
+
+
+# ============================================================
+#  点数组合枚举
+# ============================================================
+
+def _materialize(by_rank: Dict[Rank, List[Card]], ranks: List[Rank]) -> List[Card]:
+    """点数列表 → 手牌中的具体牌（同点数按手牌顺序取）"""
+    need = Counter(ranks)
+    cards: List[Card] = []
+    for r, n in need.items():
+        cards.extend(by_rank[r][:n])
+    return cards
+
+
+def _candidate_rank_sets(rc: Counter) -> Iterable[List[Rank]]:
+    """生成所有可能构成合法牌型的点数组合（最终由 detect_hand 判定）"""
+    ranks = sorted(rc)
+
+    # 单张 / 对子 / 三条 / 炸弹
+    for r in ranks:
+        for n in range(1, rc[r] + 1):
+            yield [r] * n
+
+    # 火箭
+    if Rank.SMALL_JOKER in rc and Rank.BIG_JOKER in rc:
+        yield [Rank.SMALL_JOKER, Rank.BIG_JOKER]
+
+    # 三带一 / 三带二
+    for t in (r for r in ranks if rc[r] >= 3):
+        for k in ranks:
+            if k == t:
+                continue
+            yield [t] * 3 + [k]
+            if rc[k] >= 2:
+                yield [t] * 3 + [k] * 2
+
+    # 四带二（单 / 对）
+    for f in (r for r in ranks if rc[r] == 4):
+        rest = Counter({r: n for r, n in rc.items() if r != f})
+        for kickers in _kicker_multisets(rest, 2):
+            yield [f] * 4 + kickers
+        pair_ranks = [r for r in rest if rest[r] >= 2]
+        for p1, p2 in combinations(sorted(pair_ranks), 2):
+            yield [f] * 4 + [p1, p1, p2, p2]
+
+    # 顺子 / 连对 / 飞机（含带翅膀）
+    for width in (1, 2, 3):
+        for chain in _chains(rc, width):
+            base = [r for r in chain for _ in range(width)]
+            yield base
+            if width != 3:
+                continue
+            rest = Counter(rc)
+            rest.subtract(chain * 3)
+            rest = +rest
+            length = len(chain)
+            for kickers in _kicker_multisets(rest, length):
+                yield base + kickers
+            pair_ranks = [r for r in rest if rest[r] >= 2]
+            for pairs in combinations(sorted(pair_ranks), length):
+                yield base + [r for r in pairs for _ in range(2)]
+
+
+def _chains(rc: Counter, width: int) -> Iterable[List[Rank]]:
+    """所有每个点数至少 width 张、长度达标的连续点数序列"""
+    avail = sorted(r for r in rc if r not in _CHAIN_FORBIDDEN and rc[r] >= width)
+    min_len = _MIN_CHAIN[width]
+    for i in range(len(avail)):
+        j = i
+        while j + 1 < len(avail) and avail[j + 1] - avail[j] == 1:
+            j += 1
+            if j - i + 1 >= min_len:
+                yield avail[i:j + 1]
+
+
+def _kicker_multisets(rest: Counter, count: int) -> Iterable[List[Rank]]:
+    """从剩余点数中取 count 张单牌（可重复点数，不超过持有数）"""
+    for combo in combinations_with_replacement(sorted(rest), count):
+        need = Counter(combo)
+        if all(rest[r] >= n for r, n in need.items()):
+            yield list(combo)
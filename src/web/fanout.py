@@ -0,0 +1,381 @@
+"""多进程扇出 - 牌桌进程运行全部房间的对局循环，经 Unix 域套接字把已编码的房间事件推给任意数量的
+uvicorn worker；worker 只负责 WebSocket 连接，观众连到任一 worker 都看到同一房间
+
+    python -m src.web.fanout --socket /tmp/ddz.sock                               # 牌桌进程
+    FANOUT_SOCKET=/tmp/ddz.sock uvicorn src.web.server:app --workers 4 ...       # 扇出 worker
+
+- 每个 worker 每个房间只订阅一路上游：牌桌进程的每条消息按 worker 数发送，而不是按观众数
+- worker 以上游的 snapshot 与后续消息维护本地镜像日志（沿用上游的 seq / epoch），本地观众的加入、
+  断线续传、按档位裁剪与二进制编码都在 worker 内完成
+- 上游连接断开后 worker 自动重连，按各镜像最后的 seq 续传；牌桌进程把每个 worker 的订阅当作普通连接，
+  跟不上时断开整条连接，由 worker 重连补齐
+- 单机部署，不依赖外部消息中间件
+
+套接字协议：4 字节大端长度 + 内容
+- worker → 牌桌：JSON 指令 {"op": "subscribe", "room", "since", "epoch"} / {"op": "unsubscribe", "room"} /
+  {"op": "start", "room"}
+- 牌桌 → worker：房间号 + "\\n" + 已编码的 JSON 消息（订阅被拒时为 {"type": "error", "reason"}）
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Dict, Optional
+
+from src.web.journal import EventJournal, create_journal
+from src.web.outbound import Broadcaster, ClientChannel, create_broadcaster, make_frame
+from src.web.profiles import PROFILE_FULL
+from src.web.room import RoomManager, subscribe_channel, valid_room_id
+from src.web.wire import FORMAT_JSON, encode_json
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+MAX_PACKET = 16 * 1024 * 1024
+
+
+def encode_packet(payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload)) + payload
+
+
+async def read_packet(reader: asyncio.StreamReader) -> bytes:
+    """读取一个数据包；连接关闭时抛 IncompleteReadError"""
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if size > MAX_PACKET:
+        raise ConnectionError(f"数据包过大: {size}")
+    return await reader.readexactly(size)
+
+
+# ============================================================
+#  牌桌进程
+# ============================================================
+
+class WorkerConnection:
+    """牌桌进程与一个 worker 的连接；各房间的订阅共用同一个写端，drain 串行化"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.lock = asyncio.Lock()
+        self.links: Dict[str, "RoomLink"] = {}
+
+    async def send(self, payload: bytes) -> None:
+        self.writer.write(encode_packet(payload))
+        async with self.lock:
+            await self.writer.drain()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RoomLink:
+    """某个 worker 对某个房间的订阅，作为普通订阅者加入房间广播（沿用有界队列、慢消费者断开与 idle 判定）"""
+
+    def __init__(self, conn: WorkerConnection, room_id: str):
+        self.conn = conn
+        self.prefix = room_id.encode("utf-8") + b"\n"
+
+    async def send_text(self, data: str) -> None:
+        await self.conn.send(self.prefix + data.encode("utf-8"))
+
+    async def close(self, code: int = 1000) -> None:
+        # 跟不上时断开整条连接，worker 重连后按 seq 续传
+        self.conn.close()
+
+
+class FanoutServer:
+    """牌桌进程一侧：在 Unix 域套接字上接受 worker 连接，把房间事件转发给订阅的 worker"""
+
+    def __init__(self, rooms: RoomManager, path: str):
+        self.rooms = rooms
+        self.path = path
+        self.workers: Dict[int, WorkerConnection] = {}
+        self.accepted = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)   # 上次退出遗留的套接字文件
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        logger.info("扇出套接字已监听: %s", self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = WorkerConnection(writer)
+        self.workers[id(conn)] = conn
+        self.accepted += 1
+        try:
+            while True:
+                op = json.loads(await read_packet(reader))
+                await self._handle(conn, op)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            del self.workers[id(conn)]
+            for room_id in list(conn.links):
+                self._unsubscribe(conn, room_id)
+            conn.close()
+
+    async def _handle(self, conn: WorkerConnection, op: dict) -> None:
+        room_id = str(op.get("room", ""))
+        kind = op.get("op")
+        if kind == "subscribe":
+            try:
+                room = self.rooms.get_or_create(room_id)
+            except (ValueError, LookupError) as e:
+                await conn.send(room_id.encode("utf-8") + b"\n"
+                                + encode_json({"type": "error", "reason": str(e)}).encode("utf-8"))
+                return
+            self._unsubscribe(conn, room_id)
+            link = conn.links[room_id] = RoomLink(conn, room_id)
+            room.subscribe(link, since=op.get("since"), epoch=op.get("epoch"))
+        elif kind == "unsubscribe":
+            self._unsubscribe(conn, room_id)
+        elif kind == "start":
+            room = self.rooms.get(room_id)
+            if room is not None:
+                room.request_start()
+
+    def _unsubscribe(self, conn: WorkerConnection, room_id: str) -> None:
+        link = conn.links.pop(room_id, None)
+        room = self.rooms.get(room_id)
+        if link is not None and room is not None:
+            room.unsubscribe(link)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for conn in list(self.workers.values()):
+            conn.close()
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "workers": len(self.workers),
+            "accepted": self.accepted,
+            "subscriptions": sum(len(c.links) for c in self.workers.values()),
+        }
+
+
+# ============================================================
+#  worker 进程
+# ============================================================
+
+class MirrorRoom:
+    """worker 内某个房间的镜像：本地广播 + 镜像日志，接口与 Room 的订阅部分一致"""
+
+    def __init__(self, client: "FanoutClient", room_id: str, hub: Broadcaster, journal: EventJournal):
+        self.client = client
+        self.room_id = room_id
+        self.hub = hub
+        self.journal = journal
+        self.ready = asyncio.Event()
+        self.error: Optional[str] = None
+        # 正在等待首个 snapshot 的本地连接数（期间不退订上游）
+        self.pending = 0
+
+    def ingest(self, data: str) -> None:
+        """处理一条上游消息：更新镜像日志并广播给本地连接（直接复用上游的编码）"""
+        msg = json.loads(data)
+        kind = msg.get("type")
+        if kind == "clock":
+            return   # 本地连接各自在加入时收到本进程的时钟同步
+        if kind == "error":
+            self.error = msg.get("reason", "rejected")
+            self.ready.set()
+            return
+        frame = make_frame(msg, data)
+        if kind == "snapshot":
+            # 首次订阅或无法续传：以上游局面重置镜像，已连接的本地观众随之重绘
+            self.journal.load_snapshot(msg)
+            self.ready.set()
+        else:
+            self.journal.append(msg, frame)
+        self.hub.publish_frame(frame)
+
+    def subscribe(
+        self,
+        ws,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None,
+        wire_format: str = FORMAT_JSON,
+        profile: str = PROFILE_FULL,
+    ) -> ClientChannel:
+        return subscribe_channel(self.hub, self.journal, ws, since, epoch, wire_format, profile)
+
+    def unsubscribe(self, ws) -> None:
+        self.hub.remove(ws)
+        self.client.release(self)
+
+    def request_start(self) -> bool:
+        self.client.send({"op": "start", "room": self.room_id})
+        return True
+
+    def snapshot(self) -> dict:
+        return {
+            "room_id": self.room_id,
+            "subscribers": len(self.hub),
+            "phase": self.journal.state.phase,
+            "game_count": self.journal.state.game_count,
+            "journal": self.journal.to_dict(),
+        }
+
+
+class FanoutClient:
+    """worker 一侧：连接牌桌进程，按本地观众按需订阅房间并维护镜像"""
+
+    def __init__(
+        self,
+        path: str,
+        hub_factory=create_broadcaster,
+        join_timeout: float = 5.0,
+        retry: float = 1.0,
+    ):
+        self.path = path
+        self.hub_factory = hub_factory
+        self.join_timeout = join_timeout
+        self.retry = retry
+        self.mirrors: Dict[str, MirrorRoom] = {}
+        self.connects = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def join(self, room_id: str) -> MirrorRoom:
+        """取得房间镜像，首个本地观众触发上游订阅并等待 snapshot。
+        房间号非法抛 ValueError，牌桌进程拒绝或超时抛 LookupError"""
+        if not valid_room_id(room_id):
+            raise ValueError(f"非法房间号: {room_id!r}")
+        mirror = self.mirrors.get(room_id)
+        if mirror is None:
+            mirror = self.mirrors[room_id] = MirrorRoom(self, room_id, self.hub_factory(), create_journal())
+            self._subscribe(mirror)
+        if not mirror.ready.is_set():
+            mirror.pending += 1
+            try:
+                await asyncio.wait_for(mirror.ready.wait(), self.join_timeout)
+            except asyncio.TimeoutError:
+                raise LookupError(f"牌桌进程未响应房间 {room_id} 的订阅") from None
+            finally:
+                mirror.pending -= 1
+                if not mirror.ready.is_set():
+                    # 超时或等待被取消：已无人等待时退订上游并丢弃镜像
+                    self.release(mirror)
+        if mirror.error is not None:
+            self.mirrors.pop(room_id, None)
+            raise LookupError(mirror.error)
+        return mirror
+
+    def release(self, mirror: MirrorRoom) -> None:
+        """本地观众离开；房间已无本地连接时退订上游并丢弃镜像"""
+        if len(mirror.hub) or mirror.pending or self.mirrors.get(mirror.room_id) is not mirror:
+            return
+        del self.mirrors[mirror.room_id]
+        mirror.hub.close()
+        self.send({"op": "unsubscribe", "room": mirror.room_id})
+
+    def send(self, op: dict) -> None:
+        """发送指令；未连接时丢弃（订阅会在重连后按镜像重新发送）"""
+        if self._writer is not None:
+            self._writer.write(encode_packet(encode_json(op).encode("utf-8")))
+
+    def _subscribe(self, mirror: MirrorRoom) -> None:
+        # 镜像的 seq / epoch 来自上游：能续传时只补发漏掉的消息，新镜像的随机 epoch 必然换来 snapshot
+        self.send({"op": "subscribe", "room": mirror.room_id,
+                   "since": mirror.journal.seq, "epoch": mirror.journal.epoch})
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                logger.warning("无法连接牌桌进程 %s: %s", self.path, e)
+                await asyncio.sleep(self.retry)
+                continue
+            self._writer = writer
+            self.connects += 1
+            for mirror in self.mirrors.values():
+                self._subscribe(mirror)
+            try:
+                while True:
+                    room_id, _, data = (await read_packet(reader)).decode("utf-8").partition("\n")
+                    mirror = self.mirrors.get(room_id)
+                    if mirror is not None:
+                        mirror.ingest(data)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("与牌桌进程的连接断开，%.1f 秒后重连", self.retry)
+            finally:
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(self.retry)
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for mirror in self.mirrors.values():
+            mirror.hub.close()
+        self.mirrors.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "fanout": self.path,
+            "connected": self.connected,
+            "connects": self.connects,
+            "rooms": len(self.mirrors),
+            "tables": [mirror.snapshot() for mirror in self.mirrors.values()],
+        }
+
+
+def create_fanout_client() -> Optional[FanoutClient]:
+    """根据环境变量创建扇出客户端；未配置时返回 None（单进程模式，对局与连接在同一进程）。
+
+    环境变量：
+      FANOUT_SOCKET：牌桌进程的 Unix 域套接字路径；设置后本进程只做 WebSocket 扇出
+    """
+    path = os.getenv("FANOUT_SOCKET", "")
+    return FanoutClient(path) if path else None
+
+
+async def run_table(path: str) -> None:
+    """牌桌进程：运行全部房间的对局循环与空闲回收，事件经套接字推给各 worker"""
+    from src.web.lifecycle import start_table, stop_table
+    from src.web.server import rooms
+
+    server = FanoutServer(rooms, path)
+    await server.start()
+    tasks = await start_table(rooms)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+        await stop_table(rooms, tasks)
+
+
+def main() -> None:
+    from src.web import server  # noqa: F401  加载 .env 并挂接对局调度
+
+    parser = argparse.ArgumentParser(description="斗地主牌桌进程（多 worker 扇出）")
+    parser.add_argument("--socket", default=os.getenv("FANOUT_SOCKET", "/tmp/ddz-fanout.sock"),
+                        help="Unix 域套接字路径（worker 以 FANOUT_SOCKET 指向同一路径）")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(run_table(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
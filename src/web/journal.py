@@ -0,0 +1,253 @@
+"""房间事件日志 - 为每条广播编号（seq），保留有界环形缓冲与紧凑的当前局面，供中途加入与断线续传
+
+- 新连接：先收到一条 snapshot（当前局面，含手牌牌号、积分、出牌历史、进行中的思考时间线）
+- 断线重连：带上最后收到的 seq 与 epoch，只补发其后的消息（已序列化的帧，开销与漏掉的事件数成正比）
+- 请求的 seq 已被环形缓冲挤出、或房间已重建（epoch 不同）时退回 snapshot
+"""
+
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional
+
+from src.engine.card import card_from_id, card_ids, sort_cards
+from src.web.outbound import Frame, make_frame
+
+
+class RoomState:
+    """由广播消息增量维护的当前局面（每条消息 O(1) 更新，加入时直接序列化）"""
+
+    def __init__(self):
+        self.total_scores: List[dict] = []
+        self.reset()
+
+    def reset(self) -> None:
+        self.game_count = 0
+        self.phase = "idle"
+        self.players: List[Dict[str, Any]] = []
+        self.dizhu_cards: List[dict] = []
+        self.dizhu_revealed = False
+        self.landlord: Optional[int] = None
+        self.highest_bid = 0
+        self.bomb_count = 0
+        # 各座位最近一个动作（bid / play / pass 原消息，commentary 会更新其中的 strategy）
+        self.actions: Dict[int, dict] = {}
+        # 出牌历史：[player_id, hand_type, cards]，不出为 [player_id, None, None]
+        self.history: List[list] = []
+        self.thinking: Optional[dict] = None
+        self.result: Optional[dict] = None
+
+    def load(self, state: dict) -> None:
+        """从 snapshot 的 state 恢复（扇出 worker 以牌桌进程的快照初始化本地镜像）"""
+        self.reset()
+        self.game_count = state.get("game_count", 0)
+        self.phase = state.get("phase", "idle")
+        self.players = [dict(p) for p in state.get("players", [])]
+        self.total_scores = state.get("total_scores", [])
+        self.dizhu_cards = state.get("dizhu_cards", [])
+        self.dizhu_revealed = state.get("dizhu_revealed", False)
+        self.landlord = state.get("landlord")
+        self.highest_bid = state.get("highest_bid", 0)
+        self.bomb_count = state.get("bomb_count", 0)
+        self.actions = {a["player_id"]: a for a in state.get("actions", [])}
+        self.history = list(state.get("history", []))
+        self.thinking = state.get("thinking")
+        self.result = state.get("result")
+
+    def apply(self, msg: dict) -> None:
+        kind = msg.get("type")
+        handler = getattr(self, f"_on_{kind}", None)
+        if handler is not None:
+            handler(msg)
+
+    def _on_deal_start(self, msg: dict) -> None:
+        self.reset()
+        self.phase = "dealing"
+        self.game_count = msg.get("game_count", 0)
+        self.total_scores = msg.get("total_scores", self.total_scores)
+        self.players = [
+            {"id": p["id"], "name": p["name"], "role": "", "hand": [], "hand_size": 0}
+            for p in msg.get("players", [])
+        ]
+
+    def _on_deal_schedule(self, msg: dict) -> None:
+        for p, hand in zip(self.players, msg.get("hands", [])):
+            p["hand"] = hand
+            p["hand_size"] = len(hand)
+
+    def _set_players(self, players: List[dict]) -> None:
+        """更新角色与张数，手牌（牌号列表）沿用增量维护的结果"""
+        for p, update in zip(self.players, players):
+            p["role"] = update.get("role", p["role"])
+            p["hand_size"] = update.get("hand_size", p["hand_size"])
+
+    def _on_deal_done(self, msg: dict) -> None:
+        self.phase = "bidding"
+        self._set_players(msg["players"])
+        self.dizhu_cards = msg.get("dizhu_cards", [])
+
+    def _on_thinking(self, msg: dict) -> None:
+        self.thinking = msg
+        self.actions.pop(msg["player_id"], None)
+
+    def _on_bid(self, msg: dict) -> None:
+        self.thinking = None
+        self.actions[msg["player_id"]] = msg
+
+    def _on_landlord(self, msg: dict) -> None:
+        self.phase = "playing"
+        self._set_players(msg["players"])
+        self.dizhu_cards = msg.get("dizhu_cards", self.dizhu_cards)
+        self.dizhu_revealed = True
+        self.landlord = msg["player_id"]
+        self.highest_bid = msg.get("highest_bid", 0)
+        if self.landlord < len(self.players):
+            p = self.players[self.landlord]
+            p["hand"] = card_ids(sort_cards([card_from_id(i) for i in p["hand"] + msg.get("added", [])]))
+        self.actions.clear()
+
+    def _on_play(self, msg: dict) -> None:
+        pid = msg["player_id"]
+        self.thinking = None
+        self.actions[pid] = msg
+        if pid < len(self.players):
+            removed = set(msg.get("cards", []))
+            p = self.players[pid]
+            p["hand"] = [i for i in p["hand"] if i not in removed]
+            p["hand_size"] = msg.get("hand_size", len(p["hand"]))
+        if msg.get("is_bomb"):
+            self.bomb_count += 1
+        self.history.append([pid, msg.get("hand_type"), msg.get("cards")])
+
+    def _on_pass(self, msg: dict) -> None:
+        pid = msg["player_id"]
+        self.thinking = None
+        self.actions[pid] = msg
+        self.history.append([pid, None, None])
+
+    def _on_commentary(self, msg: dict) -> None:
+        action = self.actions.get(msg["player_id"])
+        # 该座位已有新动作时，迟到的解说不再覆盖
+        stale = "action_seq" in msg and action is not None and action.get("seq") != msg["action_seq"]
+        if action is not None and msg.get("strategy") and not stale:
+            self.actions[msg["player_id"]] = {**action, "strategy": msg["strategy"]}
+
+    def _on_result(self, msg: dict) -> None:
+        self.phase = "finished"
+        self.thinking = None
+        self.result = msg
+        self.total_scores = msg.get("total_scores", self.total_scores)
+
+    def to_dict(self) -> dict:
+        return {
+            "game_count": self.game_count,
+            "phase": self.phase,
+            "players": self.players,
+            "total_scores": self.total_scores,
+            "dizhu_cards": self.dizhu_cards,
+            "dizhu_revealed": self.dizhu_revealed,
+            "landlord": self.landlord,
+            "highest_bid": self.highest_bid,
+            "bomb_count": self.bomb_count,
+            "actions": list(self.actions.values()),
+            "history": self.history,
+            "thinking": self.thinking,
+            "result": self.result,
+        }
+
+
+@dataclass
+class JournalStats:
+    snapshots: int = 0    # 以 snapshot 加入的连接
+    resumes: int = 0      # 只补发漏掉消息的重连
+    replayed: int = 0     # 补发的消息总数
+
+    def to_dict(self) -> dict:
+        return {"snapshots": self.snapshots, "resumes": self.resumes, "replayed": self.replayed}
+
+
+class EventJournal:
+    """单个房间的消息编号、环形缓冲与当前局面"""
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = max(1, capacity)
+        # 房间每次创建生成新的 epoch，防止回收重建后 seq 重新计数被误认为续传
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.state = RoomState()
+        self.stats = JournalStats()
+        self._ring: Deque[Frame] = deque(maxlen=self.capacity)
+        self._first_seq = 1   # 环形缓冲中最早一条消息的 seq
+
+    def record(self, msg: dict) -> Frame:
+        """为消息编号、更新当前局面并序列化入缓冲，返回供广播的帧"""
+        msg = {**msg, "seq": self.seq + 1}
+        frame = make_frame(msg)
+        self.append(msg, frame)
+        return frame
+
+    def append(self, msg: dict, frame: Frame) -> None:
+        """记入一条已编号的消息（扇出 worker 镜像牌桌进程的日志时直接使用上游的 seq 与编码）"""
+        self.seq = msg["seq"]
+        self.state.apply(msg)
+        if len(self._ring) == self.capacity:
+            self._first_seq += 1
+        self._ring.append(frame)
+
+    def load_snapshot(self, msg: dict) -> None:
+        """以上游 snapshot 重置：沿用其 epoch 与 seq，清空环形缓冲"""
+        self.epoch = msg["epoch"]
+        self.seq = msg["seq"]
+        self.state.load(msg["state"])
+        self._ring.clear()
+        self._first_seq = self.seq + 1
+
+    def since(self, seq: int, epoch: Optional[str] = None) -> Optional[List[Frame]]:
+        """seq 之后的全部消息；无法续传（epoch 不符、已被挤出或超前）时返回 None"""
+        if epoch != self.epoch or seq > self.seq or seq < self._first_seq - 1:
+            return None
+        missed = self.seq - seq
+        if missed == 0:
+            return []
+        # 从队尾倒取，开销与漏掉的条数成正比
+        return list(islice(reversed(self._ring), missed))[::-1]
+
+    def snapshot_frame(self) -> Frame:
+        return make_frame({
+            "type": "snapshot",
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "state": self.state.to_dict(),
+        })
+
+    def join_frames(
+        self, since: Optional[int] = None, epoch: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Frame]:
+        """新连接应先收到的帧：能续传时为漏掉的消息，否则（或漏掉超过 limit 条）为一条 snapshot"""
+        if since is not None:
+            missed = self.since(since, epoch)
+            if missed is not None and (limit is None or len(missed) <= limit):
+                self.stats.resumes += 1
+                self.stats.replayed += len(missed)
+                return missed
+        self.stats.snapshots += 1
+        return [self.snapshot_frame()]
+
+    def to_dict(self) -> dict:
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "buffered": len(self._ring),
+            **self.stats.to_dict(),
+        }
+
+
+def create_journal() -> EventJournal:
+    """根据环境变量创建房间事件日志。
+
+    环境变量：
+      ROOM_JOURNAL_SIZE：每个房间保留用于断线续传的最近消息条数（默认 2048）
+    """
+    return EventJournal(capacity=int(os.getenv("ROOM_JOURNAL_SIZE", "2048")))
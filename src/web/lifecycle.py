@@ -0,0 +1,46 @@
+"""进程生命周期 - 运行对局的进程（单进程服务或扇出模式的牌桌进程）共用的启动与退出步骤
+
+- 启动：创建默认房间、预热 LLM 端点连接，启动空闲房间回收与遥测落盘循环
+- 退出：先停后台循环，再关闭房间与连接，最后将决策缓存、决策日志中尚未落盘的批量写入与遥测快照写出
+"""
+
+import asyncio
+from typing import List
+
+from src.ai.client_pool import get_client_registry
+from src.ai.decision_cache import get_decision_cache
+from src.ai.imitation import get_decision_log
+from src.ai.telemetry import get_telemetry
+from src.web.room import DEFAULT_ROOM, RoomManager
+
+
+async def start_table(rooms: RoomManager) -> List[asyncio.Task]:
+    """启动对局进程的常驻服务，返回需在退出时交给 stop_table 的后台任务"""
+    rooms.get_or_create(DEFAULT_ROOM)
+    await get_client_registry().warm()
+    tasks = [asyncio.create_task(rooms.collect_loop())]
+    telemetry = get_telemetry()
+    if telemetry.dump_path:
+        # 配置了 LLM_TELEMETRY_FILE 时定期追加统计快照
+        tasks.append(asyncio.create_task(telemetry.dump_loop()))
+    return tasks
+
+
+async def stop_table(rooms: RoomManager, tasks: List[asyncio.Task]) -> None:
+    """退出对局进程：后台循环须先停掉，避免与最后一次落盘、房间关闭并发"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    tasks.clear()
+    rooms.close()
+    await get_client_registry().aclose()
+
+    cache = get_decision_cache()
+    if cache is not None:
+        cache.close()
+    log = get_decision_log()
+    if log is not None:
+        log.close()
+    telemetry = get_telemetry()
+    if telemetry.dump_path:
+        telemetry.dump()
@@ -0,0 +1,289 @@
+"""出站消息队列 - 每个 WebSocket 连接一个有界发送队列 + 独立写协程，广播只入队不等待
+
+溢出策略（按消息类型，见 MESSAGE_POLICY）：
+- coalesce：流式解说，按玩家只保留最新一条；队列满时可被其他消息挤出
+- keep：其余全部事件（均记入房间日志）；队列满且无可挤出的帧时断开该连接（客户端重连后由日志补发追上）
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Hashable, List, Optional
+
+from src.web.profiles import PROFILE_FULL, PROFILE_SHAPERS
+from src.web.wire import FORMAT_JSON, FORMAT_MSGPACK, encode_json, pack
+
+logger = logging.getLogger(__name__)
+
+POLICY_COALESCE = "coalesce"
+POLICY_KEEP = "keep"
+
+# 消息类型 → 溢出策略（未列出的为 keep）
+MESSAGE_POLICY: Dict[str, str] = {
+    "commentary": POLICY_COALESCE,
+}
+
+# 慢客户端被断开时使用的关闭码（1013 = Try Again Later）
+CLOSE_SLOW_CONSUMER = 1013
+
+
+class Frame:
+    """一条已序列化的出站消息，所有连接共享同一份（二进制编码按需生成一次并缓存）"""
+
+    __slots__ = ("data", "policy", "key", "_msg", "_packed", "_variants")
+
+    def __init__(self, data: str, policy: str = POLICY_KEEP, key: Optional[Hashable] = None,
+                 msg: Optional[dict] = None):
+        self.data = data
+        self.policy = policy
+        self.key = key
+        self._msg = msg
+        self._packed: Optional[bytes] = None
+        # 档位 → 裁剪后的帧（None 表示该档位不接收），每个档位只裁剪编码一次
+        self._variants: Optional[Dict[str, Optional["Frame"]]] = None
+
+    @property
+    def packed(self) -> bytes:
+        if self._packed is None:
+            msg = self._msg if self._msg is not None else json.loads(self.data)
+            self._packed = pack(msg)
+        return self._packed
+
+    def for_profile(self, profile: str) -> Optional["Frame"]:
+        """按订阅档位裁剪后的帧；同档位的所有连接共享同一份"""
+        shaper = PROFILE_SHAPERS.get(profile)
+        if shaper is None:
+            return self
+        if self._variants is None:
+            self._variants = {}
+        if profile not in self._variants:
+            msg = self._msg if self._msg is not None else json.loads(self.data)
+            shaped = shaper(msg)
+            self._variants[profile] = None if shaped is None else (
+                self if shaped is msg else make_frame(shaped)
+            )
+        return self._variants[profile]
+
+    def release(self) -> None:
+        """广播完成后释放原始消息（帧可能长期留在续传缓冲中，之后按需从 JSON 还原）"""
+        self._msg = None
+        if self._variants:
+            for variant in self._variants.values():
+                if variant is not None and variant is not self:
+                    variant.release()
+
+    def payload(self, wire_format: str):
+        return self.packed if wire_format == FORMAT_MSGPACK else self.data
+
+
+def make_frame(msg: dict, data: Optional[str] = None) -> Frame:
+    """序列化消息并按类型确定溢出策略（解说按玩家合并）；data 为上游已编码的文本时直接复用"""
+    kind = msg.get("type", "")
+    policy = MESSAGE_POLICY.get(kind, POLICY_KEEP)
+    key = (kind, msg.get("player_id")) if policy == POLICY_COALESCE else None
+    return Frame(encode_json(msg) if data is None else data, policy, key, msg)
+
+
+@dataclass
+class ChannelStats:
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    max_depth: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "max_depth": self.max_depth,
+        }
+
+
+class ClientChannel:
+    """单个连接的出站队列：offer 同步入队，写协程按序发送；发送卡住超过 send_timeout 即断开"""
+
+    def __init__(self, ws: Any, hub: "Broadcaster", max_queue: int, send_timeout: float,
+                 wire_format: str = FORMAT_JSON, profile: str = PROFILE_FULL):
+        self.ws = ws
+        self.wire_format = wire_format
+        self.profile = profile
+        self.max_queue = max(1, max_queue)
+        self.send_timeout = send_timeout
+        self.stats = ChannelStats()
+        self.closed = False
+        self.close_reason = ""
+        self._hub = hub
+        self._queue: Deque[Frame] = deque()
+        self._sending = False   # 已出队、正在发送的一条
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._writer())
+
+    @property
+    def depth(self) -> int:
+        """尚未发出的消息数（含正在发送的一条）"""
+        return len(self._queue) + self._sending
+
+    def offer(self, frame: Frame) -> bool:
+        """入队（不等待发送）。返回 False 表示连接已关闭或因溢出被断开"""
+        if self.closed:
+            return False
+        frame = frame.for_profile(self.profile)
+        if frame is None:
+            return True
+        if self.wire_format == FORMAT_MSGPACK:
+            frame.packed   # 趁原始消息还在时编码，同档位的二进制连接共享
+        if frame.key is not None:
+            stale = next((f for f in self._queue if f.key == frame.key), None)
+            if stale is not None:
+                # 保留最新一条，放到队尾以维持与其他消息的先后顺序
+                self._queue.remove(stale)
+                self.stats.coalesced += 1
+        if len(self._queue) >= self.max_queue:
+            victim = next((f for f in self._queue if f.policy != POLICY_KEEP), None)
+            if victim is None:
+                self.close("overflow")
+                return False
+            self._queue.remove(victim)
+            self.stats.dropped += 1
+        self._queue.append(frame)
+        self.stats.max_depth = max(self.stats.max_depth, len(self._queue))
+        self._wakeup.set()
+        return True
+
+    async def _writer(self) -> None:
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                frame = self._queue.popleft()
+                self._sending = True
+                try:
+                    await self._send(frame.payload(self.wire_format))
+                finally:
+                    self._sending = False
+                self.stats.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.close("stalled")
+        except Exception:
+            self.close("send_error")
+
+    async def _send(self, data) -> None:
+        # 不用 wait_for：发送恰好完成时它可能吞掉外层的取消，导致写协程无法退出
+        if isinstance(data, bytes):
+            send = asyncio.ensure_future(self.ws.send_bytes(data))
+        else:
+            send = asyncio.ensure_future(self.ws.send_text(data))
+        try:
+            done, _ = await asyncio.wait({send}, timeout=self.send_timeout)
+        finally:
+            if not send.done():
+                send.cancel()
+        if not done:
+            raise asyncio.TimeoutError
+        send.result()
+
+    def close(self, reason: str = "closed") -> None:
+        """停止发送并从广播中移除；慢客户端额外主动关闭连接"""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self._queue.clear()
+        self._wakeup.set()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._hub._on_close(self)
+        if reason in ("overflow", "stalled"):
+            logger.warning("WebSocket 客户端发送跟不上(%s)，断开连接", reason)
+            asyncio.ensure_future(self._close_ws())
+
+    async def _close_ws(self) -> None:
+        try:
+            await self.ws.close(code=CLOSE_SLOW_CONSUMER)
+        except Exception:
+            pass
+
+    def to_dict(self) -> dict:
+        return {"depth": self.depth, "format": self.wire_format, "profile": self.profile,
+                **self.stats.to_dict()}
+
+
+class Broadcaster:
+    """所有连接的广播中心：消息只序列化一次，入队到各连接后立即返回，游戏节奏不受观众数与网速影响"""
+
+    def __init__(self, max_queue: int = 256, send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._channels: Dict[Any, ClientChannel] = {}
+        self.published = 0
+        self.disconnects: Dict[str, int] = {}
+
+    def add(self, ws: Any, wire_format: str = FORMAT_JSON, profile: str = PROFILE_FULL) -> ClientChannel:
+        channel = ClientChannel(ws, self, self.max_queue, self.send_timeout, wire_format, profile)
+        self._channels[ws] = channel
+        return channel
+
+    def remove(self, ws: Any) -> None:
+        channel = self._channels.get(ws)
+        if channel is not None:
+            channel.close()
+
+    def publish(self, msg: dict) -> None:
+        self.publish_frame(make_frame(msg))
+
+    def publish_frame(self, frame: Frame) -> None:
+        """广播已序列化的帧（房间日志编号后的消息直接复用同一份帧）"""
+        self.published += 1
+        for channel in list(self._channels.values()):
+            channel.offer(frame)
+        frame.release()
+
+    def close(self) -> None:
+        """关闭所有连接的发送队列"""
+        for channel in list(self._channels.values()):
+            channel.close()
+
+    def _on_close(self, channel: ClientChannel) -> None:
+        if self._channels.get(channel.ws) is channel:
+            del self._channels[channel.ws]
+        if channel.close_reason != "closed":
+            self.disconnects[channel.close_reason] = self.disconnects.get(channel.close_reason, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    @property
+    def queued(self) -> int:
+        """所有连接尚未发出的消息总数"""
+        return sum(ch.depth for ch in self._channels.values())
+
+    def snapshot(self) -> dict:
+        channels: List[dict] = [ch.to_dict() for ch in self._channels.values()]
+        return {
+            "clients": len(channels),
+            "published": self.published,
+            "queued": self.queued,
+            "disconnects": dict(self.disconnects),
+            "channels": channels,
+        }
+
+
+def create_broadcaster() -> Broadcaster:
+    """根据环境变量创建广播中心。
+
+    环境变量：
+      WS_QUEUE_SIZE：每个连接的出站队列上限（默认 256）
+      WS_SEND_TIMEOUT：单条消息发送超时（秒，默认 5），超时视为客户端卡住并断开
+    """
+    return Broadcaster(
+        max_queue=int(os.getenv("WS_QUEUE_SIZE", "256")),
+        send_timeout=float(os.getenv("WS_SEND_TIMEOUT", "5")),
+    )
@@ -0,0 +1,86 @@
+"""订阅档位 - 客户端连接时声明所需的事件流（?profile=），服务端每条消息按档位裁剪一次，同档位连接共享编码结果
+
+- overlay-full：完整事件流（默认，直播画面展示三家明牌）
+- admin：完整事件流，用于后台控制台
+- public：公开信息，不含未打出的手牌与未翻开的底牌（对外转播）
+- scores-only：只有开局、结算与积分（比分条等小组件）
+"""
+
+from typing import Callable, Dict, Optional
+
+PROFILE_FULL = "overlay-full"
+PROFILE_ADMIN = "admin"
+PROFILE_PUBLIC = "public"
+PROFILE_SCORES = "scores-only"
+
+# 可以发送 start 等控制指令的档位
+CONTROL_PROFILES = (PROFILE_FULL, PROFILE_ADMIN)
+
+
+def _public(msg: dict) -> Optional[dict]:
+    kind = msg.get("type")
+    if kind == "deal_schedule":
+        shaped = {k: v for k, v in msg.items() if k != "hands"}
+        shaped["sizes"] = [len(h) for h in msg.get("hands", [])]
+        return shaped
+    if kind == "deal_done":
+        return {
+            **{k: v for k, v in msg.items() if k != "dizhu_cards"},
+            "players": [_hide_checksum(p) for p in msg.get("players", [])],
+        }
+    if kind == "landlord":
+        # 底牌此时公开翻开，只去掉手牌校验和
+        return {**msg, "players": [_hide_checksum(p) for p in msg.get("players", [])]}
+    if kind == "play":
+        return {k: v for k, v in msg.items() if k != "checksum"}
+    if kind == "snapshot":
+        state = msg["state"]
+        public_state = {
+            **state,
+            "players": [
+                {k: v for k, v in p.items() if k != "hand"} for p in state.get("players", [])
+            ],
+            "dizhu_cards": state.get("dizhu_cards", []) if state.get("dizhu_revealed") else [],
+            # 各座位最近动作即原 play 消息，同样去掉剩余手牌的校验和
+            "actions": [_hide_checksum(a) for a in state.get("actions", [])],
+        }
+        return {**msg, "state": public_state}
+    return msg
+
+
+def _hide_checksum(player: dict) -> dict:
+    return {k: v for k, v in player.items() if k != "checksum"}
+
+
+# scores-only 档位保留的消息类型
+SCORE_MESSAGES = ("clock", "deal_start", "result")
+
+
+def _scores(msg: dict) -> Optional[dict]:
+    kind = msg.get("type")
+    if kind == "snapshot":
+        state = msg["state"]
+        return {**msg, "state": {
+            "game_count": state.get("game_count", 0),
+            "phase": state.get("phase"),
+            "total_scores": state.get("total_scores", []),
+        }}
+    if kind == "deal_start":
+        return {k: msg[k] for k in ("type", "game_count", "total_scores", "seq") if k in msg}
+    if kind in SCORE_MESSAGES:
+        return msg
+    return None
+
+
+# 档位 → 裁剪函数（None 表示原样转发；裁剪结果为 None 表示该档位不接收这条消息）
+PROFILE_SHAPERS: Dict[str, Optional[Callable[[dict], Optional[dict]]]] = {
+    PROFILE_FULL: None,
+    PROFILE_ADMIN: None,
+    PROFILE_PUBLIC: _public,
+    PROFILE_SCORES: _scores,
+}
+
+
+def negotiate_profile(profile: Optional[str]) -> str:
+    """客户端声明的档位，未声明或不认识时为 overlay-full"""
+    return profile if profile in PROFILE_SHAPERS else PROFILE_FULL
@@ -0,0 +1,341 @@
+"""房间 - 每张牌桌独立的玩家、AI 策略、累计积分、订阅者与对局循环；按需创建、空闲回收"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+from src.game.player import Player
+from src.ai.llm_ai import create_llm_players
+from src.ai.speculation import SpeculativePrefetcher, create_prefetcher
+from src.web.journal import EventJournal, create_journal
+from src.web.outbound import Broadcaster, ClientChannel, create_broadcaster, make_frame
+from src.web.profiles import PROFILE_FULL
+from src.web.scheduler import GameScheduler
+from src.web.wire import FORMAT_JSON
+
+logger = logging.getLogger(__name__)
+
+PLAYER_NAMES = ["烈焰哥🔥", "冰山姐❄️", "戏精弟🎭"]
+
+DEFAULT_ROOM = "default"
+
+# 房间号：字母、数字、下划线、连字符，最长 32 位
+ROOM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+# GAME_SPEED → 节奏系数（所有动画 / 思考等待乘以该系数）
+GAME_SPEED_PACE = {"slow": 1.5, "normal": 1.0, "fast": 0.5, "instant": 0.0}
+
+# 无人观看时的处理（IDLE_POLICY）：
+# - pause：在下一个回合边界挂起对局（自动连播不再开新局），有观众加入时立即继续
+# - headless：本局改为不调用 LLM 的即时托管（规则 AI、无等待）下完，之后同样挂起到有观众加入
+# - off：照常进行
+IDLE_PAUSE = "pause"
+IDLE_HEADLESS = "headless"
+IDLE_OFF = "off"
+IDLE_POLICIES = (IDLE_PAUSE, IDLE_HEADLESS, IDLE_OFF)
+
+
+def valid_room_id(room_id: str) -> bool:
+    return bool(ROOM_ID_PATTERN.match(room_id))
+
+
+def now_ms() -> int:
+    """服务端时钟（Unix 毫秒），时间线消息中的时间戳均以此为准"""
+    return int(time.time() * 1000)
+
+
+@dataclass
+class AudienceStats:
+    suspends: int = 0               # 因无人观看挂起的次数
+    suspended_seconds: float = 0.0  # 累计挂起时长
+    headless_turns: int = 0         # 无人观看时以托管方式完成的回合（未调用 LLM）
+
+    def to_dict(self) -> dict:
+        return {
+            "suspends": self.suspends,
+            "suspended_seconds": round(self.suspended_seconds, 1),
+            "headless_turns": self.headless_turns,
+        }
+
+
+def subscribe_channel(
+    hub: Broadcaster,
+    journal: EventJournal,
+    ws,
+    since: Optional[int] = None,
+    epoch: Optional[str] = None,
+    wire_format: str = FORMAT_JSON,
+    profile: str = PROFILE_FULL,
+) -> ClientChannel:
+    """加入订阅：先发时钟同步，再发当前局面 snapshot，或按 since/epoch 只补发漏掉的消息（均按档位裁剪）"""
+    channel = hub.add(ws, wire_format, profile)
+    # 时钟同步：客户端据此换算时间线消息中的服务端时刻
+    channel.offer(make_frame({"type": "clock", "now": now_ms()}))
+    # 补发条数超过发送队列容量时改发 snapshot，免得刚连上就因溢出被断开
+    for frame in journal.join_frames(since, epoch, limit=hub.max_queue // 2):
+        channel.offer(frame)
+    return channel
+
+
+class Room:
+    """
+    一张牌桌：跨局复用玩家与 AI 实例（保留累计积分），订阅者只收到本房间的事件。
+    同一时刻只允许一局对局运行（lock），重复的 start 被忽略；对局循环由 scheduler 驱动。
+    """
+
+    def __init__(
+        self,
+        room_id: str,
+        strategies: Optional[List] = None,
+        hub: Optional[Broadcaster] = None,
+        pace: float = 1.0,
+        journal: Optional[EventJournal] = None,
+        idle_policy: str = IDLE_PAUSE,
+        idle_grace: float = 30.0,
+    ):
+        self.room_id = room_id
+        self.players: List[Player] = [Player(id=i, name=name) for i, name in enumerate(PLAYER_NAMES)]
+        self.strategies: List = strategies if strategies is not None else create_llm_players(PLAYER_NAMES)
+        self.prefetcher: SpeculativePrefetcher = create_prefetcher(self.strategies)
+        self.hub = hub if hub is not None else create_broadcaster()
+        self.journal = journal if journal is not None else create_journal()
+        self.pace = pace
+        self.game_count = 0
+        self.lock = asyncio.Lock()
+        # 后台解说任务（持有引用防止被 GC）
+        self.commentary_tasks: Set[asyncio.Task] = set()
+        # 最近一次有订阅者进出的时间（自动连播的对局不算活跃，无人观看的房间照常回收）
+        self.last_active = time.monotonic()
+        self.scheduler: Optional[GameScheduler] = None
+        # 按正常节奏应等待的总时长（用于基准换算）
+        self.nominal_wait = 0.0
+        # 无人观看超过 idle_grace 秒后按 idle_policy 挂起或托管
+        self.idle_policy = idle_policy if idle_policy in IDLE_POLICIES else IDLE_PAUSE
+        self.idle_grace = idle_grace
+        self.suspended = False
+        self.headless = False
+        self.audience_stats = AudienceStats()
+        self._audience = asyncio.Event()
+
+    @property
+    def playing(self) -> bool:
+        return self.lock.locked()
+
+    @property
+    def idle(self) -> bool:
+        # 因无人观看挂起的对局不阻止回收
+        return (not self.playing or self.suspended) and len(self.hub) == 0
+
+    @property
+    def attended(self) -> bool:
+        """有订阅者，或最后一位离开不满宽限期"""
+        return len(self.hub) > 0 or time.monotonic() - self.last_active < self.idle_grace
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
+
+    async def broadcast(self, msg: dict) -> int:
+        """向本房间所有订阅者广播（编号记入日志后只入队，不等待发送），返回消息的 seq"""
+        self.hub.publish_frame(self.journal.record(msg))
+        return self.journal.seq
+
+    def subscribe(
+        self,
+        ws,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None,
+        wire_format: str = FORMAT_JSON,
+        profile: str = PROFILE_FULL,
+    ) -> ClientChannel:
+        channel = subscribe_channel(self.hub, self.journal, ws, since, epoch, wire_format, profile)
+        self.touch()
+        # 唤醒因无人观看挂起的对局；新观众已从 snapshot 拿到挂起时的局面
+        self._audience.set()
+        return channel
+
+    def unsubscribe(self, ws) -> None:
+        self.hub.remove(ws)
+        self.touch()
+
+    def request_start(self) -> bool:
+        """客户端的 start 请求交给对局调度器（单飞）"""
+        return self.scheduler is not None and self.scheduler.request_start()
+
+    async def await_audience(self) -> None:
+        """无人观看超过宽限期时挂起，直到有观众加入（idle_policy=off 时不挂起）"""
+        if self.idle_policy == IDLE_OFF or self.attended:
+            return
+        # 挂起期间残留的预取请求无用，立即取消
+        self.prefetcher.reset()
+        self.suspended = True
+        self.audience_stats.suspends += 1
+        started = time.monotonic()
+        logger.info("房间 %s 无人观看，对局挂起", self.room_id)
+        try:
+            while len(self.hub) == 0:
+                self._audience.clear()
+                await self._audience.wait()
+        finally:
+            self.suspended = False
+            self.audience_stats.suspended_seconds += time.monotonic() - started
+        self.headless = False
+        logger.info("房间 %s 有观众加入，对局继续", self.room_id)
+
+    async def turn_boundary(self) -> None:
+        """每个回合开始前调用：无人观看时按 idle_policy 挂起，或切换为托管（headless）直到本局结束"""
+        if self.idle_policy == IDLE_HEADLESS and not self.attended:
+            if not self.headless:
+                self.headless = True
+                self.prefetcher.reset()
+                logger.info("房间 %s 无人观看，本局改为托管", self.room_id)
+            self.audience_stats.headless_turns += 1
+            return
+        self.headless = False
+        await self.await_audience()
+
+    async def sleep(self, seconds: float) -> None:
+        """按房间节奏等待（pace=0 或托管时不等待，仅让出事件循环）"""
+        self.nominal_wait += seconds
+        await asyncio.sleep(0 if self.headless else seconds * self.pace)
+
+    def deadline(self, seconds: float, start: Optional[int] = None) -> int:
+        """按房间节奏等待 seconds 秒后的服务端时刻（毫秒），供客户端按时间线本地播放动画"""
+        start = now_ms() if start is None else start
+        return start + (0 if self.headless else int(seconds * self.pace * 1000))
+
+    def track(self, task: asyncio.Task) -> None:
+        self.commentary_tasks.add(task)
+        task.add_done_callback(self.commentary_tasks.discard)
+
+    async def run_exclusive(self, game: Callable[["Room"], "asyncio.Future"]) -> bool:
+        """若当前没有对局则运行 game(room)，否则立即返回 False（避免两局争抢同一组玩家）"""
+        if self.lock.locked():
+            return False
+        async with self.lock:
+            await game(self)
+        return True
+
+    def close(self) -> None:
+        """回收房间：停止对局循环，取消预取与解说任务，断开订阅者"""
+        if self.scheduler is not None:
+            self.scheduler.close()
+        self.prefetcher.reset()
+        for task in list(self.commentary_tasks):
+            task.cancel()
+        self.hub.close()
+
+    def snapshot(self) -> dict:
+        return {
+            "room_id": self.room_id,
+            "subscribers": len(self.hub),
+            "playing": self.playing,
+            "game_count": self.game_count,
+            "scores": {p.name: p.score for p in self.players},
+            "idle_seconds": round(time.monotonic() - self.last_active, 1),
+            "scheduler": self.scheduler.to_dict() if self.scheduler is not None else None,
+            "journal": self.journal.to_dict(),
+            "audience": {
+                "policy": self.idle_policy,
+                "suspended": self.suspended,
+                "headless": self.headless,
+                **self.audience_stats.to_dict(),
+            },
+        }
+
+
+class RoomManager:
+    """按需创建房间（on_create 回调挂接对局调度）；无订阅者超过 idle_ttl 秒且无对局的房间被回收"""
+
+    def __init__(
+        self,
+        factory: Callable[[str], Room] = Room,
+        max_rooms: int = 64,
+        idle_ttl: float = 300.0,
+        on_create: Optional[Callable[[Room], None]] = None,
+    ):
+        self.factory = factory
+        self.on_create = on_create
+        self.max_rooms = max_rooms
+        self.idle_ttl = idle_ttl
+        self.rooms: Dict[str, Room] = {}
+        self.created = 0
+        self.collected = 0
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self.rooms.get(room_id)
+
+    def get_or_create(self, room_id: str) -> Room:
+        """取得房间，不存在则创建。房间号非法抛 ValueError，房间数已满抛 LookupError"""
+        room = self.rooms.get(room_id)
+        if room is not None:
+            room.touch()
+            return room
+        if not valid_room_id(room_id):
+            raise ValueError(f"非法房间号: {room_id!r}")
+        if len(self.rooms) >= self.max_rooms:
+            self.collect()
+            if len(self.rooms) >= self.max_rooms:
+                raise LookupError(f"房间数已达上限 {self.max_rooms}")
+        room = self.factory(room_id)
+        if self.on_create is not None:
+            self.on_create(room)
+        self.rooms[room_id] = room
+        self.created += 1
+        logger.info("房间 %s 已创建（共 %d 个）", room_id, len(self.rooms))
+        return room
+
+    def collect(self, now: Optional[float] = None) -> List[str]:
+        """回收空闲超时的房间，返回被回收的房间号（默认房间常驻，保留其累计积分）"""
+        now = time.monotonic() if now is None else now
+        expired = [
+            rid for rid, room in self.rooms.items()
+            if rid != DEFAULT_ROOM and room.idle and now - room.last_active >= self.idle_ttl
+        ]
+        for rid in expired:
+            self.rooms.pop(rid).close()
+            self.collected += 1
+            logger.info("房间 %s 空闲超时，已回收", rid)
+        return expired
+
+    async def collect_loop(self, interval: float = 30.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.collect()
+
+    def close(self) -> None:
+        for room in self.rooms.values():
+            room.close()
+        self.rooms.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "rooms": len(self.rooms),
+            "max_rooms": self.max_rooms,
+            "created": self.created,
+            "collected": self.collected,
+            "tables": [room.snapshot() for room in self.rooms.values()],
+        }
+
+
+def create_room_manager() -> RoomManager:
+    """根据环境变量创建房间管理器。
+
+    环境变量：
+      MAX_ROOMS：单进程最多同时存在的房间数（默认 64）
+      ROOM_IDLE_TTL：无订阅者且无对局的房间保留时长（秒，默认 300）
+      GAME_SPEED：对局节奏 slow / normal（默认）/ fast / instant
+      IDLE_POLICY：无人观看时 pause（默认，挂起）/ headless（不调用 LLM 即时下完本局）/ off
+      IDLE_GRACE：最后一位观众离开后多少秒视为无人观看（默认 30）
+    """
+    pace = GAME_SPEED_PACE.get(os.getenv("GAME_SPEED", "normal"), 1.0)
+    idle_policy = os.getenv("IDLE_POLICY", IDLE_PAUSE)
+    idle_grace = float(os.getenv("IDLE_GRACE", "30"))
+    return RoomManager(
+        factory=lambda room_id: Room(room_id, pace=pace, idle_policy=idle_policy, idle_grace=idle_grace),
+        max_rooms=int(os.getenv("MAX_ROOMS", "64")),
+        idle_ttl=float(os.getenv("ROOM_IDLE_TTL", "300")),
+    )
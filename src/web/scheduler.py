@@ -0,0 +1,178 @@
+"""对局调度 - 每个房间一个后台任务驱动对局循环；客户端只订阅事件并提交 start 请求
+
+- start 单飞：对局进行中或已排队时，重复的 start 被忽略
+- 自动连播（auto_play）：每局结算后等待 gap 秒自动开始下一局，无需任何客户端操作
+- 结算画面期间预先发好下一局的牌并算完整轮叫分（PreparedGame），下一局开局不再等待 LLM
+- 无人观看时不开新局、不预备下一局（房间挂起到有观众加入）
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from src.engine.card import Card
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreparedGame:
+    """预先发好的一局：三家手牌、底牌、首叫玩家与按叫分顺序预先算好的 (bid, strategy)"""
+    hands: List[List[Card]]
+    dizhu_cards: List[Card]
+    first_bidder: int
+    bids: List[Tuple[int, str]]
+    prepare_ms: float = 0.0
+
+
+# run_game(room, prepared_or_None)；prepare(room) → PreparedGame
+GameRunner = Callable[..., Awaitable[None]]
+GamePreparer = Callable[..., Awaitable[PreparedGame]]
+
+
+@dataclass
+class SchedulerStats:
+    games: int = 0
+    starts: int = 0
+    starts_ignored: int = 0       # 单飞：对局进行中或已排队时的重复 start
+    prepared: int = 0             # 使用了预发牌 / 预叫分的对局
+    prepare_failed: int = 0
+    prepare_ms: float = 0.0       # 最近一次准备耗时
+    gap_overrun_ms: float = 0.0   # 准备时间超出结算间隔的累计时长（直播停顿）
+
+    def to_dict(self) -> dict:
+        return {
+            "games": self.games,
+            "starts": self.starts,
+            "starts_ignored": self.starts_ignored,
+            "prepared": self.prepared,
+            "prepare_failed": self.prepare_failed,
+            "prepare_ms": round(self.prepare_ms, 1),
+            "gap_overrun_ms": round(self.gap_overrun_ms, 1),
+        }
+
+
+class GameScheduler:
+    """单个房间的对局循环（由 start() 启动的后台任务独占运行）"""
+
+    def __init__(
+        self,
+        room,
+        run_game: GameRunner,
+        prepare: Optional[GamePreparer] = None,
+        auto_play: bool = False,
+        gap: float = 10.0,
+    ):
+        self.room = room
+        self.run_game = run_game
+        self.prepare = prepare
+        self.auto_play = auto_play
+        self.gap = gap
+        self.stats = SchedulerStats()
+        self._start = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._prepared: Optional[PreparedGame] = None
+        self._prepare_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.ensure_future(self._loop())
+
+    def request_start(self) -> bool:
+        """客户端的 start 请求：只在空闲且未排队时生效（自动连播下由调度器自行开局）"""
+        if self.auto_play or self._start.is_set():
+            self.stats.starts_ignored += 1
+            return False
+        self.stats.starts += 1
+        self._start.set()
+        return True
+
+    async def _loop(self) -> None:
+        if self.auto_play:
+            self._start.set()
+        while True:
+            await self._start.wait()
+            await self.room.await_audience()
+            # 对局结束前不清除 start 标记：准备 / 对局期间到达的 start 都被单飞忽略
+            prepared = await self._take_prepared()
+            if prepared is not None:
+                self.stats.prepared += 1
+            try:
+                await self.room.run_exclusive(lambda room: self.run_game(room, prepared))
+                self.stats.games += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("房间 %s 对局异常中止", self.room.room_id)
+            self._start.clear()
+            # 结算画面期间准备下一局
+            self._begin_prepare()
+            if self.auto_play:
+                await self.room.sleep(self.gap)
+                self._start.set()
+
+    def _begin_prepare(self) -> None:
+        if self.prepare is None or not self.room.attended:
+            return
+        started = time.perf_counter()
+
+        async def run() -> None:
+            try:
+                self._prepared = await self.prepare(self.room)
+                self.stats.prepare_ms = (time.perf_counter() - started) * 1000
+                self._prepared.prepare_ms = self.stats.prepare_ms
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.prepare_failed += 1
+                logger.exception("房间 %s 预备下一局失败，开局时现场发牌", self.room.room_id)
+
+        self._prepared = None
+        self._prepare_task = asyncio.ensure_future(run())
+
+    async def _take_prepared(self) -> Optional[PreparedGame]:
+        """取出预备好的下一局；仍在准备时等待其完成（超出结算间隔的部分计入停顿）"""
+        task, self._prepare_task = self._prepare_task, None
+        if task is not None and not task.done():
+            waited = time.perf_counter()
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            except Exception:
+                pass
+            self.stats.gap_overrun_ms += (time.perf_counter() - waited) * 1000
+        prepared, self._prepared = self._prepared, None
+        return prepared
+
+    def close(self) -> None:
+        for task in (self._task, self._prepare_task):
+            if task is not None:
+                task.cancel()
+        self._task = self._prepare_task = None
+
+    def to_dict(self) -> dict:
+        return {"auto_play": self.auto_play, "gap": self.gap, **self.stats.to_dict()}
+
+
+def scheduler_options() -> dict:
+    """从环境变量读取调度配置。
+
+    环境变量：
+      AUTO_PLAY：自动连播（默认 0，客户端 start 开局）
+      AUTO_PLAY_GAP：每局结算后到下一局开局的间隔（秒，默认 10）
+      PREPARE_NEXT_GAME：结算期间预发下一局的牌并预算叫分（默认 1）
+    """
+    return {
+        "auto_play": os.getenv("AUTO_PLAY", "0") not in ("0", "false", "False", ""),
+        "gap": float(os.getenv("AUTO_PLAY_GAP", "10")),
+        "prepare": os.getenv("PREPARE_NEXT_GAME", "1") not in ("0", "false", "False", ""),
+    }
@@ -4,23 +4,34 @@ import asyncio
 import json
 import logging
 import random
-from typing import List, Set
 from pathlib import Path
 from collections import Counter
+from typing import List, Optional, Tuple
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
-from src.engine.card import Card, Rank, RANK_DISPLAY
+from src.engine.card import Rank, RANK_DISPLAY, card_ids, hand_checksum
 from src.engine.hand_type import HandType, PlayedHand
 from src.engine.hand_detector import detect_hand, can_beat
 from src.game.player import Player, Role
 from src.game.game_state import GameState, GamePhase, GameEvent
 from src.game.controller import GameController
 from src.ai.rule_ai import RuleAI
-from src.ai.llm_ai import LlmAI, create_llm_players
+from src.ai.decision_cache import get_decision_cache
+from src.ai.metrics import decision_stats
+from src.ai.client_pool import get_client_registry
+from src.ai.latency import latency_stats
+from src.ai.routing import get_breaker_registry
+from src.ai.telemetry import get_telemetry
+from src.web.fanout import create_fanout_client
+from src.web.lifecycle import start_table, stop_table
+from src.web.room import DEFAULT_ROOM, PLAYER_NAMES, Room, create_room_manager, now_ms
+from src.web.scheduler import GameScheduler, PreparedGame, scheduler_options
+from src.web.profiles import CONTROL_PROFILES, negotiate_profile
+from src.web.wire import negotiate, precompile
 
 # 加载 .env 配置
 load_dotenv()
@@ -41,6 +52,9 @@ HAND_TYPE_NAME = {
     HandType.BOMB: "炸弹", HandType.ROCKET: "火箭",
 }
 
+# 牌型名与玩家名在每局消息中反复出现，预编码为二进制片段
+precompile(list(HAND_TYPE_NAME.values()) + PLAYER_NAMES)
+
 # AI 策略描述（用于直播展示）
 def describe_strategy(player: Player, state: GameState, cards, is_pass: bool) -> str:
     """生成 AI 出牌策略的简短描述"""
@@ -88,23 +102,14 @@ def describe_strategy(player: Player, state: GameState, cards, is_pass: bool) ->
 #  序列化工具
 # ============================================================
 
-def card_to_dict(c: Card) -> dict:
-    """将 Card 序列化为前端可用的 dict"""
-    return {
-        "rank": int(c.rank),
-        "suit": c.suit.value,
-        "display": c.display,
-    }
-
-
 def player_to_dict(p: Player) -> dict:
-    """将 Player 序列化"""
+    """将 Player 序列化（不含手牌：手牌按发牌时间线 + 出牌增量维护，checksum 供前端校验）"""
     return {
         "id": p.id,
         "name": p.name,
         "role": p.role.value,
         "hand_size": p.hand_size,
-        "hand": [card_to_dict(c) for c in p.hand],
+        "checksum": hand_checksum(card_ids(p.hand)),
     }
 
 
@@ -117,37 +122,27 @@ STATIC_DIR = Path(__file__).parent / "static"
 app = FastAPI(title="AI 斗地主")
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
-# WebSocket 连接池
-connections: Set[WebSocket] = set()
-
-# ============================================================
-#  模块级持久化：跨局复用玩家和 AI 实例（保留累计积分）
-# ============================================================
-
-PLAYER_NAMES = ["烈焰哥🔥", "冰山姐❄️", "戏精弟🎭"]
-persistent_strategies: List = create_llm_players(PLAYER_NAMES)
-persistent_players: List[Player] = [
-    Player(id=i, name=name) for i, name in enumerate(PLAYER_NAMES)
-]
-game_count: int = 0
+# 房间：每个房间独立的玩家、AI 实例（跨局保留累计积分）、订阅者与对局循环
+rooms = create_room_manager()
+# 多进程扇出：设置 FANOUT_SOCKET 时本进程只做 WebSocket 扇出，对局在牌桌进程中运行（python -m src.web.fanout）
+fanout = create_fanout_client()
+# 启动时创建的后台循环（房间回收、遥测落盘），退出时取消
+background_tasks: List[asyncio.Task] = []
 
 
-async def broadcast_thinking(player_id: int, phase: str, seconds: int) -> None:
-    """广播 AI 思考倒计时：先发 thinking 开始，然后逐秒倒计时"""
-    await broadcast({
+async def broadcast_thinking(room: Room, player_id: int, phase: str, seconds: int) -> None:
+    """广播 AI 思考时间线：一条 thinking 消息给出起止时刻，客户端按同步后的时钟本地倒计时（不再逐秒推送）"""
+    now = now_ms()
+    await room.broadcast({
         "type": "thinking",
         "player_id": player_id,
         "phase": phase,
         "total": seconds,
         "remaining": seconds,
+        "start": now,
+        "until": room.deadline(seconds, now),
     })
-    for i in range(seconds, 0, -1):
-        await asyncio.sleep(1.0)
-        await broadcast({
-            "type": "countdown",
-            "player_id": player_id,
-            "remaining": i - 1,
-        })
+    await room.sleep(seconds)
 
 
 def get_thinking_seconds(phase: str) -> int:
@@ -158,16 +153,58 @@ def get_thinking_seconds(phase: str) -> int:
         return random.randint(2, 5)
 
 
-async def broadcast(msg: dict) -> None:
-    """向所有连接的客户端广播消息"""
-    data = json.dumps(msg, ensure_ascii=False)
-    dead = set()
-    for ws in connections:
-        try:
-            await ws.send_text(data)
-        except Exception:
-            dead.add(ws)
-    connections.difference_update(dead)
+# 逐张发牌动画中每张牌的间隔（秒）
+DEAL_CARD_INTERVAL = 0.04
+
+# 流式解说推送的最小间隔（秒）
+STREAM_PUSH_INTERVAL = 0.15
+
+
+def start_commentary(strategy, player: Player, state: GameState, action_text: str):
+    """动作确定后立即发起并发解说（策略不支持或未开启时返回 None）"""
+    starter = getattr(strategy, "start_commentary", None)
+    if starter is None:
+        return None
+    return starter(player, state, action_text)
+
+
+def push_commentary(room: Room, player_id: int, task, action_seq: int) -> None:
+    """解说生成完成后以 commentary 消息补发给前端，替换即时占位解说（action_seq：所属动作的 seq，该座位已有新动作时前端丢弃）"""
+    async def _push() -> None:
+        text = await task
+        if text:
+            await room.broadcast({
+                "type": "commentary",
+                "player_id": player_id,
+                "action_seq": action_seq,
+                "strategy": text,
+            })
+
+    room.track(asyncio.ensure_future(_push()))
+
+
+def take_strategy_stream(strategy, player: Player, state: GameState):
+    """取出决策已提交、解说仍在流式生成的解说流（策略不支持或未开启时返回 None）"""
+    taker = getattr(strategy, "take_strategy_stream", None)
+    if taker is None:
+        return None
+    return taker(player, state)
+
+
+def push_strategy_stream(room: Room, player_id: int, stream, action_seq: int) -> None:
+    """解说边生成边以 commentary 消息推送（streaming=false 表示最终文本）"""
+    async def _push() -> None:
+        async for text in stream.updates(min_interval=STREAM_PUSH_INTERVAL):
+            if text:
+                await room.broadcast({
+                    "type": "commentary",
+                    "player_id": player_id,
+                    "action_seq": action_seq,
+                    "strategy": text,
+                    "streaming": not stream.done,
+                })
+
+    room.track(asyncio.ensure_future(_push()))
 
 
 @app.get("/")
@@ -176,84 +213,241 @@ async def index():
     return FileResponse(str(STATIC_DIR / "index.html"))
 
 
+@app.get("/api/rooms")
+async def room_stats():
+    """各房间的订阅者数、对局状态与累计积分（扇出 worker 返回本进程的房间镜像）"""
+    return rooms.snapshot() if fanout is None else fanout.snapshot()
+
+
+@app.get("/api/speculation")
+async def speculation_stats():
+    """各房间的投机预取命中率与浪费请求统计"""
+    return {rid: room.prefetcher.stats.to_dict() for rid, room in rooms.rooms.items()}
+
+
+@app.get("/api/ws")
+async def ws_stats():
+    """各房间 WebSocket 连接的发送队列深度、丢弃 / 合并计数与慢客户端断开统计"""
+    local = rooms.rooms if fanout is None else fanout.mirrors
+    return {rid: room.hub.snapshot() for rid, room in local.items()}
+
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """按模型与 prompt 模式统计的 LLM 非法响应率 / fallback 率"""
+    return decision_stats.snapshot()
+
+
+@app.get("/api/llm/cache")
+async def llm_cache_stats():
+    """LLM 决策缓存按人格的命中统计（未启用缓存时返回空）"""
+    cache = get_decision_cache()
+    return cache.snapshot() if cache is not None else {}
+
+
+@app.get("/api/llm/pool")
+async def llm_pool_stats():
+    """各 LLM 端点的连接复用、首调延迟与按优先级排队统计"""
+    return get_client_registry().snapshot()
+
+
+@app.get("/api/llm/latency")
+async def llm_latency_stats():
+    """各端点/模型的延迟分位数与对冲、超时计数"""
+    return latency_stats.snapshot()
+
+
+@app.get("/api/llm/breakers")
+async def llm_breaker_stats():
+    """各端点/模型的熔断器状态（closed / open / half_open）"""
+    return get_breaker_registry().snapshot()
+
+
+@app.get("/api/llm/telemetry")
+async def llm_telemetry():
+    """按人格/模型/调用类型聚合的调用遥测：延迟直方图、token 用量、结果分类与费用估算"""
+    return get_telemetry().snapshot()
+
+
+@app.on_event("startup")
+async def start_services():
+    """启动时创建默认房间、预热 LLM 端点连接并启动后台循环；扇出 worker 只连接牌桌进程"""
+    if fanout is not None:
+        fanout.start()
+        return
+    background_tasks.extend(await start_table(rooms))
+
+
+@app.on_event("shutdown")
+async def stop_services():
+    """退出时停掉后台循环、关闭房间与连接，并将决策缓存、决策日志与遥测落盘"""
+    if fanout is not None:
+        fanout.close()
+        rooms.close()
+        return
+    await stop_table(rooms, background_tasks)
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
-    """WebSocket 端点：客户端连接后等待 start 指令"""
+    """默认房间的 WebSocket 端点（兼容旧前端）"""
+    await serve_room(ws, DEFAULT_ROOM)
+
+
+@app.websocket("/ws/{room_id}")
+async def room_websocket_endpoint(ws: WebSocket, room_id: str):
+    """房间 WebSocket 端点：房间不存在时按需创建；客户端只订阅事件，start 交给房间调度器"""
+    await serve_room(ws, room_id)
+
+
+async def serve_room(ws: WebSocket, room_id: str) -> None:
+    try:
+        # 扇出 worker 取得牌桌进程房间的本地镜像（订阅 / 开局 / 快照接口与 Room 一致）
+        room = rooms.get_or_create(room_id) if fanout is None else await fanout.join(room_id)
+    except (ValueError, LookupError) as e:
+        logger.warning("拒绝房间连接: %s", e)
+        await ws.close(code=1008)
+        return
     await ws.accept()
-    connections.add(ws)
+    # 重连时客户端带上 ?since=<最后收到的 seq>&epoch=<房间 epoch>，只补发漏掉的消息；
+    # ?format=msgpack 协商二进制编码；?profile= 声明订阅档位（public / scores-only / admin，默认 overlay-full）
+    since = ws.query_params.get("since")
+    channel = room.subscribe(
+        ws,
+        since=int(since) if since and since.isdigit() else None,
+        epoch=ws.query_params.get("epoch"),
+        wire_format=negotiate(ws.query_params.get("format")),
+        profile=negotiate_profile(ws.query_params.get("profile")),
+    )
     try:
         while True:
             data = await ws.receive_text()
             msg = json.loads(data)
-            if msg.get("action") == "start":
-                await run_game_async()
+            if msg.get("action") == "start" and channel.profile in CONTROL_PROFILES:
+                # 只向调度器提交请求，不在接收循环里跑对局；已有对局或已排队时忽略（public / scores-only 档位无权开局）
+                room.request_start()
+            elif msg.get("action") == "snapshot":
+                # 客户端手牌校验和不符（增量漂移），补发当前局面
+                channel.offer(room.journal.snapshot_frame())
     except (WebSocketDisconnect, RuntimeError):
         pass
     finally:
-        connections.discard(ws)
+        room.unsubscribe(ws)
 
 
 # ============================================================
 #  异步对局驱动
 # ============================================================
 
-async def run_game_async() -> None:
-    """异步驱动一局完整对局，每步实时推送事件到前端"""
-    global game_count
-    game_count += 1
+def new_controller(players, strategies) -> GameController:
+    """以给定的玩家与策略构造 GameController（不新建玩家，保留累计积分）"""
+    gc = GameController.__new__(GameController)
+    gc.players = players
+    gc.strategies = strategies
+    gc.state = GameState(players=players)
+    gc._callbacks = []
+    return gc
+
+
+async def prepare_next_game(room: Room) -> PreparedGame:
+    """结算画面期间预备下一局：在影子玩家上发牌并算完整轮叫分（不广播、不改动房间玩家）"""
+    shadows = [Player(id=p.id, name=p.name, score=p.score) for p in room.players]
+    gc = new_controller(shadows, room.strategies)
+    gc.deal()
+    hands = [list(p.hand) for p in shadows]
+    s = gc.state
+    bids = []
+    for _ in range(3):
+        pid = s.current_bidder
+        bid, strategy_text = await room.strategies[pid].async_decide_bid(shadows[pid], s)
+        bid = gc._validate_bid(bid)
+        bids.append((bid, strategy_text))
+        s.bid_scores[pid] = bid
+        s.bid_round_done += 1
+        if bid > s.highest_bid:
+            s.highest_bid = bid
+            s.highest_bidder = pid
+        if bid == 3:
+            break
+        s.current_bidder = (pid + 1) % 3
+    return PreparedGame(
+        hands=hands,
+        dizhu_cards=list(s.dizhu_cards),
+        first_bidder=s.first_bidder,
+        bids=bids,
+    )
+
+
+def attach_scheduler(room: Room) -> None:
+    """为新建房间挂接对局调度器（AUTO_PLAY 时立即开始连播）"""
+    opts = scheduler_options()
+    room.scheduler = GameScheduler(
+        room,
+        run_game_async,
+        prepare=prepare_next_game if opts["prepare"] else None,
+        auto_play=opts["auto_play"],
+        gap=opts["gap"],
+    )
+    room.scheduler.start()
+
+
+rooms.on_create = attach_scheduler
+
+
+async def run_game_async(room: Room, prepared: Optional[PreparedGame] = None) -> None:
+    """异步驱动房间内一局完整对局，每步实时推送事件到本房间的订阅者（prepared: 预先发好的牌与叫分）"""
+    room.game_count += 1
 
-    # 复用模块级玩家实例（保留累计积分），重置本局状态
-    for p in persistent_players:
+    # 复用房间的玩家实例（保留累计积分），重置本局状态
+    for p in room.players:
         p.reset_for_new_game()
+    room.prefetcher.reset()
 
-    # GameController 使用持久化玩家和策略
-    gc = GameController.__new__(GameController)
-    gc.players = persistent_players
-    gc.strategies = persistent_strategies
-    gc.state = GameState(players=persistent_players)
-    gc._callbacks = []
+    # GameController 使用房间的玩家和策略
+    gc = new_controller(room.players, room.strategies)
 
     # 发牌
-    gc.deal()
+    if prepared is None:
+        gc.deal()
+    else:
+        for p, hand in zip(gc.players, prepared.hands):
+            p.hand = list(hand)
+            p.sort_hand()
+        gc.state.dizhu_cards = list(prepared.dizhu_cards)
+        gc.state.first_bidder = gc.state.current_bidder = prepared.first_bidder
+        gc.state.phase = GamePhase.BIDDING
 
     # 逐张发牌动画：先发空手牌，再逐张添加
-    await broadcast({
+    await room.broadcast({
         "type": "deal_start",
         "players": [{"id": p.id, "name": p.name} for p in gc.players],
-        "game_count": game_count,
+        "game_count": room.game_count,
         "total_scores": [
             {"id": p.id, "name": p.name, "total_score": p.score}
             for p in gc.players
         ],
     })
-    await asyncio.sleep(0.5)
-
-    # 模拟逐张发牌（每人17张，轮流发）
-    deal_order = []
-    for i in range(17):
-        for pid in range(3):
-            deal_order.append((pid, gc.players[pid].hand[i]))
-
-    for idx, (pid, card) in enumerate(deal_order):
-        await broadcast({
-            "type": "deal_card",
-            "player_id": pid,
-            "card": card_to_dict(card),
-            "card_index": idx // 3,
-        })
-        # 每3张一组稍快，组间稍慢
-        await asyncio.sleep(0.04)
+    await room.sleep(0.5)
+
+    # 逐张发牌时间线：一条消息给出起始时刻与间隔，客户端按 0,1,2,0,1,2… 轮流逐张播放（每人17张）
+    await room.broadcast({
+        "type": "deal_schedule",
+        "start": now_ms(),
+        "interval": int(DEAL_CARD_INTERVAL * room.pace * 1000),
+        "hands": [card_ids(p.hand) for p in gc.players],
+    })
+    await room.sleep(DEAL_CARD_INTERVAL * 17 * 3)
 
-    # 发牌完成，发送完整手牌
-    await broadcast({
+    # 发牌完成：手牌已在发牌时间线中，这里只发张数与校验和
+    await room.broadcast({
         "type": "deal_done",
         "players": [player_to_dict(p) for p in gc.players],
-        "dizhu_cards": [card_to_dict(c) for c in gc.state.dizhu_cards],
+        "dizhu_cards": card_ids(gc.state.dizhu_cards),
     })
-    await asyncio.sleep(1.0)
+    await room.sleep(1.0)
 
     # 叫地主阶段（异步逐步，带思考倒计时）
-    await run_bidding_async(gc, persistent_strategies)
+    await run_bidding_async(room, gc, prepared.bids if prepared is not None else None)
 
     if gc.state.highest_bidder is None:
         gc.state.highest_bid = 1
@@ -261,39 +455,55 @@ async def run_game_async() -> None:
     else:
         gc._assign_landlord(gc.state.highest_bidder)
 
-    # 地主确定
+    # 地主确定：底牌即地主手牌的增量（added）
     landlord = next(p for p in gc.players if p.is_landlord)
-    await broadcast({
+    await room.broadcast({
         "type": "landlord",
         "player_id": landlord.id,
         "players": [player_to_dict(p) for p in gc.players],
-        "dizhu_cards": [card_to_dict(c) for c in gc.state.dizhu_cards],
+        "dizhu_cards": card_ids(gc.state.dizhu_cards),
+        "added": card_ids(gc.state.dizhu_cards),
         "highest_bid": gc.state.highest_bid,
     })
-    await asyncio.sleep(1.5)
+    await room.sleep(1.5)
 
     # 出牌阶段：逐步执行，每步实时推送
-    await run_playing_async(gc, persistent_strategies)
+    await run_playing_async(room, gc)
 
 
 # ============================================================
 #  异步叫地主（带思考倒计时）
 # ============================================================
 
-async def run_bidding_async(gc: GameController, strategies) -> None:
-    """异步执行叫地主，每人决策前有思考倒计时"""
+async def run_bidding_async(
+    room: Room, gc: GameController, bids: Optional[List[Tuple[int, str]]] = None
+) -> None:
+    """异步执行叫地主，每人决策前有思考倒计时（bids: 预先算好的叫分，按叫分顺序回放）"""
     s = gc.state
-    for _ in range(3):
+    strategies = room.strategies
+    for turn in range(3):
         pid = s.current_bidder
         player = gc.players[pid]
 
-        # 思考倒计时
-        think_time = get_thinking_seconds("bid")
-        await broadcast_thinking(pid, "bid", think_time)
+        # 回合边界：无人观看时挂起，或改为托管（不调用 LLM、不等待）
+        await room.turn_boundary()
 
-        # AI 决策（异步 LLM 调用）
-        bid, strategy_text = await strategies[pid].async_decide_bid(player, s)
+        # 思考倒计时
+        if not room.headless:
+            think_time = get_thinking_seconds("bid")
+            await broadcast_thinking(room, pid, "bid", think_time)
+
+        # AI 决策（异步 LLM 调用；已预算则直接回放；托管时用规则 AI）
+        if bids is not None and turn < len(bids):
+            bid, strategy_text = bids[turn]
+        elif room.headless:
+            bid, strategy_text = strategies[pid].decide_bid(player, s), ""
+        else:
+            bid, strategy_text = await strategies[pid].async_decide_bid(player, s)
         bid = gc._validate_bid(bid)
+        commentary = None if room.headless else start_commentary(
+            strategies[pid], player, s, f"叫{bid}分" if bid > 0 else "不叫"
+        )
 
         s.bid_scores[pid] = bid
         s.bid_round_done += 1
@@ -304,13 +514,15 @@ async def run_bidding_async(gc: GameController, strategies) -> None:
             s.highest_bidder = pid
 
         # 广播叫分结果
-        await broadcast({
+        seq = await room.broadcast({
             "type": "bid",
             "player_id": pid,
             "bid": bid,
             "strategy": strategy_text,
         })
-        await asyncio.sleep(0.8)
+        if commentary is not None:
+            push_commentary(room, pid, commentary, seq)
+        await room.sleep(0.8)
 
         if bid == 3:
             break
@@ -321,9 +533,10 @@ async def run_bidding_async(gc: GameController, strategies) -> None:
 #  逐步异步出牌（带思考倒计时）
 # ============================================================
 
-async def run_playing_async(gc: GameController, strategies) -> None:
+async def run_playing_async(room: Room, gc: GameController) -> None:
     """逐步执行出牌，每步实时推送正确的手牌和 hand_size"""
     s = gc.state
+    strategies = room.strategies
 
     # 记录本局开始前的累计积分（用于计算本局得分差值）
     scores_before = {p.id: p.score for p in gc.players}
@@ -339,27 +552,40 @@ async def run_playing_async(gc: GameController, strategies) -> None:
             s.last_player = None
             s.pass_count = 0
 
-        # 思考倒计时
-        think_time = get_thinking_seconds("play")
-        await broadcast_thinking(pid, "play", think_time)
+        await room.turn_boundary()
+
+        if room.headless:
+            # 托管：规则 AI 即时决策，不调用 LLM、不推送思考时间线与解说
+            cards, strategy_text = strategies[pid].decide_play(player, s), ""
+            stream = None
+        else:
+            # 思考倒计时
+            think_time = get_thinking_seconds("play")
+            await broadcast_thinking(room, pid, "play", think_time)
 
-        # AI 决策（异步 LLM 调用，返回 cards + strategy）
-        cards, strategy_text = await strategies[pid].async_decide_play(player, s)
+            # AI 决策（异步 LLM 调用，返回 cards + strategy；同时预取下一座位）
+            cards, strategy_text = await room.prefetcher.decide(pid, s)
+            stream = take_strategy_stream(strategies[pid], player, s)
 
         if cards is None:
             # 不出 (PASS)
             if not strategy_text:
                 strategy_text = describe_strategy(player, s, None, True)
+            commentary = None if room.headless else start_commentary(strategies[pid], player, s, "不出")
             s.pass_count += 1
             gc._emit(GameEvent(GamePhase.PLAYING, pid, "pass"))
             s.current_player = (pid + 1) % 3
 
-            await broadcast({
+            seq = await room.broadcast({
                 "type": "pass",
                 "player_id": pid,
                 "strategy": strategy_text,
             })
-            await asyncio.sleep(0.5)
+            if commentary is not None:
+                push_commentary(room, pid, commentary, seq)
+            if stream is not None:
+                push_strategy_stream(room, pid, stream, seq)
+            await room.sleep(0.5)
         else:
             # 出牌：LLM 未返回 strategy 时用 describe_strategy 兜底
             if not strategy_text:
@@ -382,7 +608,11 @@ async def run_playing_async(gc: GameController, strategies) -> None:
                 s.current_player = (pid + 1) % 3
                 continue
 
-            # 合法出牌：先移除手牌
+            # 合法出牌：按出牌前的局面发起并发解说，再移除手牌
+            commentary = None if room.headless else start_commentary(
+                strategies[pid], player, s,
+                f"出{HAND_TYPE_NAME.get(hand.type, '')} {' '.join(c.display for c in cards)}",
+            )
             player.remove_cards(cards)
             player.play_count += 1
 
@@ -395,19 +625,23 @@ async def run_playing_async(gc: GameController, strategies) -> None:
             s.play_history.append((pid, hand))
             gc._emit(GameEvent(GamePhase.PLAYING, pid, "play", hand))
 
-            # 实时推送：此时 hand_size 是准确的
-            await broadcast({
+            # 实时推送：cards 即从手牌中移除的增量，checksum 校验剩余手牌
+            seq = await room.broadcast({
                 "type": "play",
                 "player_id": pid,
                 "hand_type": HAND_TYPE_NAME.get(hand.type, ""),
-                "cards": [card_to_dict(c) for c in hand.cards],
+                "cards": card_ids(hand.cards),
                 "is_bomb": hand.is_bomb_like,
                 "hand_size": player.hand_size,
-                "hand": [card_to_dict(c) for c in player.hand],
+                "checksum": hand_checksum(card_ids(player.hand)),
                 "strategy": strategy_text,
             })
+            if commentary is not None:
+                push_commentary(room, pid, commentary, seq)
+            if stream is not None:
+                push_strategy_stream(room, pid, stream, seq)
             delay = 1.2 if hand.is_bomb_like else 0.6
-            await asyncio.sleep(delay)
+            await room.sleep(delay)
 
             # 检查是否出完
             if player.hand_size == 0:
@@ -416,11 +650,12 @@ async def run_playing_async(gc: GameController, strategies) -> None:
 
             s.current_player = (pid + 1) % 3
 
-    # 结算
-    await send_result(gc, scores_before)
+    # 结算（残留的预取结果已无用，立即取消）
+    room.prefetcher.reset()
+    await send_result(room, gc, scores_before)
 
 
-async def send_result(gc: GameController, scores_before: dict) -> None:
+async def send_result(room: Room, gc: GameController, scores_before: dict) -> None:
     """推送结算信息（scores_before: 本局开始前各玩家累计积分）"""
     s = gc.state
     winner = gc.players[s.winner]
@@ -428,7 +663,7 @@ async def send_result(gc: GameController, scores_before: dict) -> None:
     if s.is_spring or s.is_anti_spring:
         m *= 2
 
-    await broadcast({
+    await room.broadcast({
         "type": "result",
         "winner_id": s.winner,
         "winner_name": winner.name,
@@ -437,7 +672,9 @@ async def send_result(gc: GameController, scores_before: dict) -> None:
         "is_anti_spring": s.is_anti_spring,
         "bomb_count": s.bomb_count,
         "multiplier": m,
-        "game_count": game_count,
+        "game_count": room.game_count,
+        # 自动连播时距下一局开局的秒数（None 表示等待客户端 start）
+        "auto_next": room.scheduler.gap if room.scheduler is not None and room.scheduler.auto_play else None,
         "scores": [
             {
                 "name": p.name,
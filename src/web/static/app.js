@@ -11,10 +11,36 @@ const RED_SUITS = new Set(['♥', '♦']);
 
 let ws = null;
 let restartTimer = null;  // 结算倒计时 timer
+let clockOffset = 0;      // 服务端时钟 - 本地时钟（毫秒），连接时由 clock 消息校准
+let lastSeq = null;       // 最后处理的消息序号（断线重连时只补发其后的消息）
+let roomEpoch = null;     // 房间 epoch（房间被回收重建后改变，此时服务端改发 snapshot）
+let actionSeq = {};       // 各座位最近一个动作（bid / play / pass）的 seq，迟到的解说据此丢弃
+
+/** 换算到服务端时钟的当前时刻（毫秒） */
+function serverNow() {
+    return Date.now() + clockOffset;
+}
+
+// 房间号取自 URL 参数 ?room=xxx，未指定时进入默认房间
+const ROOM_ID = new URLSearchParams(location.search).get('room');
+// 线上编码：?format=msgpack 时服务端以 MessagePack 二进制推送（客户端发出的指令仍为 JSON）
+const WIRE_FORMAT = new URLSearchParams(location.search).get('format');
+// 订阅档位：?profile=public 时服务端不推送未打出的手牌（显示背面），默认 overlay-full
+const PROFILE = new URLSearchParams(location.search).get('profile');
 
 function connect() {
     const proto = location.protocol === 'https:' ? 'wss' : 'ws';
-    ws = new WebSocket(`${proto}://${location.host}/ws`);
+    const path = ROOM_ID ? `/ws/${encodeURIComponent(ROOM_ID)}` : '/ws';
+    const params = new URLSearchParams();
+    if (lastSeq !== null && roomEpoch !== null) {
+        params.set('since', lastSeq);
+        params.set('epoch', roomEpoch);
+    }
+    if (WIRE_FORMAT) params.set('format', WIRE_FORMAT);
+    if (PROFILE) params.set('profile', PROFILE);
+    const query = params.toString();
+    ws = new WebSocket(`${proto}://${location.host}${path}${query ? '?' + query : ''}`);
+    ws.binaryType = 'arraybuffer';
 
     ws.onopen = () => console.log('[WS] 已连接');
     ws.onclose = () => {
@@ -23,11 +49,59 @@ function connect() {
     };
     ws.onerror = (e) => console.error('[WS] 错误', e);
     ws.onmessage = (e) => {
-        const msg = JSON.parse(e.data);
+        const msg = typeof e.data === 'string'
+            ? JSON.parse(e.data)
+            : unpackMsg(new Uint8Array(e.data));
+        if (msg.seq !== undefined) {
+            // 补发与实时消息衔接处可能重复，按序号去重
+            if (msg.type !== 'snapshot' && lastSeq !== null && msg.seq <= lastSeq) return;
+            lastSeq = msg.seq;
+        }
         handleMessage(msg);
     };
 }
 
+const utf8 = new TextDecoder();
+
+/** MessagePack 解码（与后端 src/web/wire.py 的 pack 支持的类型对应） */
+function unpackMsg(buf) {
+    const view = new DataView(buf.buffer, buf.byteOffset, buf.byteLength);
+    let i = 0;
+    const str = (n) => { const s = utf8.decode(buf.subarray(i, i + n)); i += n; return s; };
+    const arr = (n) => { const a = []; for (let k = 0; k < n; k++) a.push(read()); return a; };
+    const map = (n) => { const o = {}; for (let k = 0; k < n; k++) { const key = read(); o[key] = read(); } return o; };
+    function read() {
+        const b = buf[i++];
+        if (b < 0x80) return b;
+        if (b >= 0xe0) return b - 0x100;
+        if (b >= 0xa0 && b <= 0xbf) return str(b & 0x1f);
+        if (b >= 0x90 && b <= 0x9f) return arr(b & 0x0f);
+        if (b >= 0x80 && b <= 0x8f) return map(b & 0x0f);
+        let v;
+        switch (b) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xcb: v = view.getFloat64(i); i += 8; return v;
+            case 0xcc: return buf[i++];
+            case 0xcd: v = view.getUint16(i); i += 2; return v;
+            case 0xce: v = view.getUint32(i); i += 4; return v;
+            case 0xcf: v = Number(view.getBigUint64(i)); i += 8; return v;
+            case 0xd0: v = view.getInt8(i); i += 1; return v;
+            case 0xd1: v = view.getInt16(i); i += 2; return v;
+            case 0xd2: v = view.getInt32(i); i += 4; return v;
+            case 0xd3: v = Number(view.getBigInt64(i)); i += 8; return v;
+            case 0xd9: return str(buf[i++]);
+            case 0xda: v = view.getUint16(i); i += 2; return str(v);
+            case 0xdb: v = view.getUint32(i); i += 4; return str(v);
+            case 0xdc: v = view.getUint16(i); i += 2; return arr(v);
+            case 0xde: v = view.getUint16(i); i += 2; return map(v);
+        }
+        throw new Error(`不支持的 MessagePack 类型字节 0x${b.toString(16)}`);
+    }
+    return read();
+}
+
 function send(obj) {
     if (ws && ws.readyState === WebSocket.OPEN) {
         ws.send(JSON.stringify(obj));
@@ -47,6 +121,31 @@ function rankDisplay(rank) {
     return map[rank] || String(rank);
 }
 
+// 紧凑牌号（0..53）：普通牌 (rank-3)*4 + 花色序号（♠♥♦♣），小王 52，大王 53，与后端 card_id 一致
+const CARD_SUITS = ['♠', '♥', '♦', '♣'];
+
+/** 牌号 → 牌对象 {rank, suit} */
+function cardFromId(id) {
+    if (id === 52) return { rank: 16, suit: '🃏' };
+    if (id === 53) return { rank: 17, suit: '🃏' };
+    return { rank: (id >> 2) + 3, suit: CARD_SUITS[id & 3] };
+}
+
+function cardsFromIds(ids) {
+    return ids.map(cardFromId);
+}
+
+/** 牌号排序：点数从大到小，同点数按 ♠♥♦♣（与后端 sort_cards 一致） */
+function sortCardIds(ids) {
+    const rank = id => (id >= 52 ? id - 36 : (id >> 2) + 3);
+    return [...ids].sort((a, b) => rank(b) - rank(a) || (a & 3) - (b & 3));
+}
+
+/** 手牌校验和（与后端 hand_checksum 一致，与顺序无关） */
+function handChecksum(ids) {
+    return ids.reduce((sum, id) => sum + (id + 1) * (id + 131), 0) % 65521;
+}
+
 /** 生成一张正面牌的 HTML */
 function cardHTML(card) {
     const isJokerSmall = card.rank === 16;
@@ -318,6 +417,9 @@ function handleMessage(msg) {
         case 'deal':       onDeal(msg);      break;
         case 'deal_start': onDealStart(msg); break;
         case 'deal_card':  onDealCard(msg);  break;
+        case 'deal_schedule': onDealSchedule(msg); break;
+        case 'clock':      clockOffset = msg.now - Date.now(); break;
+        case 'snapshot':   onSnapshot(msg);  break;
         case 'deal_done':  onDealDone(msg);  break;
         case 'thinking':   onThinking(msg);  break;
         case 'countdown':  onCountdown(msg); break;
@@ -325,6 +427,7 @@ function handleMessage(msg) {
         case 'landlord':   onLandlord(msg);  break;
         case 'play':       onPlay(msg);      break;
         case 'pass':       onPass(msg);      break;
+        case 'commentary': onCommentary(msg); break;
         case 'result':     onResult(msg);    break;
     }
 }
@@ -336,9 +439,82 @@ function handleMessage(msg) {
 // 逐张发牌状态
 const dealState = { hands: [[], [], []], dizhuCards: [] };
 
+// 各玩家当前手牌（牌号列表）：发牌时间线给出初始手牌，之后按 added / 出牌增量维护
+let handIds = [[], [], []];
+let handsHidden = false;  // public 档位：服务端不推送手牌，只按张数显示背面
+let resyncPending = false;
+
+/** 手牌校验和与服务端不符（漏消息或增量漂移）时请求一次 snapshot */
+function verifyHand(pid, checksum) {
+    if (checksum === undefined || handChecksum(handIds[pid]) === checksum || resyncPending) return;
+    console.warn(`[WS] 玩家 ${pid} 手牌校验失败，请求快照`);
+    resyncPending = true;
+    send({ action: 'snapshot' });
+}
+
+/** 按牌号渲染手牌（空手牌时清空）；手牌不可见时按 size 显示背面 */
+function renderHandIds(pid, size) {
+    if (handsHidden) {
+        renderHandBacks(pid, size || 0);
+        updateCount(pid, size || 0);
+        return;
+    }
+    renderHandCards(pid, cardsFromIds(handIds[pid]));
+    updateCount(pid, handIds[pid].length);
+}
+
+const PHASE_TEXT = { dealing: '发牌中', bidding: '叫地主阶段', playing: '出牌阶段', finished: '对局结束' };
+
+/** 中途加入 / 无法续传时：按服务端当前局面整体重绘（不播放动画与音效） */
+function onSnapshot(msg) {
+    roomEpoch = msg.epoch;
+    resyncPending = false;
+    const st = msg.state;
+    updateScoreboard(st.total_scores);
+    if (st.phase === 'idle') return;
+
+    onDealStart({ players: st.players, game_count: st.game_count, total_scores: st.total_scores });
+    $('phase-text').textContent = PHASE_TEXT[st.phase] || '';
+    st.players.forEach(p => {
+        setRole(p.id, p.role);
+        handsHidden = p.hand === undefined;
+        handIds[p.id] = handsHidden ? [] : [...p.hand];
+        renderHandIds(p.id, p.hand_size);
+    });
+    if (st.dizhu_revealed) {
+        $('dizhu-cards-list').innerHTML = cardsFromIds(st.dizhu_cards).map(c => dizhuFlipCardHTML(c)).join('');
+        $('dizhu-cards-list').querySelectorAll('.dizhu-flip-card').forEach(el => el.classList.add('flipped'));
+    } else {
+        onDealDone({ players: st.players, dizhu_cards: st.dizhu_cards });
+        $('phase-text').textContent = PHASE_TEXT[st.phase] || '';
+    }
+    if (st.highest_bid) {
+        $('multiplier-text').textContent = `倍数: ${st.highest_bid * (2 ** st.bomb_count)}`;
+    }
+    st.history.forEach(([pid, handType, cards]) =>
+        addHistoryItem(pid, handType, cards && cardsFromIds(cards), cards === null));
+    st.actions.forEach(a => {
+        const strategy = a.strategy ? `<div class="strategy-text">${a.strategy}</div>` : '';
+        let html;
+        if (a.type === 'play') {
+            const label = a.hand_type ? `<div class="hand-type-label">${a.hand_type}</div>` : '';
+            html = label + cardsFromIds(a.cards).map(c => cardHTML(c)).join('') + strategy;
+        } else if (a.type === 'bid') {
+            html = `<span class="action-text">${a.bid > 0 ? `叫 ${a.bid} 分` : '不叫'}</span>${strategy}`;
+        } else {
+            html = `<span class="action-text">不出</span>${strategy}`;
+        }
+        setAction(a.player_id, html);
+        actionSeq[a.player_id] = a.seq;
+    });
+    if (st.thinking) onThinking(st.thinking);
+    if (st.result) onResult(st.result);
+}
+
 /** 发牌开始：初始化界面 */
 function onDealStart(msg) {
     clearRestartCountdown();  // 清除结算倒计时，防止 timer 叠加
+    $('start-overlay').style.display = 'none';  // 中途加入或自动连播时由服务端开局
     $('phase-text').textContent = '发牌中';
     $('multiplier-text').textContent = '';
     $('result-modal').style.display = 'none';
@@ -346,6 +522,7 @@ function onDealStart(msg) {
     $('dizhu-cards-list').innerHTML = '';
     dealState.hands = [[], [], []];
     dealState.dizhuCards = [];
+    handIds = [[], [], []];
 
     // 更新局数和积分排行
     if (msg.game_count) {
@@ -379,22 +556,45 @@ function onDealCard(msg) {
     updateCount(pid, dealState.hands[pid].length);
 }
 
+// 发牌时间线中尚未触发的逐张发牌 timer
+let dealTimers = [];
+
+/** 发牌时间线：按服务端给出的起始时刻与间隔本地逐张播放（0,1,2,0,1,2… 轮流发） */
+function onDealSchedule(msg) {
+    dealTimers.forEach(clearTimeout);
+    dealTimers = [];
+    handsHidden = !msg.hands;
+    handIds = handsHidden ? [[], [], []] : msg.hands.map(h => [...h]);
+    const sizes = handsHidden ? msg.sizes : msg.hands.map(h => h.length);
+    const dealt = [0, 0, 0];
+    const total = sizes.reduce((n, k) => n + k, 0);
+    for (let idx = 0; idx < total; idx++) {
+        const pid = idx % 3;
+        const slot = Math.floor(idx / 3);
+        if (slot >= sizes[pid]) continue;
+        const delay = msg.start + idx * msg.interval - serverNow();
+        const deal = handsHidden
+            ? () => { sfxDealCard(); flyCardToHand(pid); renderHandIds(pid, ++dealt[pid]); }
+            : () => onDealCard({ player_id: pid, card: cardFromId(msg.hands[pid][slot]) });
+        if (delay <= 0) deal();
+        else dealTimers.push(setTimeout(deal, delay));
+    }
+}
+
 /** 发牌完成：显示完整手牌，底牌显示背面 */
 function onDealDone(msg) {
+    dealTimers.forEach(clearTimeout);
+    dealTimers = [];
     $('phase-text').textContent = '叫地主阶段';
     msg.players.forEach(p => {
-        if (p.hand && p.hand.length > 0) {
-            renderHandCards(p.id, p.hand);
-        }
-        updateCount(p.id, p.hand_size);
+        renderHandIds(p.id, p.hand_size);
+        verifyHand(p.id, p.checksum);
     });
-    // 底牌先显示背面（等地主确定时翻转）
-    if (msg.dizhu_cards) {
-        dealState.dizhuCards = msg.dizhu_cards;
-        $('dizhu-cards-list').innerHTML = msg.dizhu_cards.map(() =>
-            `<span class="card-back" style="width:42px;height:60px;margin:0"></span>`
-        ).join('');
-    }
+    // 底牌先显示背面（等地主确定时翻转；public 档位不含底牌，固定 3 张背面）
+    dealState.dizhuCards = msg.dizhu_cards || [];
+    $('dizhu-cards-list').innerHTML = Array.from({ length: 3 }, () =>
+        `<span class="card-back" style="width:42px;height:60px;margin:0"></span>`
+    ).join('');
 }
 
 /** AI 开始思考：显示倒计时 */
@@ -409,6 +609,21 @@ function onThinking(msg) {
         `</div>`,
         'anim-fade'
     );
+    if (msg.until !== undefined) runThinkingTimeline(pid, msg);
+}
+
+/** 按时间线本地倒计时：显示的秒数按 total 等比换算（快节奏下倒计时同样加速），元素被替换即停止 */
+function runThinkingTimeline(pid, msg) {
+    const span = Math.max(msg.until - msg.start, 1);
+    const el = $(`cd-${pid}`);
+    const tick = () => {
+        if (!el || !el.isConnected) return;
+        const left = Math.max(msg.until - serverNow(), 0);
+        const remaining = Math.ceil(msg.total * left / span);
+        onCountdown({ player_id: pid, remaining });
+        if (left > 0) setTimeout(tick, Math.min(250, left));
+    };
+    tick();
 }
 
 /** 倒计时更新 */
@@ -475,8 +690,8 @@ function sleep(ms) {
 //  结算倒计时（自动再来一局）
 // ============================================================
 
-/** 启动结算倒计时，countdown 秒后自动开始下一局 */
-function startRestartCountdown(seconds) {
+/** 启动结算倒计时，countdown 秒后自动开始下一局（serverDriven: 服务端自动连播，只显示倒计时不发 start） */
+function startRestartCountdown(seconds, serverDriven = false) {
     clearRestartCountdown();
     let remaining = seconds;
     const btn = $('btn-restart');
@@ -486,8 +701,10 @@ function startRestartCountdown(seconds) {
         remaining--;
         if (remaining <= 0) {
             clearRestartCountdown();
-            $('result-modal').style.display = 'none';
-            send({ action: 'start' });
+            if (!serverDriven) {
+                $('result-modal').style.display = 'none';
+                send({ action: 'start' });
+            }
         } else {
             btn.textContent = `再来一局 (${remaining}s)`;
         }
@@ -506,6 +723,7 @@ function clearRestartCountdown() {
 
 /** 叫地主 */
 function onBid(msg) {
+    actionSeq[msg.player_id] = msg.seq;
     $('phase-text').textContent = '叫地主阶段';
     highlightSeat(msg.player_id);
     const bidText = msg.bid > 0 ? `叫 ${msg.bid} 分` : '不叫';
@@ -523,35 +741,34 @@ async function onLandlord(msg) {
     clearAllActions();
     highlightSeat(null);
 
-    // 设置角色标签 + 更新手牌（正面显示）
+    // 底牌并入地主手牌（增量），设置角色标签 + 更新手牌（正面显示）
+    const lord = msg.player_id;
+    handIds[lord] = sortCardIds(handIds[lord].concat(msg.added || []));
     msg.players.forEach(p => {
         setRole(p.id, p.role);
-        if (p.hand && p.hand.length > 0) {
-            renderHandCards(p.id, p.hand);
-        } else {
-            renderHandBacks(p.id, p.hand_size);
-        }
-        updateCount(p.id, p.hand_size);
+        renderHandIds(p.id, p.hand_size);
+        verifyHand(p.id, p.checksum);
     });
 
     // 底牌翻转动画
-    await flipDizhuCards(msg.dizhu_cards);
+    await flipDizhuCards(cardsFromIds(msg.dizhu_cards));
 }
 
 /** 出牌 */
 function onPlay(msg) {
-    highlightSeat(msg.player_id);
-    updateCount(msg.player_id, msg.hand_size);
+    const pid = msg.player_id;
+    actionSeq[pid] = msg.seq;
+    highlightSeat(pid);
 
-    // 用正面牌显示剩余手牌（观众视角）
-    if (msg.hand && msg.hand.length > 0) {
-        renderHandCards(msg.player_id, msg.hand);
-    } else {
-        renderHandBacks(msg.player_id, msg.hand_size);
-    }
+    // 从手牌中移除打出的牌（增量），用正面牌显示剩余手牌（观众视角）
+    const removed = new Set(msg.cards);
+    handIds[pid] = handIds[pid].filter(id => !removed.has(id));
+    renderHandIds(pid, msg.hand_size);
+    verifyHand(pid, msg.checksum);
 
     // 构建出牌卡片 HTML
-    const cardsHtml = msg.cards.map(c => cardHTML(c)).join('');
+    const cards = cardsFromIds(msg.cards);
+    const cardsHtml = cards.map(c => cardHTML(c)).join('');
     const label = msg.hand_type ? `<div class="hand-type-label">${msg.hand_type}</div>` : '';
     const strategy = msg.strategy ? `<div class="strategy-text">${msg.strategy}</div>` : '';
 
@@ -577,11 +794,12 @@ function onPlay(msg) {
     }
 
     // 添加出牌历史记录
-    addHistoryItem(msg.player_id, msg.hand_type, msg.cards, false);
+    addHistoryItem(msg.player_id, msg.hand_type, cards, false);
 }
 
 /** 不出 */
 function onPass(msg) {
+    actionSeq[msg.player_id] = msg.seq;
     highlightSeat(msg.player_id);
     sfxPass();
     const strategy = msg.strategy ? `<div class="strategy-text">${msg.strategy}</div>` : '';
@@ -594,6 +812,17 @@ function onPass(msg) {
     addHistoryItem(msg.player_id, null, null, true);
 }
 
+/** LLM 解说补发：替换即时占位解说（玩家已进入下一轮思考时忽略） */
+function onCommentary(msg) {
+    // 解说所属的动作之后该座位已有新动作：不覆盖新动作的策略文字
+    if (msg.action_seq !== undefined && actionSeq[msg.player_id] !== msg.action_seq) return;
+    const el = $(`action-${msg.player_id}`);
+    const strategyEl = el && el.querySelector('.strategy-text');
+    if (strategyEl && msg.strategy) {
+        strategyEl.textContent = msg.strategy;
+    }
+}
+
 /** 结算 */
 function onResult(msg) {
     $('phase-text').textContent = '对局结束';
@@ -637,8 +866,12 @@ function onResult(msg) {
     // 显示弹窗
     $('result-modal').style.display = 'flex';
 
-    // 自动倒计时 10 秒后开始下一局
-    startRestartCountdown(10);
+    // 自动倒计时后开始下一局（服务端自动连播时由服务端按 auto_next 秒开局）
+    if (msg.auto_next != null) {
+        startRestartCountdown(Math.max(1, Math.round(msg.auto_next)), true);
+    } else {
+        startRestartCountdown(10);
+    }
 }
 
 // ============================================================
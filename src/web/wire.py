@@ -0,0 +1,183 @@
+"""线上编码 - 消息只编码一次、所有连接共享；JSON 走复用的紧凑编码器，二进制走内置的 MessagePack 子集
+
+- JSON：复用同一个 JSONEncoder（json.dumps 带参数时每次都新建编码器），紧凑分隔符
+- MessagePack：按连接协商（?format=msgpack），牌号等小整数各占 1 字节；
+  玩家名、牌型名、消息键等高频字符串预编码为片段直接拼接，不再逐次编码
+- 无第三方依赖：只实现消息用到的类型（nil / bool / int / float / str / array / map）
+"""
+
+import json
+import struct
+from typing import Any, Dict, Iterable, Optional
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+WIRE_FORMATS = (FORMAT_JSON, FORMAT_MSGPACK)
+
+_JSON = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+
+def encode_json(msg: Any) -> str:
+    return _JSON.encode(msg)
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """客户端请求的编码，不支持时退回 JSON"""
+    return requested if requested in WIRE_FORMATS else FORMAT_JSON
+
+
+# 预编码的字符串片段（消息键、玩家名、牌型名等）；运行中遇到的短字符串也会缓存，数量有上限
+_FRAGMENTS: Dict[str, bytes] = {}
+MAX_FRAGMENTS = 4096
+FRAGMENT_MAX_LEN = 32
+
+# 小整数（含全部牌号）的编码表
+_SMALL_INTS = [bytes([i]) for i in range(128)]
+
+
+def _pack_str(s: str) -> bytes:
+    raw = s.encode("utf-8")
+    n = len(raw)
+    if n < 32:
+        return bytes([0xA0 | n]) + raw
+    if n < 0x100:
+        return b"\xd9" + bytes([n]) + raw
+    if n < 0x10000:
+        return b"\xda" + struct.pack(">H", n) + raw
+    return b"\xdb" + struct.pack(">I", n) + raw
+
+
+def precompile(strings: Iterable[str]) -> None:
+    """预编码一批高频字符串"""
+    for s in strings:
+        _FRAGMENTS[s] = _pack_str(s)
+
+
+def _str_fragment(s: str) -> bytes:
+    frag = _FRAGMENTS.get(s)
+    if frag is None:
+        frag = _pack_str(s)
+        if len(s) <= FRAGMENT_MAX_LEN and len(_FRAGMENTS) < MAX_FRAGMENTS:
+            _FRAGMENTS[s] = frag
+    return frag
+
+
+def _pack_int(n: int) -> bytes:
+    if 0 <= n < 128:
+        return _SMALL_INTS[n]
+    if -32 <= n < 0:
+        return struct.pack("b", n)
+    if 0 <= n < 0x100:
+        return b"\xcc" + bytes([n])
+    if 0 <= n < 0x10000:
+        return b"\xcd" + struct.pack(">H", n)
+    if 0 <= n < 0x100000000:
+        return b"\xce" + struct.pack(">I", n)
+    if n >= 0:
+        return b"\xcf" + struct.pack(">Q", n)
+    if n >= -0x80:
+        return b"\xd0" + struct.pack(">b", n)
+    if n >= -0x8000:
+        return b"\xd1" + struct.pack(">h", n)
+    if n >= -0x80000000:
+        return b"\xd2" + struct.pack(">i", n)
+    return b"\xd3" + struct.pack(">q", n)
+
+
+def _pack_into(obj: Any, out: list) -> None:
+    if obj is None:
+        out.append(b"\xc0")
+    elif obj is True:
+        out.append(b"\xc3")
+    elif obj is False:
+        out.append(b"\xc2")
+    elif isinstance(obj, int):
+        out.append(_pack_int(obj))
+    elif isinstance(obj, str):
+        out.append(_str_fragment(obj))
+    elif isinstance(obj, float):
+        out.append(b"\xcb" + struct.pack(">d", obj))
+    elif isinstance(obj, dict):
+        n = len(obj)
+        out.append(bytes([0x80 | n]) if n < 16 else b"\xde" + struct.pack(">H", n))
+        for k, v in obj.items():
+            out.append(_str_fragment(str(k)))
+            _pack_into(v, out)
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        out.append(bytes([0x90 | n]) if n < 16 else b"\xdc" + struct.pack(">H", n))
+        for v in obj:
+            _pack_into(v, out)
+    else:
+        raise TypeError(f"无法编码的类型: {type(obj).__name__}")
+
+
+def pack(obj: Any) -> bytes:
+    """按 MessagePack 编码（map / array 不超过 65535 项）"""
+    out: list = []
+    _pack_into(obj, out)
+    return b"".join(out)
+
+
+def unpack(data: bytes) -> Any:
+    """MessagePack 解码（与 pack 支持的类型对应，供测试与工具使用）"""
+    value, _ = _unpack(memoryview(data), 0)
+    return value
+
+
+def _unpack(buf: memoryview, i: int):
+    b = buf[i]
+    i += 1
+    if b < 0x80:
+        return b, i
+    if b >= 0xE0:
+        return b - 0x100, i
+    if 0xA0 <= b <= 0xBF:
+        n = b & 0x1F
+        return bytes(buf[i:i + n]).decode("utf-8"), i + n
+    if 0x90 <= b <= 0x9F:
+        return _unpack_array(buf, i, b & 0x0F)
+    if 0x80 <= b <= 0x8F:
+        return _unpack_map(buf, i, b & 0x0F)
+    if b == 0xC0:
+        return None, i
+    if b in (0xC2, 0xC3):
+        return b == 0xC3, i
+    if b == 0xCB:
+        return struct.unpack_from(">d", buf, i)[0], i + 8
+    if b in _FIXED_INTS:
+        fmt, size = _FIXED_INTS[b]
+        return struct.unpack_from(fmt, buf, i)[0], i + size
+    if b in (0xD9, 0xDA, 0xDB):
+        fmt, size = {0xD9: (">B", 1), 0xDA: (">H", 2), 0xDB: (">I", 4)}[b]
+        n = struct.unpack_from(fmt, buf, i)[0]
+        i += size
+        return bytes(buf[i:i + n]).decode("utf-8"), i + n
+    if b == 0xDC:
+        return _unpack_array(buf, i + 2, struct.unpack_from(">H", buf, i)[0])
+    if b == 0xDE:
+        return _unpack_map(buf, i + 2, struct.unpack_from(">H", buf, i)[0])
+    raise ValueError(f"不支持的 MessagePack 类型字节: 0x{b:02x}")
+
+
+_FIXED_INTS = {
+    0xCC: (">B", 1), 0xCD: (">H", 2), 0xCE: (">I", 4), 0xCF: (">Q", 8),
+    0xD0: (">b", 1), 0xD1: (">h", 2), 0xD2: (">i", 4), 0xD3: (">q", 8),
+}
+
+
+def _unpack_array(buf: memoryview, i: int, n: int):
+    items = []
+    for _ in range(n):
+        v, i = _unpack(buf, i)
+        items.append(v)
+    return items, i
+
+
+def _unpack_map(buf: memoryview, i: int, n: int):
+    result = {}
+    for _ in range(n):
+        k, i = _unpack(buf, i)
+        v, i = _unpack(buf, i)
+        result[k] = v
+    return result, i
@@ -0,0 +1,38 @@
+"""测试公用工具：模拟 WebSocket 与异步条件等待"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+
+class FakeWebSocket:
+    """模拟 WebSocket：记录收到的文本帧；每条 send_text 耗时 delay 秒，blocked 时发送永不返回"""
+
+    def __init__(self, delay: float = 0.0, blocked: bool = False):
+        self.delay = delay
+        self.blocked = blocked
+        self.raw: List[str] = []
+        self.closed_code: Optional[int] = None
+
+    @property
+    def sent(self) -> List[dict]:
+        return [json.loads(d) for d in self.raw]
+
+    async def send_text(self, data: str) -> None:
+        if self.blocked:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.raw.append(data)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_code = code
+
+
+async def until(predicate, timeout: float = 5.0) -> None:
+    """轮询等待 predicate() 成立，超时则断言失败"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "等待超时"
+        await asyncio.sleep(0.001)
@@ -0,0 +1,87 @@
+"""LLM 客户端池单元测试（不访问网络）"""
+
+import asyncio
+import pytest
+
+from src.ai.client_pool import (
+    ClientRegistry, PriorityLimiter, request_priority, current_priority,
+    PRIORITY_TURN, PRIORITY_SPECULATIVE, PRIORITY_COMMENTARY,
+)
+from src.ai.llm_ai import LlmAI
+
+
+class TestClientRegistry:
+
+    def test_same_endpoint_shared(self):
+        registry = ClientRegistry(max_connections=4)
+        a = registry.get("https://api.example.com/v1", "k")
+        b = registry.get("https://api.example.com/v1/", "k")
+        c = registry.get("https://api.example.com/v1", "other")
+        assert a is b
+        assert a is not c
+        assert len(registry) == 2
+
+    def test_llm_players_share_client(self):
+        registry = ClientRegistry()
+        p1 = LlmAI("A", api_key="k", base_url="https://x/v1", registry=registry)
+        p2 = LlmAI("B", api_key="k", base_url="https://x/v1", registry=registry)
+        assert p1.routes[0].client is p2.routes[0].client
+        assert len(registry) == 1
+
+    @pytest.mark.asyncio
+    async def test_request_stats(self):
+        registry = ClientRegistry()
+        ep = registry.get("https://x/v1", "k")
+        async with ep.request():
+            pass
+        snap = registry.snapshot()[0]
+        assert snap["requests"] == 1
+        assert snap["first_call_ms"] is not None
+        assert "k" not in snap.values()
+
+
+class TestPriorityLimiter:
+
+    @pytest.mark.asyncio
+    async def test_turn_served_before_background(self):
+        limiter = PriorityLimiter(1)
+        order = []
+
+        async def worker(name, priority):
+            async with limiter.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await limiter.acquire(PRIORITY_TURN)  # 占满
+        tasks = [
+            asyncio.ensure_future(worker("commentary", PRIORITY_COMMENTARY)),
+            asyncio.ensure_future(worker("speculative", PRIORITY_SPECULATIVE)),
+            asyncio.ensure_future(worker("turn", PRIORITY_TURN)),
+        ]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == ["turn", "speculative", "commentary"]
+        assert limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_releases(self):
+        limiter = PriorityLimiter(1)
+        await limiter.acquire(PRIORITY_TURN)
+        waiter = asyncio.ensure_future(limiter.acquire(PRIORITY_TURN))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        limiter.release()
+        assert limiter.active == 0
+        assert limiter.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_priority_inherited_by_task(self):
+        async def probe():
+            return current_priority()
+
+        with request_priority(PRIORITY_SPECULATIVE):
+            task = asyncio.ensure_future(probe())
+        assert current_priority() == PRIORITY_TURN
+        assert await task == PRIORITY_SPECULATIVE
@@ -0,0 +1,114 @@
+"""LLM 决策缓存单元测试"""
+
+import asyncio
+import time
+import pytest
+from typing import List
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_detector import detect_hand
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.decision_cache import DecisionCache
+
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+def _make_state(hand: List[Card]) -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = list(hand)
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    players[1].hand = [_c(Rank.FOUR)] * 17
+    players[2].hand = [_c(Rank.FIVE)] * 17
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+class TestDecisionCache:
+
+    def test_hit_is_suit_abstracted(self):
+        cache = DecisionCache()
+        s1 = _make_state([_c(Rank.THREE, Suit.HEART), _c(Rank.NINE)])
+        cache.store("A", "m", s1.players[0], s1, [_c(Rank.THREE, Suit.HEART)], "小牌")
+
+        s2 = _make_state([_c(Rank.THREE, Suit.CLUB), _c(Rank.NINE, Suit.DIAMOND)])
+        cards, strategy = cache.lookup("A", "m", s2.players[0], s2)
+        assert cards == [_c(Rank.THREE, Suit.CLUB)]
+        assert strategy == "小牌"
+        assert cache.stats["A"].hits == 1
+
+    def test_keyed_by_persona_and_model(self):
+        cache = DecisionCache()
+        s = _make_state([_c(Rank.THREE), _c(Rank.NINE)])
+        cache.store("A", "m", s.players[0], s, [_c(Rank.THREE)], "")
+        assert cache.lookup("B", "m", s.players[0], s) is None
+        assert cache.lookup("A", "other", s.players[0], s) is None
+        assert cache.stats["B"].misses == 1
+
+    def test_pass_decision(self):
+        cache = DecisionCache()
+        s = _make_state([_c(Rank.THREE)])
+        s.last_play = detect_hand([_c(Rank.KING)])
+        s.last_player = 1
+        cache.store("A", "m", s.players[0], s, None, "忍")
+        assert cache.lookup("A", "m", s.players[0], s) == (None, "忍")
+
+    def test_persisted_across_instances(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        s = _make_state([_c(Rank.THREE), _c(Rank.NINE)])
+        cache = DecisionCache(path=path)
+        cache.store("A", "m", s.players[0], s, [_c(Rank.NINE)], "大")
+        cache.close()
+
+        reopened = DecisionCache(path=path)
+        cards, _ = reopened.lookup("A", "m", s.players[0], s)
+        assert cards == [_c(Rank.NINE)]
+
+    @pytest.mark.asyncio
+    async def test_writes_batched_on_event_loop(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = DecisionCache(path=path, flush_interval=0.05)
+        for i, rank in enumerate((Rank.THREE, Rank.FOUR, Rank.FIVE)):
+            s = _make_state([_c(rank), _c(Rank.NINE)])
+            cache.store("A", "m", s.players[0], s, [_c(rank)], str(i))
+        # 决策路径上不落盘，到期后一次事务写入
+        count = lambda: cache._db.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        assert count() == 0
+        await asyncio.sleep(0.1)
+        assert count() == 3
+        cache.close()
+
+    def test_lru_eviction(self):
+        cache = DecisionCache(max_entries=2)
+        states = [_make_state([_c(r)]) for r in (Rank.THREE, Rank.FOUR, Rank.FIVE)]
+        for s in states:
+            cache.store("A", "m", s.players[0], s, list(s.players[0].hand), "")
+        assert len(cache) == 2
+        assert cache.lookup("A", "m", states[0].players[0], states[0]) is None
+
+    def test_ttl_expiry(self):
+        cache = DecisionCache(ttl=0.01)
+        s = _make_state([_c(Rank.THREE)])
+        cache.store("A", "m", s.players[0], s, [_c(Rank.THREE)], "")
+        time.sleep(0.02)
+        assert cache.lookup("A", "m", s.players[0], s) is None
+
+    def test_sample_rate_zero_bypasses(self):
+        cache = DecisionCache(sample_rate=0.0)
+        s = _make_state([_c(Rank.THREE)])
+        cache.store("A", "m", s.players[0], s, [_c(Rank.THREE)], "")
+        assert cache.lookup("A", "m", s.players[0], s) is None
+        assert cache.stats["A"].bypassed == 1
+
+    def test_hit_latency_sub_millisecond(self):
+        cache = DecisionCache()
+        hand = [_c(r) for r in list(Rank)[:13]]
+        s = _make_state(hand)
+        cache.store("A", "m", s.players[0], s, [hand[0]], "")
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.lookup("A", "m", s.players[0], s)
+        assert (time.perf_counter() - start) / 100 < 0.001
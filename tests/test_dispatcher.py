@@ -0,0 +1,203 @@
+"""请求调度单元测试：聚合窗口、优先级、相同请求合并与速率预算（不访问网络）"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from src.ai.dispatcher import Dispatcher, RateBudget, rate_limit_pause
+
+
+@asynccontextmanager
+async def _free_slot(priority: int):
+    yield
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestRateBudget:
+
+    def test_unlimited_never_waits(self):
+        budget = RateBudget()
+        assert not budget.limited
+        assert budget.delay(10_000) == 0.0
+
+    def test_rpm_exhausted_waits(self):
+        budget = RateBudget(rpm=2)
+
+        async def main():
+            await budget.acquire(0)
+            await budget.acquire(0)
+
+        _run(main())
+        assert budget.delay(0) > 0
+        assert budget.throttled == 0
+
+    def test_tpm_charges_tokens(self):
+        budget = RateBudget(tpm=1000)
+        _run(budget.acquire(900))
+        assert budget.delay(50) == 0.0
+        assert budget.delay(500) > 0
+
+    def test_pause_blocks(self):
+        budget = RateBudget(rpm=100)
+        budget.pause(5.0)
+        assert budget.delay(0) > 4.0
+        assert budget.rate_limited == 1
+
+
+class TestRateLimitPause:
+
+    def test_non_429_is_none(self):
+        assert rate_limit_pause(ValueError("x")) is None
+
+    def test_retry_after_header(self):
+        exc = Exception("429")
+        exc.status_code = 429
+        exc.response = SimpleNamespace(headers={"retry-after": "3"})
+        assert rate_limit_pause(exc) == 3.0
+
+    def test_missing_header_uses_default(self):
+        exc = Exception("429")
+        exc.status_code = 429
+        exc.response = None
+        assert rate_limit_pause(exc) == 1.0
+
+
+class TestDispatcher:
+
+    def test_results_routed_to_callers(self):
+        dispatcher = Dispatcher(_free_slot, window=0.005)
+
+        def make(value):
+            async def call():
+                await asyncio.sleep(0)
+                return value
+            return call
+
+        async def main():
+            return await asyncio.gather(*(
+                dispatcher.submit(make(i), priority=0) for i in range(5)
+            ))
+
+        assert _run(main()) == [0, 1, 2, 3, 4]
+        assert dispatcher.stats.dispatched == 5
+        assert dispatcher.stats.flushes == 1
+
+    def test_window_orders_by_priority(self):
+        dispatcher = Dispatcher(_free_slot, window=0.005)
+        order: List[str] = []
+
+        def make(name):
+            async def call():
+                order.append(name)
+                return name
+            return call
+
+        async def main():
+            await asyncio.gather(
+                dispatcher.submit(make("commentary"), priority=2),
+                dispatcher.submit(make("speculative"), priority=1),
+                dispatcher.submit(make("turn"), priority=0),
+            )
+
+        _run(main())
+        assert order == ["turn", "speculative", "commentary"]
+
+    def test_max_batch_splits_flushes(self):
+        dispatcher = Dispatcher(_free_slot, window=0.001, max_batch=2)
+
+        async def call():
+            return 1
+
+        async def main():
+            await asyncio.gather(*(dispatcher.submit(call, 0) for _ in range(5)))
+
+        _run(main())
+        assert dispatcher.stats.flushes == 3
+        assert dispatcher.stats.dispatched == 5
+
+    def test_same_key_coalesced(self):
+        dispatcher = Dispatcher(_free_slot)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "move"
+
+        async def main():
+            return await asyncio.gather(*(
+                dispatcher.submit(call, 0, key="same") for _ in range(3)
+            ))
+
+        assert _run(main()) == ["move"] * 3
+        assert calls == 1
+        assert dispatcher.stats.coalesced == 2
+
+    def test_none_key_not_coalesced(self):
+        dispatcher = Dispatcher(_free_slot)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        async def main():
+            await asyncio.gather(*(dispatcher.submit(call, 0) for _ in range(3)))
+
+        _run(main())
+        assert calls == 3
+
+    def test_exception_propagates_and_429_pauses_budget(self):
+        budget = RateBudget(rpm=600)
+        dispatcher = Dispatcher(_free_slot, budget)
+
+        async def call():
+            exc = Exception("rate limited")
+            exc.status_code = 429
+            exc.response = SimpleNamespace(headers={"retry-after": "2"})
+            raise exc
+
+        with pytest.raises(Exception, match="rate limited"):
+            _run(dispatcher.submit(call, 0))
+        assert budget.rate_limited == 1
+        assert budget.delay(0) > 1.0
+
+    def test_cancelled_waiter_drops_queued_request(self):
+        dispatcher = Dispatcher(_free_slot, window=0.02)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+
+        async def main():
+            task = asyncio.ensure_future(dispatcher.submit(call, 0, key="k"))
+            await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.03)
+
+        _run(main())
+        assert calls == 0
+        assert dispatcher.stats.dropped == 1
+
+    def test_budget_throttles_dispatch(self):
+        budget = RateBudget(rpm=1200)   # 每 50ms 补充一个请求
+        budget._requests = 0.0
+        dispatcher = Dispatcher(_free_slot, budget)
+
+        async def call():
+            return True
+
+        _run(dispatcher.submit(call, 0))
+        assert budget.throttled == 1
+        assert budget.wait_ms >= 30
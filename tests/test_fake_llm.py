@@ -0,0 +1,129 @@
+"""本地 LLM 替身服务单元测试（进程内传输，不访问网络）"""
+
+import asyncio
+import httpx
+import pytest
+from typing import List
+
+from src.engine.card import Card, Rank, Suit
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.engine.hand_detector import detect_hand
+from src.ai.client_pool import ClientRegistry
+from src.ai.latency import HEDGE_OFF, HedgePolicy, LatencyRegistry
+from src.ai.routing import BreakerRegistry
+from src.ai.llm_ai import (
+    LlmAI, PROMPT_COMPACT, PROMPT_INDEXED, _build_play_prompt, _build_bid_prompt,
+)
+from src.ai.metrics import decision_stats
+from benchmarks.fake_llm import (
+    FAKE_BASE_URL, FakeLLM, FakeLLMConfig, ILLEGAL, MALFORMED,
+)
+
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+def _make_state(hand: List[Card]) -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = list(hand)
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    players[1].hand = [_c(Rank.FOUR)] * 5
+    players[2].hand = [_c(Rank.FIVE)] * 5
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+def _make_ai(fake: FakeLLM, **kwargs) -> LlmAI:
+    return LlmAI(
+        "烈焰哥🔥", api_key="fake", base_url=FAKE_BASE_URL,
+        registry=ClientRegistry(transport=fake.transport()),
+        latency=LatencyRegistry(), breakers=BreakerRegistry(), **kwargs,
+    )
+
+
+HAND = [_c(Rank.THREE), _c(Rank.SEVEN), _c(Rank.SEVEN, Suit.HEART), _c(Rank.KING)]
+
+
+# ============================================================
+#  应答内容
+# ============================================================
+
+class TestReply:
+
+    def test_follow_play_beats_last(self):
+        state = _make_state(HAND)
+        state.last_play = detect_hand([_c(Rank.FIVE), _c(Rank.FIVE, Suit.HEART)])
+        state.last_player = 1
+        prompt = _build_play_prompt(state.players[0], state, "烈焰哥🔥")
+        raw = FakeLLM().reply([{"role": "user", "content": prompt}])
+        assert '"cards": ["♠7", "♥7"]' in raw
+
+    def test_bid_respects_highest(self):
+        state = _make_state([_c(Rank.THREE)] * 17)
+        state.highest_bid = 3
+        prompt = _build_bid_prompt(state.players[0], state, "烈焰哥🔥")
+        assert '"bid": 0' in FakeLLM().reply([{"role": "user", "content": prompt}])
+
+    def test_injected_behaviours(self):
+        state = _make_state(HAND)
+        messages = [{"role": "user", "content": _build_play_prompt(state.players[0], state, "x")}]
+        fake = FakeLLM()
+        assert '"cards": [' in fake.reply(messages, MALFORMED)
+        assert '"cards": ["♠3", "♠K"]' in fake.reply(messages, ILLEGAL)
+
+    def test_behaviour_rates_are_seeded(self):
+        cfg = FakeLLMConfig(malformed_rate=0.3, illegal_rate=0.3)
+        fa, fb = FakeLLM(cfg, seed=5), FakeLLM(cfg, seed=5)
+        seq = [fa.pick_behaviour(cfg) for _ in range(50)]
+        assert seq == [fb.pick_behaviour(cfg) for _ in range(50)]
+        assert {MALFORMED, ILLEGAL, "valid"} == set(seq)
+
+
+# ============================================================
+#  端到端（LlmAI → 进程内传输 → 替身服务）
+# ============================================================
+
+class TestEndToEnd:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kwargs", [
+        {},
+        {"prompt_encoding": PROMPT_COMPACT},
+        {"prompt_mode": PROMPT_INDEXED},
+        {"stream": True},
+    ])
+    async def test_valid_answers_are_accepted(self, kwargs):
+        fake = FakeLLM(FakeLLMConfig(latency_ms=1, latency_sigma=0, stream_chunk_ms=1))
+        ai = _make_ai(fake, **kwargs)
+        state = _make_state(HAND)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.THREE)]
+        assert fake.stats.behaviours["valid"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hang_times_out_to_fallback(self):
+        fake = FakeLLM(FakeLLMConfig(latency_ms=1, timeout_rate=1.0, hang_seconds=30))
+        ai = _make_ai(fake, hedge=HedgePolicy(mode=HEDGE_OFF, max_timeout=0.1))
+        state = _make_state(HAND)
+        before = decision_stats.get(ai.model, "free").no_response
+        cards, _ = await asyncio.wait_for(ai.async_decide_play(state.players[0], state), 2.0)
+        assert cards == [_c(Rank.THREE)]
+        assert decision_stats.get(ai.model, "free").no_response == before + 1
+        assert ai.routes[0].latency.timeouts == 1
+
+    @pytest.mark.asyncio
+    async def test_error_and_prefix_cache(self):
+        fake = FakeLLM(FakeLLMConfig(latency_ms=1, error_rate=1.0))
+        body = {"model": "m", "messages": [{"role": "system", "content": "固定前缀" * 20},
+                                          {"role": "user", "content": "[叫分] 手牌: 3"}]}
+        async with httpx.AsyncClient(transport=fake.transport(), base_url=FAKE_BASE_URL) as client:
+            resp = await client.post("chat/completions", json=body)
+            assert resp.status_code == 500
+            fake.config.error_rate = 0.0
+            resp = await client.post("chat/completions", json=body)
+            usage = resp.json()["usage"]
+        assert usage["prompt_tokens_details"]["cached_tokens"] == usage["prompt_tokens"]
+        assert fake.stats.behaviours == {"error": 1, "valid": 1}
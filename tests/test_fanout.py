@@ -0,0 +1,225 @@
+"""多进程扇出单元测试：牌桌进程经 Unix 域套接字推送事件，多个 worker 镜像同一房间、本地加入与退订"""
+
+import asyncio
+import json
+import os
+import pytest
+from typing import List
+
+from src.ai import decision_cache, imitation
+from src.ai.decision_cache import DecisionCache
+from src.ai.imitation import DecisionLog, read_log
+from src.ai.llm_ai import LlmAI
+from src.engine.card import Card, Rank, Suit
+from src.game.game_state import GamePhase, GameState
+from src.game.player import Player, Role
+from src.web.fanout import FanoutClient, FanoutServer, encode_packet, read_packet, run_table
+from src.web.outbound import Broadcaster
+from src.web.room import PLAYER_NAMES, Room, RoomManager
+from src.web.scheduler import GameScheduler
+from src.web.server import run_game_async
+from tests.helpers import FakeWebSocket, until
+
+
+def _room(room_id: str) -> Room:
+    return Room(room_id, strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                hub=Broadcaster(max_queue=10000), pace=0.0)
+
+
+def _attach(room: Room) -> None:
+    room.scheduler = GameScheduler(room, run_game_async)
+    room.scheduler.start()
+
+
+def _state() -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = [Card(rank=Rank.THREE, suit=Suit.SPADE), Card(rank=Rank.NINE, suit=Suit.SPADE)]
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+def _client(path: str) -> FanoutClient:
+    return FanoutClient(path, hub_factory=lambda: Broadcaster(max_queue=10000), retry=0.05)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "fanout.sock")
+
+
+class TestPackets:
+
+    @pytest.mark.asyncio
+    async def test_roundtrip(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_packet(b"default\n{}") + encode_packet(b""))
+        reader.feed_eof()
+        assert await read_packet(reader) == b"default\n{}"
+        assert await read_packet(reader) == b""
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_packet(reader)
+
+
+class TestFanout:
+
+    @pytest.mark.asyncio
+    async def test_workers_see_same_room(self, socket_path):
+        rooms = RoomManager(factory=_room, on_create=_attach)
+        server = FanoutServer(rooms, socket_path)
+        await server.start()
+        workers = [_client(socket_path), _client(socket_path)]
+        for w in workers:
+            w.start()
+        try:
+            viewers = []
+            for w in workers:
+                mirror = await w.join("t")
+                ws = FakeWebSocket()
+                mirror.subscribe(ws)
+                viewers.append(ws)
+            # 每个 worker 只占牌桌进程的一个订阅
+            assert len(rooms.get("t").hub) == 2
+            assert server.to_dict()["subscriptions"] == 2
+
+            workers[0].mirrors["t"].request_start()
+            await until(lambda: all(any(m["type"] == "result" for m in ws.sent) for ws in viewers))
+
+            events = [[m for m in ws.sent if m["type"] not in ("clock", "snapshot")] for ws in viewers]
+            assert events[0] == events[1]
+            assert [m["seq"] for m in events[0]] == list(range(1, rooms.get("t").journal.seq + 1))
+
+            # worker 的镜像日志与牌桌进程一致：后加入的观众从本地快照看到同样的局面
+            late = FakeWebSocket()
+            workers[1].mirrors["t"].subscribe(late)
+            await until(lambda: len(late.sent) == 2)
+            assert late.sent[1]["type"] == "snapshot"
+            assert late.sent[1]["epoch"] == rooms.get("t").journal.epoch
+            assert late.sent[1]["state"] == rooms.get("t").journal.state.to_dict()
+        finally:
+            for w in workers:
+                w.close()
+            server.close()
+            rooms.close()
+
+    @pytest.mark.asyncio
+    async def test_last_viewer_unsubscribes_upstream(self, socket_path):
+        rooms = RoomManager(factory=_room, on_create=_attach)
+        server = FanoutServer(rooms, socket_path)
+        await server.start()
+        worker = _client(socket_path)
+        worker.start()
+        try:
+            mirror = await worker.join("u")
+            a, b = FakeWebSocket(), FakeWebSocket()
+            mirror.subscribe(a)
+            mirror.subscribe(b)
+            mirror.unsubscribe(a)
+            assert "u" in worker.mirrors
+            mirror.unsubscribe(b)
+            assert "u" not in worker.mirrors
+            await until(lambda: len(rooms.get("u").hub) == 0)
+            assert rooms.get("u").idle
+
+            with pytest.raises(ValueError):
+                await worker.join("bad room")
+        finally:
+            worker.close()
+            server.close()
+            rooms.close()
+
+    @pytest.mark.asyncio
+    async def test_rejected_subscription(self, socket_path):
+        rooms = RoomManager(factory=_room, max_rooms=0)
+        server = FanoutServer(rooms, socket_path)
+        await server.start()
+        worker = _client(socket_path)
+        worker.start()
+        try:
+            with pytest.raises(LookupError):
+                await worker.join("full")
+            assert "full" not in worker.mirrors
+        finally:
+            worker.close()
+            server.close()
+
+    @pytest.mark.asyncio
+    async def test_join_timeout_drops_mirror(self, socket_path):
+        received: List[dict] = []
+
+        async def silent(reader, writer):
+            # 只接收指令、从不回应的牌桌进程
+            try:
+                while True:
+                    received.append(json.loads(await read_packet(reader)))
+            except asyncio.IncompleteReadError:
+                writer.close()
+
+        table = await asyncio.start_unix_server(silent, path=socket_path)
+        worker = FanoutClient(socket_path, hub_factory=Broadcaster, join_timeout=0.05, retry=0.05)
+        worker.start()
+        try:
+            await until(lambda: worker.connected)
+            with pytest.raises(LookupError):
+                await worker.join("slow")
+            assert "slow" not in worker.mirrors
+            await until(lambda: len(received) == 2)
+            assert [m["op"] for m in received] == ["subscribe", "unsubscribe"]
+        finally:
+            worker.close()
+            table.close()
+
+    @pytest.mark.asyncio
+    async def test_table_flushes_batched_writes_on_exit(self, socket_path, tmp_path, monkeypatch):
+        cache = DecisionCache(str(tmp_path / "cache.db"), flush_interval=3600)
+        log = DecisionLog(str(tmp_path / "decisions.jsonl"), flush_interval=3600)
+        monkeypatch.setattr(decision_cache, "_cache", cache)
+        monkeypatch.setattr(decision_cache, "_cache_created", True)
+        monkeypatch.setattr(imitation, "_log", log)
+        monkeypatch.setattr(imitation, "_created", True)
+
+        table = asyncio.ensure_future(run_table(socket_path))
+        await until(lambda: os.path.exists(socket_path))
+        state = _state()
+        cache.store("P", "m", state.players[0], state, [state.players[0].hand[0]], "走")
+        log.append("P", "m", state.players[0], state, [state.players[0].hand[0]])
+        assert not os.path.exists(log.path)
+
+        table.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await table
+        assert len(read_log(log.path)) == 1
+        reopened = DecisionCache(cache.path)
+        assert len(reopened) == 1
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_reconnect_resumes_from_mirror(self, socket_path):
+        rooms = RoomManager(factory=_room, on_create=_attach)
+        server = FanoutServer(rooms, socket_path)
+        await server.start()
+        worker = _client(socket_path)
+        worker.start()
+        try:
+            mirror = await worker.join("r")
+            ws = FakeWebSocket()
+            mirror.subscribe(ws)
+            await rooms.get("r").run_exclusive(run_game_async)
+            await until(lambda: mirror.journal.seq == rooms.get("r").journal.seq)
+
+            # 牌桌进程断开 worker（如发送跟不上），期间又开了一局
+            for conn in list(server.workers.values()):
+                conn.close()
+            await until(lambda: not worker.connected)
+            await rooms.get("r").run_exclusive(run_game_async)
+            await until(lambda: mirror.journal.seq == rooms.get("r").journal.seq)
+
+            # 重连后只补发漏掉的消息，本地观众收到完整的序号
+            assert rooms.get("r").journal.stats.resumes == 1
+            seqs = [m["seq"] for m in ws.sent if m["type"] != "snapshot" and "seq" in m]
+            assert seqs == list(range(1, rooms.get("r").journal.seq + 1))
+        finally:
+            worker.close()
+            server.close()
+            rooms.close()
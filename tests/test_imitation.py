@@ -0,0 +1,223 @@
+"""人格模仿策略单元测试：日志 → 训练 → 按人格排序出牌（不访问网络）"""
+
+import json
+import random
+import pytest
+from types import SimpleNamespace
+from typing import List, Optional
+
+from src.engine.card import Card, Rank, Suit, create_deck
+from src.engine.hand_detector import detect_hand
+from src.engine.hand_type import PlayedHand
+from src.engine.move_generator import generate_moves
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.encoding import info_set_key, ranks_text
+from src.ai.imitation import (
+    DecisionLog, ImitationAI, ImitationPolicy, Situation, read_log, train_policy,
+)
+from src.ai.client_pool import request_priority, PRIORITY_SPECULATIVE
+from src.ai.llm_ai import LlmAI
+from src.ai.rule_ai import RuleAI
+
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+def _make_state(hand: List[Card]) -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = list(hand)
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    players[1].hand = [_c(Rank.FOUR)] * 5
+    players[2].hand = [_c(Rank.FIVE)] * 5
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+class FakeCompletions:
+    """模拟 chat.completions：按顺序返回预设文本"""
+
+    def __init__(self, replies: List[str]):
+        self.replies = list(replies)
+
+    async def create(self, **kwargs):
+        text = self.replies.pop(0) if self.replies else "{}"
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _random_state(rng: random.Random, follow: bool) -> GameState:
+    deck = create_deck()
+    rng.shuffle(deck)
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = deck[:rng.randint(5, 17)]
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    players[1].hand = deck[20:37]
+    players[2].hand = deck[37:54]
+    state = GameState(players=players, phase=GamePhase.PLAYING)
+    if follow:
+        state.last_play = detect_hand([deck[19]])
+        state.last_player = 2
+    return state
+
+
+def _greedy(moves: List[PlayedHand]) -> Optional[PlayedHand]:
+    """样例人格：总是出张数最多的牌，同张数出最小的"""
+    if not moves:
+        return None
+    return max(moves, key=lambda m: (len(m.cards), -int(m.main_rank)))
+
+
+def _records(n: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        state = _random_state(rng, follow=i % 3 == 0)
+        player = state.players[0]
+        move = _greedy(generate_moves(player.hand, state.last_play))
+        records.append({
+            "persona": "greedy",
+            "model": "m",
+            "state": info_set_key(player, state),
+            "move": None if move is None else ranks_text(move.cards),
+        })
+    return records
+
+
+class TestSituation:
+
+    def test_round_trip_from_key(self):
+        state = _make_state([_c(Rank.THREE), _c(Rank.THREE, Suit.HEART), _c(Rank.BIG_JOKER, Suit.JOKER)])
+        state.last_play = detect_hand([_c(Rank.KING)])
+        state.last_player = 1
+        sit = Situation.from_key(info_set_key(state.players[0], state))
+        assert sit.landlord
+        assert ranks_text(sit.hand) == "33 W"
+        assert sit.last_play.main_rank == Rank.KING
+        assert not sit.ally_last
+        assert sit.opponent_min == 5
+        assert None in sit.candidates()
+
+    def test_malformed_key(self):
+        assert Situation.from_key("garbage") is None
+        assert Situation.from_key("L|3X|-|-|F5,F5|0") is None
+
+
+class TestTraining:
+
+    def test_learns_persona_preference(self):
+        policy = train_policy(_records(300), min_samples=50)
+        assert policy.has("greedy")
+        assert policy.models["greedy"].accuracy > 0.6
+
+        ai = ImitationAI("greedy", policy)
+        rng = random.Random(99)
+        agree = 0
+        for _ in range(60):
+            state = _random_state(rng, follow=False)
+            player = state.players[0]
+            expected = _greedy(generate_moves(player.hand))
+            cards = ai.decide_play(player, state)
+            agree += ranks_text(cards) == ranks_text(expected.cards)
+        assert agree / 60 > 0.5
+
+    def test_too_few_samples_skipped(self):
+        policy = train_policy(_records(10), min_samples=50)
+        assert not policy.has("greedy")
+
+    def test_save_load(self, tmp_path):
+        policy = train_policy(_records(80), min_samples=20, epochs=50)
+        path = str(tmp_path / "model.json")
+        policy.save(path)
+        loaded = ImitationPolicy.load(path)
+        assert loaded.snapshot() == policy.snapshot()
+
+    def test_load_rejects_incompatible(self, tmp_path):
+        path = tmp_path / "model.json"
+        path.write_text(json.dumps({"version": 1, "features": 3, "personas": {}}))
+        with pytest.raises(ValueError):
+            ImitationPolicy.load(str(path))
+
+
+class TestImitationAI:
+
+    def test_returns_cards_from_hand(self):
+        policy = train_policy(_records(100), min_samples=20, epochs=50)
+        hand = [_c(Rank.THREE, Suit.HEART), _c(Rank.THREE, Suit.CLUB), _c(Rank.NINE)]
+        state = _make_state(hand)
+        cards = ImitationAI("greedy", policy).decide_play(state.players[0], state)
+        assert cards is not None and state.players[0].has_cards(cards)
+
+    def test_unknown_persona_uses_rule_ai(self):
+        state = _make_state([_c(Rank.THREE), _c(Rank.NINE)])
+        cards = ImitationAI("nobody", ImitationPolicy()).decide_play(state.players[0], state)
+        assert cards == RuleAI().decide_play(state.players[0], state)
+
+
+class TestLlmAIIntegration:
+
+    @pytest.mark.asyncio
+    async def test_validated_play_logged(self, tmp_path):
+        log = DecisionLog(str(tmp_path / "decisions.jsonl"))
+        ai = LlmAI(character="烈焰哥🔥", api_key="test-key", decision_log=log)
+        ai.routes[0].client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(
+            ['{"action": "play", "cards": ["♥A"], "strategy": "冲"}', "not json"]
+        )))
+        state = _make_state([_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)])
+        await ai.async_decide_play(state.players[0], state)
+        await ai.async_decide_play(state.players[0], state)   # 非法响应不记录
+        log.close()
+
+        records = read_log(log.path)
+        assert len(records) == 1
+        assert records[0]["persona"] == "烈焰哥🔥"
+        assert records[0]["move"] == "A"
+        assert records[0]["state"] == info_set_key(state.players[0], state)
+
+    @pytest.mark.asyncio
+    async def test_speculative_play_logged_only_when_accepted(self, tmp_path):
+        log = DecisionLog(str(tmp_path / "decisions.jsonl"))
+        ai = LlmAI(character="烈焰哥🔥", api_key="test-key", decision_log=log)
+        ai.routes[0].client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(
+            ['{"action": "play", "cards": ["♥A"], "strategy": "冲"}'] * 2
+        )))
+        state = _make_state([_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)])
+        with request_priority(PRIORITY_SPECULATIVE):
+            await ai.async_decide_play(state.players[0], state)
+        ai.discard_speculation()
+        assert log.written == 0
+
+        with request_priority(PRIORITY_SPECULATIVE):
+            await ai.async_decide_play(state.players[0], state)
+        assert log.written == 0
+        ai.accept_speculation(state.players[0], state)
+        log.close()
+        assert [r["move"] for r in read_log(log.path)] == ["A"]
+
+    @pytest.mark.asyncio
+    async def test_writes_batched_on_event_loop(self, tmp_path):
+        log = DecisionLog(str(tmp_path / "decisions.jsonl"), flush_interval=60)
+        state = _make_state([_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)])
+        for _ in range(3):
+            log.append("烈焰哥🔥", "m", state.players[0], state, [_c(Rank.THREE)])
+        # 出牌路径上只写入内存缓冲
+        assert not (tmp_path / "decisions.jsonl").exists()
+        log.close()
+        assert len(read_log(log.path)) == 3
+
+    @pytest.mark.asyncio
+    async def test_offline_persona_never_calls_llm(self):
+        policy = train_policy(
+            [dict(r, persona="烈焰哥🔥") for r in _records(100)], min_samples=20, epochs=50
+        )
+        ai = LlmAI(character="烈焰哥🔥", api_key="test-key", imitation=policy, offline=True)
+        assert not ai.routes
+        assert isinstance(ai._fallback, ImitationAI)
+        state = _make_state([_c(Rank.THREE), _c(Rank.THREE, Suit.HEART), _c(Rank.NINE)])
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert state.players[0].has_cards(cards)
+        assert strategy == ""
@@ -0,0 +1,103 @@
+"""房间事件日志单元测试：消息编号、断线续传、snapshot 退回与当前局面维护"""
+
+import asyncio
+import json
+import pytest
+from typing import List
+
+from src.ai.llm_ai import LlmAI
+from src.engine.card import card_ids
+from src.web.journal import EventJournal
+from src.web.outbound import Broadcaster
+from src.web.room import PLAYER_NAMES, Room
+from src.web.server import run_game_async
+from tests.helpers import FakeWebSocket
+
+
+def _frames(frames) -> List[dict]:
+    return [json.loads(f.data) for f in frames]
+
+
+class TestEventJournal:
+
+    def test_record_stamps_sequence(self):
+        journal = EventJournal()
+        assert [json.loads(journal.record({"type": "pass", "player_id": i}).data)["seq"]
+                for i in range(3)] == [1, 2, 3]
+
+    def test_resume_replays_only_missed(self):
+        journal = EventJournal()
+        for i in range(5):
+            journal.record({"type": "pass", "player_id": i % 3})
+        missed = _frames(journal.join_frames(since=3, epoch=journal.epoch))
+        assert [m["seq"] for m in missed] == [4, 5]
+        assert journal.join_frames(since=5, epoch=journal.epoch) == []
+        assert journal.stats.resumes == 2 and journal.stats.replayed == 2
+
+    def test_falls_back_to_snapshot(self):
+        journal = EventJournal(capacity=4)
+        for i in range(10):
+            journal.record({"type": "pass", "player_id": i % 3})
+        # 已被挤出环形缓冲 / epoch 不符 / 超前 / 超过补发上限 / 新连接
+        for since, epoch, limit in [(2, journal.epoch, None), (8, "other", None),
+                                    (11, journal.epoch, None), (6, journal.epoch, 2),
+                                    (None, None, None)]:
+            frames = _frames(journal.join_frames(since, epoch, limit))
+            assert [m["type"] for m in frames] == ["snapshot"]
+            assert frames[0]["seq"] == 10 and frames[0]["epoch"] == journal.epoch
+        # 缓冲中最早一条的前一条仍可续传
+        assert len(journal.join_frames(since=6, epoch=journal.epoch)) == 4
+
+    def test_commentary_updates_last_action(self):
+        journal = EventJournal()
+        journal.record({"type": "pass", "player_id": 1, "strategy": "占位"})
+        journal.record({"type": "commentary", "player_id": 1, "strategy": "解说"})
+        assert journal.state.to_dict()["actions"][0]["strategy"] == "解说"
+        # 迟到的解说属于该座位更早的动作，不覆盖新动作
+        journal.record({"type": "pass", "player_id": 1, "strategy": "新动作"})
+        journal.record({"type": "commentary", "player_id": 1, "action_seq": 1, "strategy": "旧解说"})
+        assert journal.state.to_dict()["actions"][0]["strategy"] == "新动作"
+        journal.record({"type": "commentary", "player_id": 1, "action_seq": 3, "strategy": "新解说"})
+        assert journal.state.to_dict()["actions"][0]["strategy"] == "新解说"
+        journal.record({"type": "thinking", "player_id": 1, "start": 0, "until": 1})
+        assert journal.state.to_dict()["actions"] == []
+
+
+class TestRoomJoin:
+
+    @pytest.mark.asyncio
+    async def test_snapshot_matches_finished_game(self):
+        room = Room("j", strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                    hub=Broadcaster(max_queue=10000), pace=0.0)
+        live = FakeWebSocket()
+        room.subscribe(live)
+        await room.run_exclusive(run_game_async)
+
+        late = FakeWebSocket()
+        room.subscribe(late)
+        while room.hub.queued:
+            await asyncio.sleep(0.001)
+
+        assert [m["type"] for m in late.sent] == ["clock", "snapshot"]
+        state = late.sent[1]["state"]
+        assert state["phase"] == "finished"
+        assert state["result"]["winner_id"] == live.sent[-1]["winner_id"]
+        assert [p["hand_size"] for p in state["players"]] == [p.hand_size for p in room.players]
+        plays = [m for m in live.sent if m["type"] in ("play", "pass")]
+        assert len(state["history"]) == len(plays)
+
+        # 断线重连：只补发 since 之后的消息
+        cut = live.sent[len(live.sent) // 2]["seq"]
+        resumed = FakeWebSocket()
+        room.subscribe(resumed, since=cut, epoch=room.journal.epoch)
+        while room.hub.queued:
+            await asyncio.sleep(0.001)
+        assert [m["seq"] for m in resumed.sent[1:]] == list(range(cut + 1, room.journal.seq + 1))
+
+    @pytest.mark.asyncio
+    async def test_snapshot_hands_follow_deltas(self):
+        room = Room("d", strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                    hub=Broadcaster(max_queue=10000), pace=0.0)
+        await room.run_exclusive(run_game_async)
+        state = room.journal.state.to_dict()
+        assert [p["hand"] for p in state["players"]] == [card_ids(p.hand) for p in room.players]
@@ -0,0 +1,149 @@
+"""延迟统计与对冲请求单元测试（使用假 LLM 客户端，不访问网络）"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from typing import List
+
+from src.engine.card import Card, Rank, Suit
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.latency import (
+    HedgePolicy, LatencyRegistry, LatencyTracker, HEDGE_FALLBACK, HEDGE_OFF,
+)
+from src.ai.client_pool import ClientRegistry
+from src.ai.routing import BreakerRegistry
+from src.ai.llm_ai import LlmAI
+
+
+def _warm_tracker(seconds: float, n: int = 50) -> LatencyTracker:
+    tracker = LatencyTracker()
+    for _ in range(n):
+        tracker.observe(seconds)
+    return tracker
+
+
+class TestHedgePolicy:
+
+    def test_cold_tracker_uses_cap(self):
+        policy = HedgePolicy(max_timeout=10.0)
+        tracker = LatencyTracker()
+        assert policy.timeout(tracker) == 10.0
+        assert policy.hedge_delay(tracker) is None
+
+    def test_timeout_from_percentiles(self):
+        policy = HedgePolicy(min_timeout=0.5, max_timeout=10.0, timeout_factor=2.0)
+        assert policy.timeout(_warm_tracker(1.0)) == pytest.approx(2.0)
+        assert policy.timeout(_warm_tracker(0.01)) == 0.5
+        assert policy.timeout(_warm_tracker(30.0)) == 10.0
+
+    def test_budget_limits_hedges(self):
+        policy = HedgePolicy(budget=0.1, min_hedge_delay=0.0)
+        tracker = _warm_tracker(1.0)
+        tracker.calls = 10
+        assert policy.hedge_delay(tracker) == pytest.approx(1.0)
+        tracker.hedges = 1
+        assert policy.hedge_delay(tracker) is None
+
+    def test_budget_limits_early_fallbacks(self):
+        policy = HedgePolicy(mode=HEDGE_FALLBACK, budget=0.1, min_hedge_delay=0.0)
+        tracker = _warm_tracker(1.0)
+        tracker.calls = 10
+        assert policy.hedge_delay(tracker) == pytest.approx(1.0)
+        tracker.early_fallbacks = 1
+        assert policy.hedge_delay(tracker) is None
+
+    def test_off_never_hedges(self):
+        assert HedgePolicy(mode=HEDGE_OFF).hedge_delay(_warm_tracker(1.0)) is None
+
+
+# ============================================================
+#  LlmAI 对冲
+# ============================================================
+
+class ScriptedCompletions:
+    """按调用顺序使用不同延迟返回同一合法出牌"""
+
+    def __init__(self, delays: List[float], reply: str):
+        self.delays = list(delays)
+        self.reply = reply
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        delay = self.delays[self.calls]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+def _make(delays: List[float], policy: HedgePolicy):
+    latency = LatencyRegistry()
+    ai = LlmAI("烈焰哥🔥", api_key="k", registry=ClientRegistry(),
+               hedge=policy, latency=latency, breakers=BreakerRegistry())
+    for _ in range(50):
+        ai.routes[0].latency.observe(0.02)
+    completions = ScriptedCompletions(delays, '{"action": "play", "cards": ["♥A"], "strategy": "冲"}')
+    ai.routes[0].client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+    players[0].role = Role.LANDLORD
+    state = GameState(players=players, phase=GamePhase.PLAYING)
+    return ai, completions, state
+
+
+class TestHedgedDecision:
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_over_slow_primary(self):
+        policy = HedgePolicy(min_hedge_delay=0.02, min_timeout=0.5, budget=1.0)
+        ai, completions, state = _make([5.0, 0.01], policy)
+        cards, _ = await asyncio.wait_for(ai.async_decide_play(state.players[0], state), 1.0)
+        assert cards == [_c(Rank.ACE, Suit.HEART)]
+        assert completions.calls == 2
+        assert ai.routes[0].latency.hedges == 1
+        assert ai.routes[0].latency.hedge_wins == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_needs_no_hedge(self):
+        policy = HedgePolicy(min_hedge_delay=0.05, budget=1.0)
+        ai, completions, state = _make([0.0], policy)
+        await ai.async_decide_play(state.players[0], state)
+        assert completions.calls == 1
+        assert ai.routes[0].latency.hedges == 0
+
+    @pytest.mark.asyncio
+    async def test_fallback_mode_hands_over_to_engine(self):
+        policy = HedgePolicy(mode=HEDGE_FALLBACK, min_hedge_delay=0.02)
+        ai, completions, state = _make([5.0], policy)
+        cards, strategy = await asyncio.wait_for(
+            ai.async_decide_play(state.players[0], state), 1.0
+        )
+        assert cards is not None and strategy == ""
+        assert ai.routes[0].latency.early_fallbacks == 1
+
+    @pytest.mark.asyncio
+    async def test_abandoned_primary_recorded_as_censored_sample(self):
+        for policy, delays in ((HedgePolicy(mode=HEDGE_FALLBACK, min_hedge_delay=0.05, budget=1.0), [5.0]),
+                               (HedgePolicy(min_hedge_delay=0.05, min_timeout=0.5, budget=1.0), [5.0, 0.01])):
+            ai, _, state = _make(delays, policy)
+            tracker = ai.routes[0].latency
+            before = len(tracker.samples)
+            await asyncio.wait_for(ai.async_decide_play(state.players[0], state), 1.0)
+            # 被放弃的原请求至少耗时到对冲时机，样本不会只剩快于 p90 的响应
+            assert max(list(tracker.samples)[before:]) >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_adaptive_timeout_bounds_turn(self):
+        policy = HedgePolicy(mode=HEDGE_OFF, min_timeout=0.05, timeout_factor=1.0)
+        ai, completions, state = _make([5.0], policy)
+        cards, strategy = await asyncio.wait_for(
+            ai.async_decide_play(state.players[0], state), 1.0
+        )
+        assert strategy == ""
+        assert ai.routes[0].latency.timeouts == 1
@@ -0,0 +1,353 @@
+"""LlmAI 单元测试（使用假 LLM 客户端，不访问网络）"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from typing import List
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_detector import detect_hand
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.llm_ai import LlmAI, COMMENTARY_ASYNC, PROMPT_INDEXED, PROMPT_COMPACT
+from src.ai.metrics import decision_stats
+from src.ai.rule_ai import RuleAI
+from src.ai.speculation import SpeculativePrefetcher
+
+
+# ============================================================
+#  辅助工具
+# ============================================================
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+class FakeCompletions:
+    """模拟 chat.completions：按顺序返回预设文本，记录收到的 prompt"""
+
+    def __init__(self, replies: List[str], delay: float = 0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.prompts: List[str] = []
+
+    async def create(self, **kwargs):
+        self.prompts.append(kwargs["messages"][-1]["content"])
+        self.messages = kwargs["messages"]
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        text = self.replies.pop(0) if self.replies else "{}"
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeStreamCompletions(FakeCompletions):
+    """模拟 stream=True：将预设文本逐字符分片返回，每片间隔 delay 秒"""
+
+    async def create(self, **kwargs):
+        assert kwargs.get("stream")
+        self.prompts.append(kwargs["messages"][-1]["content"])
+        text = self.replies.pop(0) if self.replies else "{}"
+        delay = self.delay
+
+        async def chunks():
+            for ch in text:
+                await asyncio.sleep(delay)
+                delta = SimpleNamespace(content=ch)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        return chunks()
+
+
+async def _immediate(cards):
+    return cards, ""
+
+
+def _make_ai(replies: List[str], delay: float = 0.0, **kwargs) -> LlmAI:
+    ai = LlmAI(character="烈焰哥🔥", api_key="test-key", **kwargs)
+    ai.routes[0].client = SimpleNamespace(
+        chat=SimpleNamespace(completions=FakeCompletions(replies, delay))
+    )
+    return ai
+
+
+def _make_state(hand: List[Card]) -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = list(hand)
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    players[1].hand = [_c(Rank.FOUR)] * 5
+    players[2].hand = [_c(Rank.FIVE)] * 5
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+# ============================================================
+#  出牌解析
+# ============================================================
+
+class TestPlayResponse:
+
+    @pytest.mark.asyncio
+    async def test_valid_play(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"action": "play", "cards": ["♥A"], "strategy": "冲"}'])
+        state = _make_state(hand)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.ACE, Suit.HEART)]
+        assert strategy == "冲"
+
+    @pytest.mark.asyncio
+    async def test_invalid_play_falls_back(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"action": "play", "cards": ["♠K"], "strategy": "冲"}'], repair=False)
+        state = _make_state(hand)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.THREE)]
+        assert strategy == ""
+
+    @pytest.mark.asyncio
+    async def test_invalid_play_repaired(self):
+        decision_stats.reset()
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"action": "play", "cards": ["♠A"], "strategy": "冲"}'])
+        state = _make_state(hand)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.ACE, Suit.HEART)]
+        assert strategy == "冲"
+        assert decision_stats.get(ai.model, "free").repaired == 1
+
+
+# ============================================================
+#  解说分离模式
+# ============================================================
+
+class TestAsyncCommentary:
+
+    @pytest.mark.asyncio
+    async def test_move_does_not_wait_for_llm(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"strategy": "小牌探路"}'], delay=0.05,
+                      commentary_mode=COMMENTARY_ASYNC)
+        state = _make_state(hand)
+
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.THREE)]
+        assert strategy == ""
+        assert ai.routes[0].client.chat.completions.prompts == []
+
+        task = ai.start_commentary(state.players[0], state, "出单张 ♠3")
+        assert await task == "小牌探路"
+        assert "♠3" in ai.routes[0].client.chat.completions.prompts[0]
+
+    def test_inline_mode_has_no_commentary_task(self):
+        ai = _make_ai([])
+        state = _make_state([_c(Rank.THREE)])
+        assert ai.start_commentary(state.players[0], state, "不出") is None
+
+
+# ============================================================
+#  编号候选 prompt 模式
+# ============================================================
+
+class TestIndexedPrompt:
+
+    def setup_method(self):
+        decision_stats.reset()
+
+    @pytest.mark.asyncio
+    async def test_move_id_maps_to_cards(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"move": 1, "strategy": "稳"}'], prompt_mode=PROMPT_INDEXED)
+        state = _make_state(hand)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        prompt = ai.routes[0].client.chat.completions.prompts[0]
+        first_option = prompt.split("1: ")[1].split("\n")[0]
+        assert " ".join(c.display for c in cards) == first_option
+        assert strategy == "稳"
+        assert decision_stats.get(ai.model, PROMPT_INDEXED).ok == 1
+
+    @pytest.mark.asyncio
+    async def test_out_of_range_id_counts_invalid(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"move": 99}'], prompt_mode=PROMPT_INDEXED)
+        state = _make_state(hand)
+        cards, _ = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.THREE)]
+        counter = decision_stats.get(ai.model, PROMPT_INDEXED)
+        assert counter.invalid == 1
+        assert counter.to_dict()["fallback_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_no_beating_move_skips_llm(self):
+        hand = [_c(Rank.THREE)]
+        ai = _make_ai([], prompt_mode=PROMPT_INDEXED)
+        state = _make_state(hand)
+        state.last_play = detect_hand([_c(Rank.KING, Suit.HEART)])
+        state.last_player = 1
+        cards, _ = await ai.async_decide_play(state.players[0], state)
+        assert cards is None
+        assert ai.routes[0].client.chat.completions.prompts == []
+
+    @pytest.mark.asyncio
+    async def test_top_k_caps_options(self):
+        hand = [_c(r) for r in (Rank.THREE, Rank.FIVE, Rank.SEVEN, Rank.NINE, Rank.KING)]
+        ai = _make_ai(['{"move": 2}'], prompt_mode=PROMPT_INDEXED, move_top_k=3)
+        state = _make_state(hand)
+        await ai.async_decide_play(state.players[0], state)
+        prompt = ai.routes[0].client.chat.completions.prompts[0]
+        assert "3: " in prompt and "4: " not in prompt
+
+
+# ============================================================
+#  决策缓存
+# ============================================================
+
+class TestDecisionCacheIntegration:
+
+    @pytest.mark.asyncio
+    async def test_second_identical_situation_skips_llm(self):
+        from src.ai.decision_cache import DecisionCache
+
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai(['{"action": "play", "cards": ["♥A"], "strategy": "冲"}'],
+                      cache=DecisionCache())
+        state = _make_state(hand)
+        first = await ai.async_decide_play(state.players[0], state)
+        second = await ai.async_decide_play(state.players[0], state)
+        assert first == second
+        assert len(ai.routes[0].client.chat.completions.prompts) == 1
+
+
+# ============================================================
+#  流式出牌
+# ============================================================
+
+class TestStreaming:
+
+    @pytest.mark.asyncio
+    async def test_move_committed_before_strategy_finishes(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        reply = '{"action": "play", "cards": ["♥A"], "strategy": "' + "冲" * 40 + '"}'
+        ai = _make_ai([], stream=True)
+        ai.routes[0].client.chat.completions = FakeStreamCompletions([reply], delay=0.002)
+        state = _make_state(hand)
+
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert cards == [_c(Rank.ACE, Suit.HEART)]
+        stream = ai.take_strategy_stream(state.players[0], state)
+        assert stream is not None and not stream.done
+
+        texts = [t async for t in stream.updates()]
+        assert texts[-1] == "冲" * 40
+
+    @pytest.mark.asyncio
+    async def test_only_completed_strategy_is_cached(self):
+        from src.ai.decision_cache import DecisionCache
+
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        reply = '{"action": "play", "cards": ["♥A"], "strategy": "' + "冲" * 200 + '"}'
+        cache = DecisionCache()
+        ai = _make_ai([], stream=True, cache=cache)
+        ai.routes[0].client.chat.completions = FakeStreamCompletions([reply, reply], delay=0.001)
+        state = _make_state(hand)
+
+        # 出牌字段已到齐，解说被超时截断：不缓存半截解说
+        ai._timeout = lambda route: 0.1
+        await ai.async_decide_play(state.players[0], state)
+        stream = ai.take_strategy_stream(state.players[0], state)
+        [t async for t in stream.updates()]
+        assert not stream.complete and len(cache) == 0
+
+        ai._timeout = lambda route: 5.0
+        await ai.async_decide_play(state.players[0], state)
+        stream = ai.take_strategy_stream(state.players[0], state)
+        [t async for t in stream.updates()]
+        await asyncio.sleep(0)
+        assert stream.complete and len(cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_stream_falls_back(self):
+        hand = [_c(Rank.THREE), _c(Rank.ACE, Suit.HEART)]
+        ai = _make_ai([], stream=True, repair=False)
+        ai.routes[0].client.chat.completions = FakeStreamCompletions(
+            ['{"action": "play", "cards": ["♠K"], "strategy": "冲冲冲"}'], delay=0.001
+        )
+        state = _make_state(hand)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert strategy == ""
+        assert ai.take_strategy_stream(state.players[0], state) is None
+
+
+# ============================================================
+#  紧凑编码
+# ============================================================
+
+class TestCompactPrompt:
+
+    @pytest.mark.asyncio
+    async def test_stable_system_prefix_and_rank_notation(self):
+        hand = [_c(Rank.THREE), _c(Rank.THREE, Suit.HEART), _c(Rank.TEN)]
+        ai = _make_ai(['{"action": "play", "cards": "33", "strategy": "对三"}'] * 2,
+                      prompt_encoding=PROMPT_COMPACT)
+        state = _make_state(hand)
+        cards, strategy = await ai.async_decide_play(state.players[0], state)
+        assert sorted(cards) == sorted(hand[:2])
+        completions = ai.routes[0].client.chat.completions
+        system, user = completions.messages
+        assert system["role"] == "system"
+        assert "33 T" in user["content"]
+        assert "♠" not in user["content"]
+
+        state.players[0].hand = hand[1:]
+        await ai.async_decide_play(state.players[0], state)
+        assert completions.messages[0] == system
+
+    @pytest.mark.asyncio
+    async def test_compact_invalid_is_repaired(self):
+        hand = [_c(Rank.THREE), _c(Rank.THREE, Suit.HEART), _c(Rank.TEN)]
+        ai = _make_ai(['{"action": "play", "cards": "333", "strategy": "冲"}'],
+                      prompt_encoding=PROMPT_COMPACT)
+        state = _make_state(hand)
+        cards, _ = await ai.async_decide_play(state.players[0], state)
+        assert sorted(c.rank for c in cards) == [Rank.THREE, Rank.THREE]
+
+    @pytest.mark.asyncio
+    async def test_session_appends_turns(self):
+        hand = [_c(Rank.THREE), _c(Rank.THREE, Suit.HEART), _c(Rank.TEN)]
+        ai = _make_ai(['{"action": "play", "cards": "T", "strategy": "走"}'] * 2,
+                      prompt_encoding=PROMPT_COMPACT, session_budget=600)
+        state = _make_state(hand)
+        me = state.players[0]
+        cards, _ = await ai.async_decide_play(me, state)
+        state.play_history.append((0, detect_hand(cards)))
+        state.play_history.append((1, detect_hand([_c(Rank.FOUR)])))
+        me.hand = hand[:2]
+        await ai.async_decide_play(me, state)
+        roles = [m["role"] for m in ai.routes[0].client.chat.completions.messages]
+        assert roles == ["system", "user", "assistant", "user"]
+
+    @pytest.mark.asyncio
+    async def test_session_committed_on_prefetch_hit(self):
+        ai = _make_ai(['{"action": "play", "cards": "4", "strategy": "跟"}'] * 3,
+                      prompt_encoding=PROMPT_COMPACT, session_budget=600)
+        seat0 = SimpleNamespace(
+            async_decide_play=lambda player, state: _immediate(RuleAI().decide_play(player, state))
+        )
+        pf = SpeculativePrefetcher([seat0, ai, RuleAI()], max_branches=2, budget_ratio=2.0)
+        state = _make_state([_c(Rank.THREE), _c(Rank.TEN)])
+
+        cards, _ = await pf.decide(0, state)
+        await asyncio.sleep(0.01)
+        # 投机预取只预览会话，尚未写回
+        assert ai.session.turns == 0
+
+        state.players[0].remove_cards(cards)
+        state.last_play = detect_hand(cards)
+        state.last_player = 0
+        state.play_history.append((0, state.last_play))
+        state.current_player = 1
+        await pf.decide(1, state)
+        assert pf.stats.hits == 1
+        # 预取被采用：其会话快照写回，下一手带上这一轮的问答
+        assert ai.session.turns == 1
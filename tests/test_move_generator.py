@@ -0,0 +1,75 @@
+"""出牌枚举器单元测试"""
+
+import itertools
+import random
+import pytest
+from collections import Counter
+
+from src.engine.card import Card, Rank, Suit, create_deck
+from src.engine.hand_type import HandType
+from src.engine.hand_detector import detect_hand
+from src.engine.move_generator import generate_moves
+
+
+def c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    """快捷构造一张牌"""
+    return Card(rank=rank, suit=suit)
+
+
+def cards_of_rank(rank: Rank, count: int) -> list[Card]:
+    """构造同点数的多张牌（自动分配不同花色）"""
+    suits = [Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB]
+    return [Card(rank=rank, suit=suits[i]) for i in range(count)]
+
+
+def _rank_keys(moves) -> set:
+    return {tuple(sorted(c.rank for c in m.cards)) for m in moves}
+
+
+def _brute_force(hand) -> set:
+    """穷举所有点数子集，用 detect_hand 判定合法性"""
+    rc = Counter(c.rank for c in hand)
+    ranks = sorted(rc)
+    by_rank = {}
+    for card in hand:
+        by_rank.setdefault(card.rank, []).append(card)
+    result = set()
+    for counts in itertools.product(*[range(rc[r] + 1) for r in ranks]):
+        cards = [x for r, k in zip(ranks, counts) for x in by_rank[r][:k]]
+        if cards and detect_hand(cards) is not None:
+            result.add(tuple(sorted(x.rank for x in cards)))
+    return result
+
+
+class TestGenerateMoves:
+
+    def test_empty_hand(self):
+        assert generate_moves([]) == []
+
+    def test_rocket_and_bomb(self):
+        hand = cards_of_rank(Rank.FIVE, 4) + [
+            Card(Rank.SMALL_JOKER, Suit.JOKER), Card(Rank.BIG_JOKER, Suit.JOKER),
+        ]
+        types = {m.type for m in generate_moves(hand)}
+        assert HandType.ROCKET in types
+        assert HandType.BOMB in types
+        assert HandType.FOUR_WITH_TWO_SINGLES in types
+
+    def test_follow_only_beating_moves(self):
+        hand = [c(Rank.THREE), c(Rank.NINE), c(Rank.KING)]
+        last = detect_hand([c(Rank.EIGHT, Suit.HEART)])
+        moves = generate_moves(hand, last)
+        assert _rank_keys(moves) == {(Rank.NINE,), (Rank.KING,)}
+
+    def test_airplane_with_wings(self):
+        hand = (cards_of_rank(Rank.SEVEN, 3) + cards_of_rank(Rank.EIGHT, 3)
+                + [c(Rank.THREE), c(Rank.FOUR)])
+        keys = _rank_keys(generate_moves(hand))
+        assert (Rank.THREE, Rank.FOUR, Rank.SEVEN, Rank.SEVEN, Rank.SEVEN,
+                Rank.EIGHT, Rank.EIGHT, Rank.EIGHT) in keys
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_brute_force(self, seed):
+        rng = random.Random(seed)
+        hand = rng.sample(create_deck(), rng.randint(5, 12))
+        assert _rank_keys(generate_moves(hand)) == _brute_force(hand)
@@ -0,0 +1,97 @@
+"""出站发送队列单元测试：广播不等待慢客户端，溢出按消息类型丢弃 / 合并 / 断开"""
+
+import asyncio
+import pytest
+
+from src.web.outbound import Broadcaster, CLOSE_SLOW_CONSUMER
+from tests.helpers import FakeWebSocket
+
+
+async def _drain(seconds: float = 0.02) -> None:
+    await asyncio.sleep(seconds)
+
+
+class TestBroadcaster:
+
+    @pytest.mark.asyncio
+    async def test_delivers_in_order(self):
+        hub = Broadcaster()
+        ws = FakeWebSocket()
+        hub.add(ws)
+        for i in range(5):
+            hub.publish({"type": "play", "n": i})
+        await _drain()
+        assert [m["n"] for m in ws.sent] == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_delay_others(self):
+        hub = Broadcaster()
+        slow, fast = FakeWebSocket(delay=1.0), FakeWebSocket()
+        hub.add(slow)
+        hub.add(fast)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for i in range(10):
+            hub.publish({"type": "play", "n": i})
+        assert loop.time() - started < 0.05   # publish 只入队
+        await _drain()
+        assert len(fast.sent) == 10
+        assert slow.sent == []
+
+    @pytest.mark.asyncio
+    async def test_key_event_evicts_commentary(self):
+        hub = Broadcaster(max_queue=2)
+        channel = hub.add(FakeWebSocket(blocked=True))
+        await _drain(0)
+        hub.publish({"type": "commentary", "player_id": 0, "strategy": "a"})
+        hub.publish({"type": "commentary", "player_id": 1, "strategy": "b"})
+        hub.publish({"type": "play", "n": 1})
+        assert channel.stats.dropped == 1
+        assert channel.depth == 2
+        assert not channel.closed
+
+    @pytest.mark.asyncio
+    async def test_commentary_coalesced_per_player(self):
+        hub = Broadcaster()
+        channel = hub.add(FakeWebSocket(blocked=True))
+        await _drain(0)
+        hub.publish({"type": "commentary", "player_id": 0, "strategy": "a"})
+        hub.publish({"type": "commentary", "player_id": 1, "strategy": "x"})
+        hub.publish({"type": "commentary", "player_id": 0, "strategy": "ab"})
+        assert channel.depth == 2
+        assert channel.stats.coalesced == 1
+
+    @pytest.mark.asyncio
+    async def test_overflow_of_key_events_disconnects(self):
+        hub = Broadcaster(max_queue=2)
+        ws = FakeWebSocket(blocked=True)
+        channel = hub.add(ws)
+        await _drain(0)
+        for i in range(4):
+            hub.publish({"type": "play", "n": i})
+        await _drain(0)
+        assert channel.closed
+        assert len(hub) == 0
+        assert ws.closed_code == CLOSE_SLOW_CONSUMER
+        assert hub.snapshot()["disconnects"] == {"overflow": 1}
+
+    @pytest.mark.asyncio
+    async def test_stalled_send_disconnects(self):
+        hub = Broadcaster(send_timeout=0.01)
+        ws = FakeWebSocket(blocked=True)
+        channel = hub.add(ws)
+        hub.publish({"type": "play"})
+        await _drain(0.05)
+        assert channel.close_reason == "stalled"
+        assert len(hub) == 0
+
+    @pytest.mark.asyncio
+    async def test_remove_stops_writer(self):
+        hub = Broadcaster()
+        ws = FakeWebSocket()
+        hub.add(ws)
+        hub.remove(ws)
+        hub.publish({"type": "play"})
+        await _drain()
+        assert ws.sent == []
+        assert hub.snapshot()["disconnects"] == {}
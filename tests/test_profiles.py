@@ -0,0 +1,107 @@
+"""订阅档位单元测试：按档位裁剪消息、同档位共享编码结果、public 档位不泄露暗牌"""
+
+import asyncio
+import json
+import pytest
+
+from src.ai.llm_ai import LlmAI
+from src.web import outbound
+from src.web.outbound import Broadcaster, make_frame
+from src.web.profiles import (
+    PROFILE_ADMIN, PROFILE_FULL, PROFILE_PUBLIC, PROFILE_SCORES, negotiate_profile,
+)
+from src.web.room import PLAYER_NAMES, Room
+from src.web.server import run_game_async
+from tests.helpers import FakeWebSocket
+
+
+DEAL = {"type": "deal_schedule", "start": 0, "interval": 40, "hands": [[1, 2], [3, 4], [5, 6]], "seq": 3}
+
+
+class TestShaping:
+
+    def test_negotiate_profile(self):
+        assert negotiate_profile("public") == PROFILE_PUBLIC
+        assert negotiate_profile(None) == PROFILE_FULL
+        assert negotiate_profile("root") == PROFILE_FULL
+
+    def test_full_and_admin_share_original_frame(self):
+        frame = make_frame(DEAL)
+        assert frame.for_profile(PROFILE_FULL) is frame
+        assert frame.for_profile(PROFILE_ADMIN) is frame
+
+    def test_public_hides_hands(self):
+        shaped = json.loads(make_frame(DEAL).for_profile(PROFILE_PUBLIC).data)
+        assert "hands" not in shaped
+        assert shaped["sizes"] == [2, 2, 2]
+        play = {"type": "play", "player_id": 0, "cards": [1], "hand_size": 1, "checksum": 7}
+        assert "checksum" not in json.loads(make_frame(play).for_profile(PROFILE_PUBLIC).data)
+
+    def test_public_snapshot_hides_action_checksum(self):
+        play = {"type": "play", "player_id": 0, "cards": [1], "hand_size": 1, "checksum": 7, "seq": 9}
+        snapshot = {"type": "snapshot", "seq": 9, "epoch": "e", "state": {"players": [], "actions": [play]}}
+        shaped = json.loads(make_frame(snapshot).for_profile(PROFILE_PUBLIC).data)
+        assert shaped["state"]["actions"] == [{k: v for k, v in play.items() if k != "checksum"}]
+
+    def test_scores_only_filters(self):
+        assert make_frame(DEAL).for_profile(PROFILE_SCORES) is None
+        result = make_frame({"type": "result", "winner_id": 1})
+        assert result.for_profile(PROFILE_SCORES) is result
+
+    def test_packed_keeps_message_for_shaping(self, monkeypatch):
+        frame = make_frame(DEAL)
+        frame.packed
+        # 二进制编码之后各档位仍直接裁剪原始消息，不再逐档位解析 JSON
+        monkeypatch.setattr(outbound.json, "loads", lambda data: pytest.fail("re-parsed"))
+        assert frame.for_profile(PROFILE_PUBLIC) is not None
+        assert frame.for_profile(PROFILE_SCORES) is None
+
+    def test_variant_built_once(self):
+        frame = make_frame(DEAL)
+        assert frame.for_profile(PROFILE_PUBLIC) is frame.for_profile(PROFILE_PUBLIC)
+        frame.release()
+        assert frame.for_profile(PROFILE_PUBLIC) is not None
+
+
+class TestProfileBroadcast:
+
+    @pytest.mark.asyncio
+    async def test_same_profile_shares_encoded_data(self):
+        hub = Broadcaster()
+        a, b = FakeWebSocket(), FakeWebSocket()
+        hub.add(a, profile=PROFILE_PUBLIC)
+        hub.add(b, profile=PROFILE_PUBLIC)
+        hub.publish(DEAL)
+        await asyncio.sleep(0.01)
+        assert a.raw[0] is b.raw[0]
+
+    @pytest.mark.asyncio
+    async def test_public_game_never_shows_hidden_cards(self):
+        room = Room("pub", strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                    hub=Broadcaster(max_queue=10000), pace=0.0)
+        full, public, scores = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        room.subscribe(full)
+        room.subscribe(public, profile=PROFILE_PUBLIC)
+        room.subscribe(scores, profile=PROFILE_SCORES)
+        await room.run_exclusive(run_game_async)
+        late = FakeWebSocket()
+        room.subscribe(late, profile=PROFILE_PUBLIC)
+        while room.hub.queued:
+            await asyncio.sleep(0.001)
+
+        # 任何公开帧（含快照中的最近动作）都不带手牌校验和
+        assert all("checksum" not in d for d in public.raw + late.raw)
+        for m in public.sent + late.sent:
+            assert "hands" not in m
+            if m["type"] == "deal_done":
+                assert "dizhu_cards" not in m
+        snapshot = late.sent[1]
+        assert snapshot["type"] == "snapshot"
+        assert all("hand" not in p for p in snapshot["state"]["players"])
+        # 公开的出牌信息不受影响
+        plays = lambda ws: [m["cards"] for m in ws.sent if m["type"] == "play"]
+        assert plays(public) == plays(full)
+
+        assert {m["type"] for m in scores.sent} <= {"clock", "snapshot", "deal_start", "result"}
+        assert [m["type"] for m in scores.sent].count("result") == 1
+        assert sum(len(d) for d in scores.raw) < sum(len(d) for d in public.raw) < sum(len(d) for d in full.raw)
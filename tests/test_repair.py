@@ -0,0 +1,83 @@
+"""出牌修复单元测试"""
+
+import pytest
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_type import HandType
+from src.engine.hand_detector import detect_hand
+from src.ai.repair import (
+    parse_intent_ranks, repair_move,
+    REPAIR_SUITS, REPAIR_SUPERSET, REPAIR_SUBSET, REPAIR_NEAREST,
+)
+
+
+def c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    """快捷构造一张牌"""
+    return Card(rank=rank, suit=suit)
+
+
+def _ranks(cards) -> list:
+    return sorted(x.rank for x in cards)
+
+
+class TestParseIntent:
+
+    def test_ignores_suits(self):
+        assert parse_intent_ranks(["♣A", "A", "10", "小王"]) == [
+            Rank.ACE, Rank.ACE, Rank.TEN, Rank.SMALL_JOKER,
+        ]
+
+    def test_unknown_text(self):
+        assert parse_intent_ranks(["♠X"]) is None
+        assert parse_intent_ranks([]) is None
+
+
+class TestRepairMove:
+
+    def test_wrong_suits(self):
+        hand = [c(Rank.FIVE, Suit.HEART), c(Rank.FIVE, Suit.CLUB), c(Rank.NINE)]
+        move, kind = repair_move([Rank.FIVE, Rank.FIVE], hand, None)
+        assert kind == REPAIR_SUITS
+        assert _ranks(move.cards) == [Rank.FIVE, Rank.FIVE]
+
+    def test_straight_one_card_short(self):
+        hand = [c(r) for r in (Rank.THREE, Rank.FOUR, Rank.FIVE, Rank.SIX, Rank.SEVEN, Rank.KING)]
+        move, kind = repair_move([Rank.THREE, Rank.FOUR, Rank.FIVE, Rank.SIX], hand, None)
+        assert kind == REPAIR_SUPERSET
+        assert move.type == HandType.STRAIGHT
+
+    def test_extra_card_removed(self):
+        hand = [c(Rank.EIGHT), c(Rank.EIGHT, Suit.HEART), c(Rank.KING)]
+        last = detect_hand([c(Rank.SIX), c(Rank.SIX, Suit.HEART)])
+        move, kind = repair_move([Rank.EIGHT, Rank.EIGHT, Rank.KING], hand, last)
+        assert kind == REPAIR_SUBSET
+        assert _ranks(move.cards) == [Rank.EIGHT, Rank.EIGHT]
+
+    def test_nearest_rank_same_type(self):
+        hand = [c(Rank.NINE), c(Rank.NINE, Suit.HEART), c(Rank.ACE), c(Rank.ACE, Suit.HEART)]
+        last = detect_hand([c(Rank.SEVEN), c(Rank.SEVEN, Suit.HEART)])
+        move, kind = repair_move([Rank.TEN, Rank.TEN], hand, last)
+        assert kind == REPAIR_NEAREST
+        assert move.main_rank == Rank.NINE
+
+    def test_no_legal_move(self):
+        hand = [c(Rank.THREE)]
+        last = detect_hand([c(Rank.TWO)])
+        assert repair_move([Rank.THREE], hand, last) is None
+
+    def test_never_escalates_to_bomb(self):
+        # 55 压不过 77：不能"补齐"成 5555 炸弹
+        hand = [c(Rank.FIVE, s) for s in (Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB)] + [c(Rank.THREE)]
+        last = detect_hand([c(Rank.SEVEN), c(Rank.SEVEN, Suit.HEART)])
+        assert repair_move([Rank.FIVE, Rank.FIVE], hand, last) is None
+
+        # 小王压不过大王：不能补成火箭
+        hand = [c(Rank.SMALL_JOKER, Suit.JOKER), c(Rank.BIG_JOKER, Suit.JOKER)]
+        last = detect_hand([c(Rank.BIG_JOKER, Suit.JOKER)])
+        assert repair_move([Rank.SMALL_JOKER], hand, last) is None
+
+    def test_bomb_intent_still_repaired(self):
+        hand = [c(Rank.NINE, s) for s in (Suit.SPADE, Suit.HEART, Suit.DIAMOND, Suit.CLUB)]
+        last = detect_hand([c(Rank.SEVEN), c(Rank.SEVEN, Suit.HEART)])
+        move, kind = repair_move([Rank.EIGHT] * 4, hand, last)
+        assert kind == REPAIR_NEAREST and move.is_bomb_like
@@ -0,0 +1,239 @@
+"""房间单元测试：按需创建、空闲回收、单局互斥、多房间并发对局与无人观看挂起（规则 AI，不访问网络）"""
+
+import asyncio
+import json
+import pytest
+from typing import List
+
+from src.ai.llm_ai import LlmAI
+from src.ai.rule_ai import RuleAI
+from src.engine.card import card_ids, hand_checksum
+from src.web.outbound import Broadcaster
+from src.web.room import DEFAULT_ROOM, IDLE_HEADLESS, PLAYER_NAMES, Room, RoomManager, valid_room_id
+from src.web.scheduler import GameScheduler
+from src.web.lifecycle import start_table, stop_table
+from src.web.server import run_game_async
+from tests.helpers import FakeWebSocket, until
+
+
+def _room(room_id: str) -> Room:
+    # 未配置 API key 的 LlmAI 全部走 RuleAI；pace=0 跳过动画等待，队列放大以免整局消息溢出
+    return Room(room_id, strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                hub=Broadcaster(max_queue=10000), pace=0.0)
+
+
+class TestRoomManager:
+
+    def test_room_id_validation(self):
+        assert valid_room_id("table-1")
+        assert not valid_room_id("")
+        assert not valid_room_id("../etc")
+        assert not valid_room_id("x" * 33)
+
+    def test_get_or_create_reuses_room(self):
+        manager = RoomManager(factory=_room)
+        a = manager.get_or_create("a")
+        assert manager.get_or_create("a") is a
+        assert manager.created == 1
+        with pytest.raises(ValueError):
+            manager.get_or_create("bad id")
+
+    def test_max_rooms(self):
+        manager = RoomManager(factory=_room, max_rooms=2, idle_ttl=3600)
+        manager.get_or_create("a")
+        manager.get_or_create("b")
+        with pytest.raises(LookupError):
+            manager.get_or_create("c")
+
+    def test_full_manager_collects_expired_rooms(self):
+        manager = RoomManager(factory=_room, max_rooms=1, idle_ttl=0)
+        manager.get_or_create("a")
+        manager.get_or_create("b")
+        assert list(manager.rooms) == ["b"]
+        assert manager.collected == 1
+
+    @pytest.mark.asyncio
+    async def test_rooms_with_subscribers_not_collected(self):
+        manager = RoomManager(factory=_room, idle_ttl=0)
+        busy = manager.get_or_create("busy")
+        manager.get_or_create("empty")
+        busy.hub.add(FakeWebSocket())
+        assert manager.collect() == ["empty"]
+        assert "busy" in manager.rooms
+
+    def test_default_room_never_collected(self):
+        manager = RoomManager(factory=_room, idle_ttl=0)
+        default = manager.get_or_create(DEFAULT_ROOM)
+        manager.get_or_create("other")
+        assert manager.collect() == ["other"]
+        assert manager.get(DEFAULT_ROOM) is default
+
+    @pytest.mark.asyncio
+    async def test_gc_loop_cancelled_on_shutdown(self):
+        manager = RoomManager(factory=_room)
+        tasks = await start_table(manager)
+        gc_task = tasks[0]
+        assert DEFAULT_ROOM in manager.rooms
+        await stop_table(manager, tasks)
+        assert gc_task.cancelled()
+        assert not tasks and not manager.rooms
+
+
+class TestRoomGames:
+
+    @pytest.mark.asyncio
+    async def test_duplicate_start_ignored(self):
+        room = _room("a")
+        gate = asyncio.Event()
+
+        async def game(r: Room) -> None:
+            await gate.wait()
+
+        first = asyncio.ensure_future(room.run_exclusive(game))
+        await asyncio.sleep(0)
+        assert room.playing
+        assert await room.run_exclusive(game) is False
+        gate.set()
+        assert await first is True
+        assert not room.playing
+
+    @pytest.mark.asyncio
+    async def test_concurrent_rooms_are_independent(self):
+        rooms = [_room(f"t{i}") for i in range(4)]
+        sockets = [FakeWebSocket() for _ in rooms]
+        for room, ws in zip(rooms, sockets):
+            room.hub.add(ws)
+
+        results = await asyncio.gather(*(r.run_exclusive(run_game_async) for r in rooms))
+        assert all(results)
+        while any(r.hub.queued for r in rooms):   # 等写协程发完队列
+            await asyncio.sleep(0.001)
+
+        for room, ws in zip(rooms, sockets):
+            assert room.game_count == 1
+            types = [m["type"] for m in ws.sent]
+            assert types[0] == "deal_start"
+            assert types.count("result") == 1
+            # 每个房间积分自成一本账，零和
+            assert sum(p.score for p in room.players) == 0
+        # 各房间的玩家对象互不共享
+        assert len({id(p) for r in rooms for p in r.players}) == 12
+
+    @pytest.mark.asyncio
+    async def test_game_uses_timeline_messages(self):
+        room = _room("tl")
+        ws = FakeWebSocket()
+        room.hub.add(ws)
+        await room.run_exclusive(run_game_async)
+        while room.hub.queued:
+            await asyncio.sleep(0.001)
+
+        types = [m["type"] for m in ws.sent]
+        # 倒计时与逐张发牌由客户端按时间线本地播放，不再逐条推送
+        assert "countdown" not in types and "deal_card" not in types
+        schedule = next(m for m in ws.sent if m["type"] == "deal_schedule")
+        assert [len(h) for h in schedule["hands"]] == [17, 17, 17]
+        turns = types.count("bid") + types.count("play") + types.count("pass")
+        assert types.count("thinking") <= turns
+        assert all(m["until"] >= m["start"] for m in ws.sent if m["type"] == "thinking")
+
+    def test_deadline_scaled_by_pace(self):
+        room = Room("p", strategies=[], hub=Broadcaster(), pace=0.5)
+        assert room.deadline(4, start=1000) == 3000
+
+    @pytest.mark.asyncio
+    async def test_hand_deltas_match_checksums(self):
+        room = _room("delta")
+        ws = FakeWebSocket()
+        room.hub.add(ws)
+        await room.run_exclusive(run_game_async)
+        while room.hub.queued:
+            await asyncio.sleep(0.001)
+
+        # 按发牌时间线 + 底牌 added + 出牌 cards 重建各家手牌，每步与服务端校验和一致
+        hands: List[List[int]] = []
+        for m in ws.sent:
+            if m["type"] == "deal_schedule":
+                hands = [list(h) for h in m["hands"]]
+            elif m["type"] in ("deal_done", "landlord"):
+                if m["type"] == "landlord":
+                    hands[m["player_id"]] += m["added"]
+                for p in m["players"]:
+                    assert hand_checksum(hands[p["id"]]) == p["checksum"]
+            elif m["type"] == "play":
+                assert "hand" not in m
+                hands[m["player_id"]] = [i for i in hands[m["player_id"]] if i not in m["cards"]]
+                assert hand_checksum(hands[m["player_id"]]) == m["checksum"]
+        assert [sorted(h) for h in hands] == [sorted(card_ids(p.hand)) for p in room.players]
+
+
+class CountingAI(RuleAI):
+    """记录异步（LLM）决策调用次数的规则 AI"""
+
+    def __init__(self):
+        self.async_calls = 0
+
+    async def async_decide_bid(self, player, state):
+        self.async_calls += 1
+        return self.decide_bid(player, state), ""
+
+    async def async_decide_play(self, player, state):
+        self.async_calls += 1
+        return self.decide_play(player, state), ""
+
+
+class TestAudience:
+
+    @pytest.mark.asyncio
+    async def test_auto_play_waits_for_viewers(self):
+        room = Room("a", strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                    hub=Broadcaster(max_queue=10000), pace=0.0, idle_grace=0.0)
+        room.scheduler = GameScheduler(room, run_game_async, auto_play=True, gap=0.0)
+        room.scheduler.start()
+        try:
+            await until(lambda: room.suspended)
+            assert room.journal.seq == 0 and room.idle
+
+            ws = FakeWebSocket()
+            room.subscribe(ws)
+            await until(lambda: any(m["type"] == "result" for m in ws.sent))
+            assert [m["type"] for m in ws.sent][:3] == ["clock", "snapshot", "deal_start"]
+            assert room.audience_stats.suspends == 1
+        finally:
+            room.close()
+
+    @pytest.mark.asyncio
+    async def test_pauses_at_turn_and_resumes_with_snapshot(self):
+        strategies = [CountingAI() for _ in PLAYER_NAMES]
+        room = Room("p", strategies=strategies, hub=Broadcaster(max_queue=10000),
+                    pace=0.0, idle_grace=0.0)
+        game = asyncio.ensure_future(room.run_exclusive(run_game_async))
+        await until(lambda: room.suspended)
+        # 发完牌后在首个叫分回合挂起，没有发起任何决策
+        assert room.journal.state.phase == "bidding"
+        assert sum(s.async_calls for s in strategies) == 0
+        assert not game.done()
+
+        ws = FakeWebSocket()
+        room.subscribe(ws)
+        await asyncio.wait_for(game, 5)
+        await until(lambda: not room.hub.queued)
+        snapshot = ws.sent[1]
+        assert snapshot["type"] == "snapshot" and snapshot["state"]["phase"] == "bidding"
+        assert [len(p["hand"]) for p in snapshot["state"]["players"]] == [17, 17, 17]
+        assert ws.sent[-1]["type"] == "result"
+        assert sum(s.async_calls for s in strategies) > 0
+
+    @pytest.mark.asyncio
+    async def test_headless_finishes_without_llm(self):
+        strategies = [CountingAI() for _ in PLAYER_NAMES]
+        room = Room("h", strategies=strategies, hub=Broadcaster(max_queue=10000),
+                    pace=0.05, idle_policy=IDLE_HEADLESS, idle_grace=0.0)
+        # 正常节奏下一局需要几十秒的思考等待，托管时即时下完
+        await asyncio.wait_for(room.run_exclusive(run_game_async), 5)
+        assert room.journal.state.phase == "finished"
+        assert sum(s.async_calls for s in strategies) == 0
+        assert room.audience_stats.headless_turns > 0
+        types = [json.loads(f.data)["type"] for f in room.journal.since(0, room.journal.epoch)]
+        assert "thinking" not in types and "commentary" not in types
+        assert sum(p.score for p in room.players) == 0
@@ -0,0 +1,114 @@
+"""端点路由与熔断器单元测试（使用假 LLM 客户端，不访问网络）"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from src.engine.card import Card, Rank, Suit
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.client_pool import ClientRegistry
+from src.ai.latency import LatencyRegistry
+from src.ai.routing import (
+    BreakerRegistry, CircuitBreaker, build_routes, parse_endpoints, rank_routes,
+    BREAKER_CLOSED, BREAKER_OPEN,
+)
+from src.ai.llm_ai import LlmAI
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("x", failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == BREAKER_CLOSED
+        breaker.record_failure()
+        assert breaker.state == BREAKER_OPEN
+        assert breaker.trips == 1
+
+    @pytest.mark.asyncio
+    async def test_background_probe_recovers(self):
+        results = [False, True]
+
+        async def probe():
+            return results.pop(0)
+
+        breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=0.01, probe=probe)
+        breaker.record_failure()
+        assert not breaker.available
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if breaker.available:
+                break
+        assert breaker.state == BREAKER_CLOSED
+        assert breaker.probes == 2
+
+
+class TestRouting:
+
+    def _routes(self):
+        specs = [("https://a/v1", "m1", "k"), ("https://b/v1", "m2", "k"), ("https://c/v1", "m3", "")]
+        return build_routes(specs, ClientRegistry(), LatencyRegistry(), BreakerRegistry())
+
+    def test_keyless_entries_skipped(self):
+        assert [r.model for r in self._routes()] == ["m1", "m2"]
+
+    def test_prefers_lower_latency_and_skips_open(self):
+        a, b = self._routes()
+        for _ in range(10):
+            a.latency.observe(2.0)
+            b.latency.observe(0.5)
+        assert rank_routes([a, b]) == [b, a]
+        for _ in range(3):
+            b.breaker.record_failure()
+        assert rank_routes([a, b]) == [a]
+
+    def test_parse_endpoints(self):
+        specs = parse_endpoints("https://a/v1|m1, https://b/v1|m2|sk-b, bad", "sk-default")
+        assert specs == [("https://a/v1", "m1", "sk-default"), ("https://b/v1", "m2", "sk-b")]
+
+
+class FailingCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise ConnectionError("boom")
+
+
+class OkCompletions:
+    async def create(self, **kwargs):
+        message = SimpleNamespace(content='{"action": "play", "cards": ["♥A"], "strategy": "稳"}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class TestFailover:
+
+    @pytest.mark.asyncio
+    async def test_routes_around_broken_endpoint(self):
+        ai = LlmAI(
+            "冰山姐❄️",
+            endpoints=[("https://a/v1", "m1", "k"), ("https://b/v1", "m2", "k")],
+            registry=ClientRegistry(), latency=LatencyRegistry(),
+            breakers=BreakerRegistry(failure_threshold=2, reset_timeout=60),
+        )
+        broken = FailingCompletions()
+        ai.routes[0].client = SimpleNamespace(chat=SimpleNamespace(completions=broken))
+        ai.routes[1].client = SimpleNamespace(chat=SimpleNamespace(completions=OkCompletions()))
+
+        players = [Player(id=i, name=f"P{i}") for i in range(3)]
+        players[0].hand = [Card(Rank.THREE, Suit.SPADE), Card(Rank.ACE, Suit.HEART)]
+        players[0].role = Role.LANDLORD
+        state = GameState(players=players, phase=GamePhase.PLAYING)
+
+        for _ in range(2):
+            await ai.async_decide_play(players[0], state)
+        assert ai.routes[0].breaker.state == BREAKER_OPEN
+
+        cards, strategy = await ai.async_decide_play(players[0], state)
+        assert strategy == "稳"
+        assert broken.calls == 2
+        ai.routes[0].breaker.cancel_probe()
@@ -0,0 +1,139 @@
+"""对局调度单元测试：单飞 start、自动连播、结算期间预发牌与预叫分（规则 AI，不访问网络）"""
+
+import asyncio
+import pytest
+
+from src.ai.llm_ai import LlmAI
+from src.web.outbound import Broadcaster
+from src.web.room import PLAYER_NAMES, Room, RoomManager
+from src.web.scheduler import GameScheduler, PreparedGame
+from src.engine.card import card_ids
+from src.web.server import prepare_next_game, run_game_async
+from tests.helpers import FakeWebSocket, until
+
+
+def _room(room_id: str = "t") -> Room:
+    return Room(room_id, strategies=[LlmAI(character=n) for n in PLAYER_NAMES],
+                hub=Broadcaster(max_queue=10000), pace=0.0)
+
+
+class TestGameScheduler:
+
+    @pytest.mark.asyncio
+    async def test_start_is_single_flight(self):
+        room = _room()
+        gate = asyncio.Event()
+        calls = []
+
+        async def game(r: Room, prepared) -> None:
+            calls.append(prepared)
+            await gate.wait()
+
+        scheduler = GameScheduler(room, game)
+        scheduler.start()
+        assert scheduler.request_start() is True
+        await until(lambda: room.playing)
+        assert scheduler.request_start() is False
+        gate.set()
+        await until(lambda: scheduler.stats.games == 1)
+        # 上一局结束后可再次开局
+        assert scheduler.request_start() is True
+        await until(lambda: scheduler.stats.games == 2)
+        assert calls == [None, None]
+        assert scheduler.stats.starts_ignored == 1
+        scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_auto_play_ignores_client_start(self):
+        room = _room()
+
+        async def game(r: Room, prepared) -> None:
+            await asyncio.sleep(0)
+
+        scheduler = GameScheduler(room, game, auto_play=True, gap=10.0)
+        scheduler.start()
+        await until(lambda: scheduler.stats.games >= 3)
+        assert scheduler.request_start() is False
+        assert room.nominal_wait >= 20.0     # 局间按 gap 等待（pace=0 时不真正等待）
+        room.scheduler = scheduler
+        room.close()
+        await asyncio.sleep(0)
+        assert not scheduler.running
+
+    @pytest.mark.asyncio
+    async def test_next_game_prepared_during_results(self):
+        room = _room()
+        prepared = PreparedGame(hands=[[], [], []], dizhu_cards=[], first_bidder=1, bids=[])
+        seen = []
+
+        async def prepare(r: Room) -> PreparedGame:
+            return prepared
+
+        async def game(r: Room, p) -> None:
+            seen.append(p)
+
+        scheduler = GameScheduler(room, game, prepare=prepare, auto_play=True, gap=0.0)
+        scheduler.start()
+        await until(lambda: scheduler.stats.games >= 2)
+        scheduler.close()
+        # 第一局现场发牌，之后每局使用上一局结算期间预备好的牌
+        assert seen[0] is None
+        assert seen[1] is prepared
+        assert scheduler.stats.prepared >= 1
+
+    @pytest.mark.asyncio
+    async def test_failed_prepare_falls_back_to_live_deal(self):
+        room = _room()
+        seen = []
+
+        async def prepare(r: Room) -> PreparedGame:
+            raise RuntimeError("boom")
+
+        async def game(r: Room, p) -> None:
+            seen.append(p)
+
+        scheduler = GameScheduler(room, game, prepare=prepare, auto_play=True, gap=0.0)
+        scheduler.start()
+        await until(lambda: scheduler.stats.games >= 2)
+        scheduler.close()
+        assert seen[:2] == [None, None]
+        assert scheduler.stats.prepare_failed >= 1
+
+
+class TestPreparedGame:
+
+    @pytest.mark.asyncio
+    async def test_prepare_does_not_touch_room_players(self):
+        room = _room()
+        prepared = await prepare_next_game(room)
+        assert [len(h) for h in prepared.hands] == [17, 17, 17]
+        assert len(prepared.dizhu_cards) == 3
+        assert 1 <= len(prepared.bids) <= 3
+        assert all(not p.hand for p in room.players)
+
+    @pytest.mark.asyncio
+    async def test_run_game_replays_prepared_deal_and_bids(self):
+        room = _room()
+        ws = FakeWebSocket()
+        room.hub.add(ws)
+        prepared = await prepare_next_game(room)
+
+        assert await room.run_exclusive(lambda r: run_game_async(r, prepared))
+        await until(lambda: room.hub.queued == 0)
+
+        schedule = next(m for m in ws.sent if m["type"] == "deal_schedule")
+        assert schedule["hands"] == [card_ids(h) for h in prepared.hands]
+        bids = [(m["player_id"], m["bid"]) for m in ws.sent if m["type"] == "bid"]
+        assert bids[0][0] == prepared.first_bidder
+        assert [b for _, b in bids] == [b for b, _ in prepared.bids]
+        assert sum(1 for m in ws.sent if m["type"] == "result") == 1
+
+
+class TestRoomManagerHook:
+
+    def test_on_create_called_once_per_room(self):
+        created = []
+        manager = RoomManager(factory=_room, on_create=created.append)
+        a = manager.get_or_create("a")
+        manager.get_or_create("a")
+        assert created == [a]
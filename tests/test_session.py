@@ -0,0 +1,85 @@
+"""对局会话单元测试"""
+
+import pytest
+from typing import List
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_detector import detect_hand
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.session import GameSession, estimate_tokens
+
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+def _make_state(dizhu: List[Card]) -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    players[0].hand = [_c(Rank.THREE), _c(Rank.NINE)]
+    return GameState(players=players, phase=GamePhase.PLAYING, dizhu_cards=dizhu)
+
+
+def _play(state: GameState, pid: int, *ranks: Rank) -> None:
+    state.play_history.append((pid, detect_hand([_c(r) for r in ranks])))
+
+
+class TestGameSession:
+
+    def test_delta_since_last_turn_and_derived_answer(self):
+        session = GameSession(budget_tokens=10000)
+        state = _make_state([_c(Rank.ACE)])
+        me = state.players[0]
+
+        msgs, snap = session.prepare(me, state, "T1")
+        session.commit(snap)
+        assert msgs == [{"role": "user", "content": "T1"}]
+
+        _play(state, 0, Rank.FIVE)
+        _play(state, 1, Rank.SEVEN)
+        msgs, snap = session.prepare(me, state, "T2")
+        session.commit(snap)
+        assert [m["role"] for m in msgs] == ["user", "assistant", "user"]
+        assert '"cards": "5"' in msgs[1]["content"]
+        assert msgs[2]["content"] == "近况: 下家出 7\nT2"
+
+    def test_pass_derived_when_own_play_missing(self):
+        session = GameSession(budget_tokens=10000)
+        state = _make_state([_c(Rank.ACE)])
+        _, snap = session.prepare(state.players[0], state, "T1")
+        session.commit(snap)
+        _play(state, 1, Rank.SEVEN)
+        msgs, _ = session.prepare(state.players[0], state, "T2")
+        assert msgs[1]["content"] == '{"action":"pass"}'
+
+    def test_new_game_resets(self):
+        session = GameSession(budget_tokens=10000)
+        state = _make_state([_c(Rank.ACE)])
+        _, snap = session.prepare(state.players[0], state, "T1")
+        session.commit(snap)
+
+        other = _make_state([_c(Rank.KING)])
+        msgs, _ = session.prepare(other.players[0], other, "N1")
+        assert msgs == [{"role": "user", "content": "N1"}]
+
+    def test_preview_without_commit_leaves_session(self):
+        session = GameSession(budget_tokens=10000)
+        state = _make_state([_c(Rank.ACE)])
+        session.prepare(state.players[0], state, "T1")
+        assert session.turns == 0
+
+    def test_budget_bounds_history_with_summary(self):
+        session = GameSession(budget_tokens=60)
+        state = _make_state([_c(Rank.ACE)])
+        me = state.players[0]
+        ranks = [Rank.THREE, Rank.FOUR, Rank.FIVE, Rank.SIX, Rank.SEVEN, Rank.EIGHT] * 3
+        for i, r in enumerate(ranks):
+            msgs, snap = session.prepare(me, state, f"[出牌] 第{i}回合 局面描述")
+            session.commit(snap)
+            _play(state, 0, r)
+            _play(state, 1, r)
+            assert sum(estimate_tokens(m["content"]) for m in msgs) <= 60
+        assert msgs[0]["content"].startswith("早前出牌")
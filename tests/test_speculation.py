@@ -0,0 +1,139 @@
+"""投机预取单元测试"""
+
+import asyncio
+import pytest
+
+from src.engine.card import Card, Rank, Suit
+from src.engine.hand_detector import detect_hand
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.rule_ai import RuleAI
+from src.ai.speculation import SpeculativePrefetcher, state_signature, successor_state
+
+
+# ============================================================
+#  辅助工具
+# ============================================================
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+class FakeLlm:
+    """模拟 LLM 策略：按 RuleAI 决策，记录调用次数"""
+
+    enabled = True
+
+    def __init__(self, delay: float = 0.01):
+        self.calls = 0
+        self.delay = delay
+        self._rule = RuleAI()
+
+    async def async_decide_play(self, player: Player, state: GameState):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self._rule.decide_play(player, state), "fake"
+
+
+def _make_state() -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = [_c(Rank.THREE), _c(Rank.FIVE), _c(Rank.NINE)]
+    players[1].hand = [_c(Rank.FOUR), _c(Rank.EIGHT), _c(Rank.KING)]
+    players[2].hand = [_c(Rank.SIX), _c(Rank.TEN), _c(Rank.ACE)]
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+def _apply(state: GameState, pid: int, cards) -> None:
+    """按 run_playing_async 的方式在真实局面上执行一步"""
+    if cards is None:
+        state.pass_count += 1
+    else:
+        state.players[pid].remove_cards(cards)
+        state.last_play = detect_hand(cards)
+        state.last_player = pid
+        state.pass_count = 0
+    state.current_player = (pid + 1) % 3
+    if state.last_play is None or state.pass_count >= 2:
+        state.last_play = None
+        state.last_player = None
+        state.pass_count = 0
+
+
+# ============================================================
+#  后继局面推演
+# ============================================================
+
+class TestSuccessorState:
+
+    def test_play_matches_real_step(self):
+        state = _make_state()
+        sim = successor_state(state, 0, [_c(Rank.THREE)])
+        _apply(state, 0, [_c(Rank.THREE)])
+        assert state_signature(sim, 1) == state_signature(state, 1)
+
+    def test_original_state_untouched(self):
+        state = _make_state()
+        successor_state(state, 0, [_c(Rank.THREE)])
+        assert state.players[0].hand_size == 3
+        assert state.last_play is None
+
+    def test_illegal_play_returns_none(self):
+        state = _make_state()
+        assert successor_state(state, 0, [_c(Rank.ACE)]) is None
+
+
+# ============================================================
+#  预取命中 / 预算
+# ============================================================
+
+class TestPrefetcher:
+
+    @pytest.mark.asyncio
+    async def test_hit_when_prediction_correct(self):
+        strategies = [FakeLlm(), FakeLlm(), FakeLlm()]
+        pf = SpeculativePrefetcher(strategies, max_branches=2, budget_ratio=2.0)
+        state = _make_state()
+
+        cards, _ = await pf.decide(0, state)
+        _apply(state, 0, cards)
+        await pf.decide(1, state)
+
+        assert pf.stats.hits == 1
+        # 座位1 只有投机请求，没有重新发起
+        assert strategies[1].calls == 1
+
+    @pytest.mark.asyncio
+    async def test_miss_reissues(self):
+        strategies = [FakeLlm(), FakeLlm(), FakeLlm()]
+        pf = SpeculativePrefetcher(strategies, max_branches=1, budget_ratio=2.0)
+        state = _make_state()
+
+        await pf.decide(0, state)
+        # 真实出牌与 RuleAI 预测不同
+        _apply(state, 0, [_c(Rank.NINE)])
+        await pf.decide(1, state)
+
+        assert pf.stats.hits == 0
+        assert pf.stats.misses == 1
+        assert pf.stats.wasted == 1
+        assert strategies[1].calls == 2
+
+    @pytest.mark.asyncio
+    async def test_budget_limits_extra_requests(self):
+        strategies = [FakeLlm(), FakeLlm(), FakeLlm()]
+        pf = SpeculativePrefetcher(strategies, max_branches=2, budget_ratio=0.5)
+        state = _make_state()
+
+        await pf.decide(0, state)
+        assert pf.stats.issued == 0
+        assert pf.stats.skipped_budget == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_seat_not_prefetched(self):
+        strategies = [FakeLlm(), RuleAI(), FakeLlm()]
+        pf = SpeculativePrefetcher(strategies, max_branches=2, budget_ratio=2.0)
+        await pf.decide(0, _make_state())
+        assert pf.stats.issued == 0
@@ -0,0 +1,58 @@
+"""流式 JSON 增量解析单元测试"""
+
+import asyncio
+import pytest
+
+from src.ai.streaming import JsonFieldScanner, StrategyStream, decision_spec, synthesize
+
+
+def _feed(text: str) -> JsonFieldScanner:
+    scanner = JsonFieldScanner()
+    scanner.feed(text)
+    return scanner
+
+
+class TestJsonFieldScanner:
+
+    def test_fields_before_object_closes(self):
+        s = _feed('{"action": "play", "cards": ["♠3", "♥3"], "strategy": "先走')
+        spec = decision_spec(False, s.field("action", "str"))
+        assert s.fields(spec) == {"action": "play", "cards": ["♠3", "♥3"]}
+        assert s.strategy() == "先走"
+
+    def test_incomplete_cards_not_ready(self):
+        s = _feed('{"action": "play", "cards": ["♠3", "♥')
+        spec = decision_spec(False, s.field("action", "str"))
+        assert s.fields(spec) is None
+
+    def test_pass_needs_only_action(self):
+        s = _feed('{"action": "pass", "ca')
+        assert s.fields(decision_spec(False, s.field("action", "str"))) == {"action": "pass"}
+
+    def test_indexed_move_waits_for_delimiter(self):
+        assert _feed('{"move": 1').fields(decision_spec(True, None)) is None
+        assert _feed('{"move": 12,').fields(decision_spec(True, None)) == {"move": 12}
+
+    def test_partial_escape(self):
+        assert _feed('{"strategy": "稳\\').strategy() == "稳"
+
+    def test_synthesize_roundtrip(self):
+        assert synthesize({"move": 2}, "冲") == '{"move": 2, "strategy": "冲"}'
+
+
+class TestStrategyStream:
+
+    @pytest.mark.asyncio
+    async def test_updates_until_done(self):
+        stream = StrategyStream()
+
+        async def produce():
+            for text in ("一", "一鼓", "一鼓作气"):
+                await asyncio.sleep(0)
+                stream.update(text)
+            stream.finish()
+
+        asyncio.ensure_future(produce())
+        seen = [text async for text in stream.updates()]
+        assert seen[-1] == "一鼓作气"
+        assert stream.done
@@ -0,0 +1,159 @@
+"""LLM 调用遥测单元测试"""
+
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from typing import List
+
+from src.engine.card import Card, Rank, Suit
+from src.game.player import Player, Role
+from src.game.game_state import GameState, GamePhase
+from src.ai.client_pool import ClientRegistry
+from src.ai.latency import HEDGE_OFF, HedgePolicy, LatencyRegistry
+from src.ai.routing import BreakerRegistry
+from src.ai.llm_ai import LlmAI, PROMPT_COMPACT
+from src.ai.telemetry import (
+    LatencyHistogram, Telemetry, parse_prices,
+    CALL_OK, CALL_REPAIRED, CALL_PARSE_FAIL, CALL_ILLEGAL, CALL_TIMEOUT, KIND_PLAY, KIND_BID,
+)
+
+
+def _c(rank: Rank, suit: Suit = Suit.SPADE) -> Card:
+    return Card(rank=rank, suit=suit)
+
+
+class ScriptedCompletions:
+    """按顺序返回预设响应（None 表示挂起直到超时），附带 usage"""
+
+    def __init__(self, replies: List):
+        self.replies = list(replies)
+
+    async def create(self, **kwargs):
+        reply = self.replies.pop(0)
+        if reply is None:
+            await asyncio.sleep(10)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=40))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage=usage
+        )
+
+
+def _make_ai(replies: List, telemetry: Telemetry, **kwargs) -> LlmAI:
+    ai = LlmAI("烈焰哥🔥", api_key="k", registry=ClientRegistry(), latency=LatencyRegistry(),
+               breakers=BreakerRegistry(), telemetry=telemetry,
+               hedge=HedgePolicy(mode=HEDGE_OFF, max_timeout=0.05), **kwargs)
+    ai.routes[0].client = SimpleNamespace(
+        chat=SimpleNamespace(completions=ScriptedCompletions(replies))
+    )
+    return ai
+
+
+def _make_state(hand: List[Card]) -> GameState:
+    players = [Player(id=i, name=f"P{i}") for i in range(3)]
+    players[0].hand = list(hand)
+    players[0].role = Role.LANDLORD
+    players[1].role = Role.FARMER
+    players[2].role = Role.FARMER
+    return GameState(players=players, phase=GamePhase.PLAYING)
+
+
+class TestHistogram:
+
+    def test_percentiles_use_bucket_bounds(self):
+        h = LatencyHistogram()
+        for ms in [10] * 9 + [300]:
+            h.observe(ms)
+        assert h.percentile(0.5) == 25.0
+        assert h.percentile(0.99) == 300.0   # 不超过观测到的最大值
+        assert h.to_dict()["buckets"] == {"le_25": 9, "le_400": 1}
+
+
+class TestSpan:
+
+    def test_recorded_once_when_resolved_and_ended(self):
+        tel = Telemetry()
+        span = tel.span("A", "m", "u", KIND_PLAY)
+        span.resolve(CALL_OK)
+        assert tel.snapshot() == []
+        span.end()
+        span.resolve(CALL_TIMEOUT)
+        span.end()
+        (row,) = tel.snapshot()
+        assert row["calls"] == 1
+        assert row["outcomes"] == {CALL_OK: 1}
+
+    def test_cost_from_prices(self):
+        prices = parse_prices("m=1/2/0.5, bad, x=oops/1")
+        assert prices == {"m": (1.0, 2.0, 0.5)}
+        tel = Telemetry(prices)
+        span = tel.span("A", "m", "u", KIND_BID)
+        span.add_usage({"prompt_tokens": 1000, "completion_tokens": 100,
+                        "prompt_tokens_details": {"cached_tokens": 400}})
+        assert tel.cost(span) == pytest.approx((600 * 1 + 100 * 2 + 400 * 0.5) / 1e6)
+
+    def test_dump_appends_json_lines(self, tmp_path):
+        path = tmp_path / "telemetry.jsonl"
+        tel = Telemetry(dump_path=str(path))
+        tel.dump()
+        tel.dump()
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["stats"] == []
+
+
+    @pytest.mark.asyncio
+    async def test_dump_loop_survives_failed_iteration(self, tmp_path):
+        path = tmp_path / "telemetry.jsonl"
+        tel = Telemetry(dump_path=str(path), dump_interval=0.01)
+        append, failures = tel._append, []
+
+        def flaky(text: str) -> None:
+            if not failures:
+                failures.append(text)
+                raise RuntimeError("dictionary changed size during iteration")
+            append(text)
+
+        tel._append = flaky
+        task = asyncio.ensure_future(tel.dump_loop())
+        try:
+            for _ in range(100):
+                if path.exists():
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+        assert failures and path.exists()
+
+
+class TestLlmAITelemetry:
+
+    @pytest.mark.asyncio
+    async def test_outcome_categories(self):
+        tel = Telemetry()
+        hand = [_c(Rank.THREE), _c(Rank.FIVE), _c(Rank.KING)]
+        ai = _make_ai([
+            '{"action": "play", "cards": ["♠3"], "strategy": "走"}',
+            "不是 JSON",
+            '{"action": "play", "cards": ["♠3", "♠K"], "strategy": "乱出"}',
+            None,
+        ], tel, repair=False)
+        state = _make_state(hand)
+        for _ in range(4):
+            await ai.async_decide_play(state.players[0], state)
+        (row,) = tel.snapshot()
+        assert row["kind"] == KIND_PLAY
+        assert row["outcomes"] == {CALL_OK: 1, CALL_PARSE_FAIL: 1, CALL_ILLEGAL: 1, CALL_TIMEOUT: 1}
+        assert row["prompt_tokens"] == 300 and row["cached_tokens"] == 120
+        assert row["timeout_rate"] == 0.25
+
+    @pytest.mark.asyncio
+    async def test_repaired_is_distinguished(self):
+        tel = Telemetry()
+        hand = [_c(Rank.THREE), _c(Rank.THREE, Suit.HEART), _c(Rank.TEN)]
+        ai = _make_ai(['{"action": "play", "cards": "333", "strategy": "冲"}'], tel,
+                      prompt_encoding=PROMPT_COMPACT)
+        state = _make_state(hand)
+        await ai.async_decide_play(state.players[0], state)
+        assert tel.snapshot()[0]["outcomes"] == {CALL_REPAIRED: 1}
@@ -0,0 +1,86 @@
+"""线上编码单元测试：MessagePack 子集编解码、字符串片段缓存与按连接协商的二进制广播"""
+
+import asyncio
+import json
+import pytest
+from typing import List
+
+from src.web.outbound import Broadcaster, make_frame
+from src.web.wire import (
+    FORMAT_JSON, FORMAT_MSGPACK, encode_json, negotiate, pack, precompile, unpack,
+)
+
+
+class BinaryWebSocket:
+    def __init__(self):
+        self.text: List[str] = []
+        self.binary: List[bytes] = []
+
+    async def send_text(self, data: str) -> None:
+        self.text.append(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.binary.append(data)
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+class TestMessagePack:
+
+    def test_roundtrip(self):
+        msg = {
+            "type": "play", "player_id": 2, "cards": [0, 17, 52, 53], "is_bomb": False,
+            "strategy": "先走小顺子" * 20, "checksum": 65520, "big": 2 ** 40, "neg": -5,
+            "neg_big": -70000, "ratio": 0.25, "none": None,
+            "nested": [{"k": i} for i in range(20)], "wide": {str(i): i for i in range(20)},
+        }
+        assert unpack(pack(msg)) == msg
+
+    def test_card_ids_take_one_byte_each(self):
+        assert pack(list(range(54))) == b"\xdc\x00\x36" + bytes(range(54))
+        assert pack([3, 7, 9]) == b"\x93\x03\x07\x09"
+
+    def test_precompiled_fragments(self):
+        precompile(["王炸"])
+        assert pack("王炸") == bytes([0xA0 | 6]) + "王炸".encode("utf-8")
+
+    def test_smaller_than_json(self):
+        msg = {"type": "play", "player_id": 1, "cards": [4, 5, 6, 7, 8], "hand_size": 12, "seq": 321}
+        assert len(pack(msg)) < len(encode_json(msg).encode("utf-8"))
+
+    def test_negotiate(self):
+        assert negotiate("msgpack") == FORMAT_MSGPACK
+        assert negotiate(None) == FORMAT_JSON
+        assert negotiate("xml") == FORMAT_JSON
+
+
+class TestBinaryBroadcast:
+
+    @pytest.mark.asyncio
+    async def test_formats_per_connection(self):
+        hub = Broadcaster()
+        text_ws, bin_ws = BinaryWebSocket(), BinaryWebSocket()
+        hub.add(text_ws)
+        hub.add(bin_ws, FORMAT_MSGPACK)
+        hub.publish({"type": "pass", "player_id": 1})
+        await asyncio.sleep(0.01)
+        assert json.loads(text_ws.text[0]) == {"type": "pass", "player_id": 1}
+        assert unpack(bin_ws.binary[0]) == {"type": "pass", "player_id": 1}
+        assert hub.snapshot()["channels"][1]["format"] == FORMAT_MSGPACK
+
+    @pytest.mark.asyncio
+    async def test_packed_once_and_shared(self):
+        hub = Broadcaster()
+        sockets = [BinaryWebSocket() for _ in range(3)]
+        for ws in sockets:
+            hub.add(ws, FORMAT_MSGPACK)
+        frame = make_frame({"type": "bid", "player_id": 0, "bid": 2})
+        hub.publish_frame(frame)
+        await asyncio.sleep(0.01)
+        assert all(ws.binary[0] is frame.packed for ws in sockets)
+
+    def test_released_frame_repacks_from_json(self):
+        frame = make_frame({"type": "bid", "player_id": 0, "bid": 2})
+        frame.release()
+        assert unpack(frame.packed) == {"type": "bid", "player_id": 0, "bid": 2}